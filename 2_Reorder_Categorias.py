@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import data_ops
 
 st.set_page_config(page_title="Ordenar Categorías")
 
@@ -11,7 +12,7 @@ if "df" not in st.session_state:
 else:
     df = st.session_state.df
     # Obtener la lista de categorías actuales en el orden actual (sin duplicados)
-    cat_list = list(df["CATEGORIA"].astype(str).str.strip().drop_duplicates())
+    cat_list = data_ops.categories()
     
     st.write("Orden actual sugerido:", ", ".join(cat_list))
     
@@ -28,13 +29,7 @@ else:
                 st.error("Cada posición debe tener una categoría única. Revisa tu selección.")
             else:
                 st.session_state.category_order = new_order
-                st.session_state.df["CATEGORIA"] = pd.Categorical(
-                    st.session_state.df["CATEGORIA"].astype(str).str.strip(),
-                    categories=new_order,
-                    ordered=True
-                )
-                st.session_state.df.sort_values(by=["CATEGORIA", "PRODUCTO"], inplace=True)
-                st.session_state.df.reset_index(drop=True, inplace=True)
+                data_ops.reorder_categories(new_order)
                 st.success("Orden de categorías actualizado correctamente.")
                 st.write("Nuevo orden:", ", ".join(new_order))
                 st.dataframe(st.session_state.df)
@@ -3,10 +3,13 @@ import streamlit as st
 import pandas as pd
 import concurrent.futures
 
-from sheet_connector import get_data_from_sheet, update_spreadsheet
+from sheet_connector import get_data_from_sheet, invalidate_cache
+from catalog_store import get_store
+from sync_queue import SyncQueue, STATUS_DONE, STATUS_FAILED
 from product_editor import ProductEditor
 from product_manager import ProductManager
 from category_manager import CategoryManager
+import data_ops
 
 st.set_page_config(page_title="Gestión de Productos", layout="wide") # Única llamada a set_page_config
 
@@ -14,15 +17,51 @@ st.title("Gestión de Productos")
 
 SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1i4kafAJQvVkKbkVIo5LldsN7R-ApeWhHDKZjBvsguoo/edit?gid=0#gid=0"
 
-df = get_data_from_sheet(SPREADSHEET_URL)
+@st.cache_resource(show_spinner=False)
+def get_executor():
+    return concurrent.futures.ProcessPoolExecutor(max_workers=1)
 
+@st.cache_resource(show_spinner=False)
+def get_sync_queue():
+    return SyncQueue(get_executor(), SPREADSHEET_URL)
 
+# Al iniciar la sesión se toma el catálogo base compartido por todas las sesiones del proceso
+# (ver shared_catalog), que se vuelve a publicar desde la réplica local (SQLite) cada vez que
+# cambia su versión sincronizada. Solo la primera vez, cuando la réplica todavía no existe,
+# se descarga la hoja (pasando por la cache de sheet_connector).
+# La sincronización con el spreadsheet (subir ediciones pendientes o traer cambios
+# hechos en la hoja) corre en segundo plano, como mucho una vez por SYNC_INTERVAL.
 if "df" not in st.session_state:
-    st.session_state.df = df.copy()
+    if not data_ops.checkout_shared():
+        # Descarga por tramos: se muestra la primera categoría apenas llega el primer tramo
+        progreso = st.progress(0.0, text="Cargando productos desde Google Sheets...")
+        vista_previa = st.empty()
+
+        tramos_recibidos = []
+
+        def mostrar_tramo(chunk, fraccion):
+            if not tramos_recibidos:
+                primera = chunk["CATEGORIA"].iloc[0]
+                vista_previa.dataframe(chunk[chunk["CATEGORIA"] == primera])
+            tramos_recibidos.append(len(chunk))
+            progreso.progress(fraccion, text=f"Cargando productos desde Google Sheets... {fraccion:.0%}")
+
+        df = get_data_from_sheet(SPREADSHEET_URL, on_chunk=mostrar_tramo)
+        store = get_store()
+        store.mirror_from_sheet(df)
+        data_ops.publish(df, keys=store.synced_keys(), store_revision=store.revision())
+        progreso.empty()
+        vista_previa.empty()
+        data_ops.checkout_shared()
+else:
+    # Si hay una base más nueva (otra sesión o cambios traídos de la hoja) y esta sesión
+    # no tiene ediciones propias, se toma la base nueva
+    data_ops.refresh_from_shared()
+get_sync_queue().submit_if_due()
 
 st.header("Datos Cargados desde Google Sheets")
 st.subheader("Funcionalidades de Gestión de Productos")
-tabs = st.tabs(["Editar Productos", "Agregar Producto", "Eliminar Producto", "Gestionar Categorías"])
+tabs = st.tabs(["Editar Productos", "Agregar Producto", "Eliminar Producto", "Gestionar Categorías", "Actualizar Precios"])
 
 with tabs[0]:
     st.header("Editar Productos")
@@ -44,12 +83,50 @@ with tabs[3]:
     cat_manager = CategoryManager()
     cat_manager.manage_categories()
 
-@st.cache_resource(show_spinner=False)
-def get_executor():
-    return concurrent.futures.ProcessPoolExecutor(max_workers=1)
+with tabs[4]:
+    st.header("Actualizar Precios")
+    editor = ProductEditor(st.session_state.df)
+    editor.bulk_reprice()
+
+# Deshacer / rehacer ediciones de la sesión. Se dibuja después de las pestañas para que
+# el estado de los botones ya incluya las ediciones hechas en esta ejecución.
+with st.sidebar:
+    st.subheader("Historial de ediciones")
+    col_undo, col_redo = st.columns(2)
+    deshacer, rehacer = data_ops.undo_label(), data_ops.redo_label()
+    if col_undo.button("Deshacer", disabled=not data_ops.can_undo(), help=deshacer and f"Deshacer: {deshacer}"):
+        op = data_ops.undo()
+        st.toast(f"Se deshizo: {op}")
+        st.rerun()
+    if col_redo.button("Rehacer", disabled=not data_ops.can_redo(), help=rehacer and f"Rehacer: {rehacer}"):
+        op = data_ops.redo()
+        st.toast(f"Se rehízo: {op}")
+        st.rerun()
+    if st.button("Volver al estado de la hoja"):
+        if data_ops.revert_to_sheet():
+            st.rerun()
+        else:
+            st.warning("No hay un estado sincronizado con la hoja para restaurar.")
 
 if st.button("Actualizar Spreadsheet"):
-    with st.spinner("Actualizando la hoja de cálculo en segundo plano..."):
-        executor = get_executor()
-        future = executor.submit(update_spreadsheet, SPREADSHEET_URL, st.session_state.df)
-        st.success("La actualización se inició en un proceso separado.")
+    # Las ediciones ya están en el journal de la réplica local: el worker las sube
+    data_ops.flush_inserts()
+    st.session_state["sync_job_id"] = get_sync_queue().submit()
+    # Lo subido pasa a ser la base compartida para las demás sesiones
+    data_ops.publish()
+    # La escritura ocurre en otro proceso: invalidamos también la cache de este
+    invalidate_cache(SPREADSHEET_URL)
+    st.success("La actualización se encoló en segundo plano.")
+
+# Estado de la última sincronización pedida desde esta sesión
+if "sync_job_id" in st.session_state:
+    job = get_sync_queue().get_job(st.session_state["sync_job_id"])
+    if job is not None:
+        texto = f"Sincronización #{job['id']}: {job['status']} (intento {job['attempts']}) {job['message']}"
+        if job["status"] == STATUS_FAILED:
+            st.error(texto)
+        elif job["status"] == STATUS_DONE:
+            st.success(texto)
+        else:
+            st.progress(job["progress"], text=texto)
+            st.button("Refrescar estado")
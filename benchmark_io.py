@@ -0,0 +1,97 @@
+# benchmark_io.py
+"""
+Benchmark de las rutas de E/S de SheetConnector contra el backend fake (sin red).
+
+Uso:
+    python benchmark_io.py
+    python benchmark_io.py --sizes 1000 10000 --latency 0.05 --quota-error-every 0
+
+Para cada tamaño de catálogo sintético mide: carga (get_data), push completo,
+push por diferencias (10 precios cambiados) y borrado de una categoría.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import sheet_connector
+from sheet_backends import FakeSheetsBackend
+
+SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/benchmark/edit"
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+FILAS_POR_CATEGORIA = 50
+PRECIOS_MODIFICADOS = 10
+
+def generar_catalogo(n_rows, seed=0):
+    """
+    Genera un catálogo sintético con las columnas del spreadsheet real.
+    """
+    rng = np.random.default_rng(seed)
+    pos = np.arange(n_rows)
+    categorias = pd.Series(pos // FILAS_POR_CATEGORIA).map(lambda c: f"CATEGORIA {c:05d}")
+    es_kg = rng.random(n_rows) < 0.6
+    precios = rng.integers(500, 50_000, n_rows)
+    return pd.DataFrame({
+        "SKU": [f"CAT{p // FILAS_POR_CATEGORIA:05d}-PROD{p:06d}" for p in pos],
+        "PRODUCTO": [f"Producto {p}" for p in pos],
+        "PRECIO VENTA": [f"${precio:,}".replace(",", ".") for precio in precios],
+        "COSTO": (precios * 0.6).round(2),
+        "MARCA": rng.choice(["Tres Senderos", "Natural", "Granja", ""], n_rows),
+        "CATEGORIA": categorias,
+        "KG / UNIDAD": np.where(es_kg, "KG", "UNIDAD"),
+        "STOCK": rng.choice(["-", "0"], n_rows),
+        "FRACCIONAMIENTO": np.where(es_kg, "250g, 500g, 1kg", ""),
+    })
+
+def _medir(backend, func):
+    backend.reset_calls()
+    inicio = time.perf_counter()
+    resultado = func()
+    return resultado, time.perf_counter() - inicio, sum(backend.calls.values())
+
+def benchmark(n_rows, latency=0.0, quota_error_every=0):
+    """
+    Corre las cuatro mediciones para un catálogo de n_rows filas y retorna una lista de resultados.
+    """
+    backend = FakeSheetsBackend(latency=latency, quota_error_every=quota_error_every)
+    sheet_connector.set_backend(backend)
+    backend.load_dataframe(SPREADSHEET_URL, generar_catalogo(n_rows))
+    connector = sheet_connector.SheetConnector(SPREADSHEET_URL)
+    resultados = []
+
+    df, segundos, llamadas = _medir(backend, connector.get_data)
+    resultados.append(("carga", segundos, llamadas))
+
+    _, segundos, llamadas = _medir(backend, lambda: connector.update_data(df, full=True))
+    resultados.append(("push completo", segundos, llamadas))
+
+    df_editado = df.copy()
+    filas = np.linspace(0, n_rows - 1, PRECIOS_MODIFICADOS, dtype=int)
+    df_editado.loc[filas, "PRECIO VENTA"] = df_editado.loc[filas, "PRECIO VENTA"] * 1.1
+    _, segundos, llamadas = _medir(backend, lambda: connector.update_data(df_editado))
+    resultados.append(("push por diferencias", segundos, llamadas))
+
+    categoria = df["CATEGORIA"].iloc[n_rows // 2]
+    _, segundos, llamadas = _medir(backend, lambda: connector.delete_category_rows(categoria))
+    resultados.append(("borrar categoría", segundos, llamadas))
+
+    return [
+        {"filas": n_rows, "operación": op, "segundos": round(seg, 4), "llamadas API": calls}
+        for op, seg, calls in resultados
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de E/S de SheetConnector con el backend fake.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos de latencia por llamada a la API")
+    parser.add_argument("--quota-error-every", type=int, default=0, help="Falla con 429 cada N llamadas")
+    args = parser.parse_args()
+
+    filas = []
+    for n_rows in args.sizes:
+        filas.extend(benchmark(n_rows, args.latency, args.quota_error_every))
+    print(pd.DataFrame(filas).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# catalog_index.py
+import uuid
+
+import numpy as np
+import pandas as pd
+
+def generated_key():
+    """
+    ID nuevo para un producto sin SKU propio (no se repite entre sesiones ni procesos).
+    """
+    return f"#{uuid.uuid4().hex[:12]}"
+
+def is_generated_key(key):
+    return str(key).startswith("#")
+
+def make_keys(skus, usadas=()):
+    """
+    Claves para filas nuevas: el SKU si no está vacío ni en 'usadas' (ni repetido en 'skus');
+    si no, un ID generado.
+    """
+    keys = []
+    vistas = set()
+    for sku in skus:
+        key = "" if pd.isna(sku) else str(sku).strip()
+        if not key or key.upper() == "NAN" or key in usadas or key in vistas:
+            key = generated_key()
+        vistas.add(key)
+        keys.append(key)
+    return keys
+
+def rekeyed(key, sku, usadas):
+    """
+    Clave de una fila cuyo SKU pasa a ser 'sku': el SKU nuevo si es válido y no está en 'usadas';
+    si no, la misma clave.
+    """
+    nueva = "" if sku is None or pd.isna(sku) else str(sku).strip()
+    if not nueva or nueva.upper() == "NAN" or nueva in usadas:
+        return key
+    return nueva
+
+class CatalogIndex:
+    """
+    Índice de categorías del catálogo que se mantiene junto a st.session_state.df.
+    - Clave normalizada de categoría: el texto de CATEGORIA sin espacios sobrantes.
+    - Mapa categoría -> posiciones de fila (arrays ordenados).
+    - Listas de categorías (por orden de aparición y alfabética) cacheadas.
+    - Clave de producto por fila (el SKU; si falta o está repetido, un ID generado "#...")
+      y el mapa clave -> posición, para buscar, editar y borrar productos sin depender
+      de la posición, que cambia con cada alta, baja o reordenamiento. Los IDs generados son
+      únicos (no dependen de la posición) y la réplica local los guarda junto a cada fila,
+      así la sesión y la réplica identifican igual a los productos sin SKU.
+    Las funciones de data_ops lo actualizan de forma incremental, así filtrar por
+    categoría o buscar un producto es una búsqueda en un dict en lugar de recorrer toda la columna.
+    """
+    def __init__(self, df, keys=None):
+        self._key_pos = {}
+        self.rebuild(df, keys=keys)
+
+    @staticmethod
+    def normalize(categoria):
+        return str(categoria).strip()
+
+    def rebuild(self, df, keys=None):
+        """
+        Reconstruye el índice a partir de df. Si se pasan 'keys' (alineadas con las filas de df)
+        se conservan, así los IDs generados sobreviven a los reordenamientos.
+        """
+        if "CATEGORIA" in df.columns:
+            cat_keys = df["CATEGORIA"].astype(str).str.strip().reset_index(drop=True)
+        else:
+            cat_keys = pd.Series([], dtype=object)
+        self._positions = {
+            cat: np.asarray(pos, dtype=np.int64)
+            for cat, pos in cat_keys.groupby(cat_keys, sort=False, observed=True).indices.items()
+        }
+        self.n_rows = len(df)
+        self.df_id = id(df)
+        if keys is None:
+            self._key_pos = {}
+            keys = self.make_keys(df["SKU"] if "SKU" in df.columns else [""] * len(df))
+        self._keys = list(keys)
+        self._reindex_keys()
+        self._clear_lists()
+
+    def make_keys(self, skus):
+        """
+        Claves para filas nuevas: el SKU si no está vacío ni en uso; si no, un ID generado.
+        """
+        return make_keys(skus, self._key_pos)
+
+    def _reindex_keys(self):
+        self._key_pos = {key: pos for pos, key in enumerate(self._keys)}
+
+    def _clear_lists(self):
+        self._ordered = None
+        self._sorted = None
+
+    # --------------------------
+    # Consultas
+    # --------------------------
+
+    def categories(self):
+        """
+        Categorías en el orden en que aparecen en el catálogo.
+        """
+        if self._ordered is None:
+            self._ordered = sorted(self._positions, key=lambda cat: self._positions[cat][0])
+        return list(self._ordered)
+
+    def sorted_categories(self):
+        """
+        Categorías en orden alfabético.
+        """
+        if self._sorted is None:
+            self._sorted = sorted(self._positions)
+        return list(self._sorted)
+
+    def positions(self, categoria):
+        """
+        Posiciones de fila (ordenadas) de los productos de la categoría.
+        """
+        return self._positions.get(self.normalize(categoria), np.empty(0, dtype=np.int64))
+
+    def rows(self, df, categoria):
+        """
+        Subconjunto de df con los productos de la categoría (conserva los índices originales).
+        """
+        return df.iloc[self.positions(categoria)]
+
+    def __contains__(self, categoria):
+        return self.normalize(categoria) in self._positions
+
+    @property
+    def keys(self):
+        return list(self._keys)
+
+    def key_at(self, position):
+        return self._keys[position]
+
+    def position_of(self, key):
+        """
+        Posición actual del producto con esa clave (None si ya no existe).
+        """
+        return self._key_pos.get(key)
+
+    # --------------------------
+    # Actualizaciones incrementales
+    # --------------------------
+
+    def _remove(self, removed):
+        for cat in list(self._positions):
+            pos = self._positions[cat]
+            keep = pos[~np.isin(pos, removed)]
+            if len(keep):
+                self._positions[cat] = keep
+            else:
+                del self._positions[cat]
+
+    def delete(self, positions):
+        """
+        Registra filas eliminadas (con reset_index posterior): las siguientes se corren hacia arriba.
+        """
+        removed = np.unique(np.asarray(positions, dtype=np.int64))
+        self._remove(removed)
+        for cat, pos in self._positions.items():
+            self._positions[cat] = pos - np.searchsorted(removed, pos)
+        quitar = set(removed.tolist())
+        self._keys = [key for pos, key in enumerate(self._keys) if pos not in quitar]
+        self._reindex_keys()
+        self.n_rows -= len(removed)
+        self._clear_lists()
+
+    def move(self, positions, categoria):
+        """
+        Registra que las filas indicadas pasaron a la categoría 'categoria'.
+        """
+        moved = np.unique(np.asarray(positions, dtype=np.int64))
+        self._remove(moved)
+        cat = self.normalize(categoria)
+        actuales = self._positions.get(cat, np.empty(0, dtype=np.int64))
+        self._positions[cat] = np.union1d(actuales, moved)
+        self._clear_lists()
+
+    def rename(self, old_cat, new_cat):
+        """
+        Registra el renombre de una categoría (si el nombre nuevo ya existía, se fusionan).
+        """
+        old_cat, new_cat = self.normalize(old_cat), self.normalize(new_cat)
+        if old_cat not in self._positions or old_cat == new_cat:
+            return
+        pos = self._positions.pop(old_cat)
+        if new_cat in self._positions:
+            pos = np.union1d(self._positions[new_cat], pos)
+        self._positions[new_cat] = pos
+        self._clear_lists()
+
+    def rekey(self, position, sku):
+        """
+        Registra un cambio de SKU en la fila 'position'. Si el SKU nuevo está vacío o ya lo usa
+        otro producto, la fila conserva su clave (la réplica local hace lo mismo, ver catalog_store).
+        """
+        key = rekeyed(self._keys[position], sku, self._key_pos)
+        del self._key_pos[self._keys[position]]
+        self._keys[position] = key
+        self._key_pos[key] = position
@@ -0,0 +1,66 @@
+# catalog_schema.py
+import sys
+
+import pandas as pd
+
+# Columnas con pocos valores distintos repetidos en muchas filas: se guardan como categóricas
+CATEGORICAL_COLUMNS = ["CATEGORIA", "MARCA", "KG / UNIDAD", "STOCK"]
+# Precios y costos: float64 (float32 solo guarda centavos exactos por debajo de ~131.072)
+FLOAT_COLUMNS = ["PRECIO VENTA", "COSTO"]
+# Claves de producto: strings internados (un solo objeto por SKU en todo el proceso)
+INTERNED_COLUMNS = ["SKU"]
+
+def apply_schema(df):
+    """
+    Aplica el esquema tipado del catálogo y retorna el DataFrame convertido:
+      - CATEGORIA, MARCA, KG / UNIDAD y STOCK categóricas (texto sin espacios sobrantes;
+        el valor de STOCK no se reinterpreta: '-', '0' o lo que tenga la hoja),
+      - PRECIO VENTA y COSTO float64 (numéricos; vacíos o inválidos -> NaN, no 0),
+      - SKU con strings internados.
+    Las columnas que no existen se ignoran; el resto queda igual.
+    """
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            texto = df[col].astype(object).where(df[col].notna(), "").astype(str).str.strip()
+            df[col] = texto.astype("category")
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in INTERNED_COLUMNS:
+        if col in df.columns:
+            texto = df[col].astype(object).where(df[col].notna(), "").astype(str)
+            df[col] = pd.Series([sys.intern(v) for v in texto], index=df.index, dtype=object)
+    return df
+
+def ensure_categories(df, col, values):
+    """
+    Agrega a una columna categórica los valores nuevos que se van a asignar,
+    para que las asignaciones con .at/.loc no fallen. No hace nada si la columna no es categórica.
+    """
+    if col not in df.columns or not isinstance(df[col].dtype, pd.CategoricalDtype):
+        return
+    nuevos = [v for v in dict.fromkeys(values) if pd.notna(v) and v not in df[col].cat.categories]
+    if nuevos:
+        df[col] = df[col].cat.add_categories(nuevos)
+
+def memory_report(df_before, df_after):
+    """
+    Compara el uso de memoria (bytes, incluyendo strings) por columna antes y después del esquema.
+    """
+    antes = df_before.memory_usage(deep=True, index=False)
+    despues = df_after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({"antes (KB)": antes / 1024, "después (KB)": despues / 1024})
+    report.loc["TOTAL"] = report.sum()
+    report["ahorro (%)"] = (1 - report["después (KB)"] / report["antes (KB)"]) * 100
+    return report.round(1)
+
+if __name__ == "__main__":
+    # Reporte de memoria sobre un catálogo sintético: python catalog_schema.py [filas]
+    from benchmark_io import generar_catalogo
+    from price_parser import parse_prices
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    crudo = generar_catalogo(n_rows).astype(str).astype(object)
+    crudo["PRECIO VENTA"] = parse_prices(crudo["PRECIO VENTA"])[0]
+    print(memory_report(crudo, apply_schema(crudo)).to_string())
@@ -0,0 +1,398 @@
+# catalog_store.py
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+import numpy as np
+import pandas as pd
+
+from catalog_index import is_generated_key, make_keys, rekeyed
+from catalog_schema import apply_schema
+
+DB_PATH = "catalogo.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS synced (position INTEGER PRIMARY KEY, sku TEXT, data TEXT NOT NULL, key TEXT);
+CREATE INDEX IF NOT EXISTS idx_synced_sku ON synced (sku);
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    op TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    changes TEXT NOT NULL DEFAULT '[]',
+    pushed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def _json_default(value):
+    """
+    Permite serializar escalares de numpy/pandas (np.int64, Timestamp, etc.).
+    """
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+def _dumps(value):
+    return json.dumps(value, default=_json_default, ensure_ascii=False)
+
+# --------------------------
+# Cambios por fila
+# --------------------------
+# Cada edición del journal es una lista de cambios por fila, identificadas por su clave
+# (el SKU; los productos sin SKU usan el ID generado "#..." de CatalogIndex, que se guarda
+# en la réplica junto a la fila para que no dependa de la posición):
+#   ["set", clave, {columna: valor}]              celdas modificadas
+#   ["insert", clave, {columna: valor}, anterior] fila nueva, a continuación de la clave 'anterior' (None = al principio)
+#   ["delete", clave]                             fila eliminada
+#   ["order", [claves]]                           orden nuevo del catálogo
+#   ["replace", columnas, filas, claves]          catálogo completo (migraciones, volver a la hoja)
+
+def row_values(df, position):
+    """
+    Valores de la fila 'position' como dict serializable (NaN -> None).
+    """
+    fila = df.iloc[position]
+    return {col: (None if pd.isna(val) else val) for col, val in fila.items()}
+
+def diff_changes(old_df, old_keys, new_df, new_keys):
+    """
+    Cambios por fila que llevan de old_df a new_df (para ediciones que no describen sus
+    propios cambios, como deshacer/rehacer). Las celdas se comparan en forma vectorizada.
+    """
+    old_pos = {key: pos for pos, key in enumerate(old_keys)}
+    nuevas = set(new_keys)
+    changes = [["delete", key] for key in old_keys if key not in nuevas]
+    for pos, key in enumerate(new_keys):
+        if key not in old_pos:
+            changes.append(["insert", key, row_values(new_df, pos), new_keys[pos - 1] if pos else None])
+
+    comunes = [(old_pos[key], pos) for pos, key in enumerate(new_keys) if key in old_pos]
+    if comunes:
+        viejas, actuales = (np.asarray(p, dtype=np.int64) for p in zip(*comunes))
+        antes = old_df.reindex(columns=new_df.columns).iloc[viejas].astype(object)
+        despues = new_df.iloc[actuales].astype(object)
+        antes = antes.where(antes.notna(), None).to_numpy()
+        despues = despues.where(despues.notna(), None).to_numpy()
+        distinto = antes != despues
+        columnas = new_df.columns
+        for fila in np.flatnonzero(distinto.any(axis=1)):
+            cols = np.flatnonzero(distinto[fila])
+            data = {columnas[c]: despues[fila, c] for c in cols}
+            changes.append(["set", new_keys[actuales[fila]], data])
+        if (np.diff(viejas) < 0).any():
+            changes.append(["order", list(new_keys)])
+    return changes
+
+def apply_changes(df, keys, changes):
+    """
+    Aplica una secuencia de cambios por fila (ver arriba) sobre df, cuyas filas tienen las
+    claves 'keys', y retorna (DataFrame resultante, claves). Los cambios sobre claves que ya
+    no existen (p.ej. un producto que otra sesión eliminó) se ignoran.
+    """
+    if not changes:
+        return df, list(keys)
+    columns = list(df.columns)
+    rows = dict(zip(keys, df.astype(object).where(df.notna(), None).to_dict("records")))
+    orden = list(keys)
+
+    def agregar_columnas(data):
+        for col in data:
+            if col not in columns:
+                columns.append(col)
+
+    for change in changes:
+        kind = change[0]
+        if kind == "set":
+            _, key, data = change
+            if key in rows:
+                agregar_columnas(data)
+                rows[key].update(data)
+                if "SKU" in data:
+                    # Cambio de SKU: la fila pasa a identificarse por el SKU nuevo (como en CatalogIndex.rekey)
+                    nueva = rekeyed(key, data["SKU"], rows)
+                    if nueva != key:
+                        rows[nueva] = rows.pop(key)
+                        orden[orden.index(key)] = nueva
+        elif kind == "insert":
+            _, key, data, anterior = change
+            agregar_columnas(data)
+            if key in orden:
+                orden.remove(key)
+            rows[key] = dict(data)
+            if anterior is None:
+                pos = 0
+            elif anterior in rows:
+                pos = orden.index(anterior) + 1
+            else:
+                pos = len(orden)
+            orden.insert(pos, key)
+        elif kind == "delete":
+            rows.pop(change[1], None)
+        elif kind == "order":
+            nuevo = [key for key in dict.fromkeys(change[1]) if key in rows]
+            listadas = set(nuevo)
+            # Las filas que la edición no conocía (altas de otra sesión) quedan al final
+            orden = nuevo + [key for key in orden if key in rows and key not in listadas]
+        elif kind == "replace":
+            columns, valores = list(change[1]), change[2]
+            reemplazo = pd.DataFrame(valores, columns=columns)
+            if len(change) > 3:
+                claves = change[3]
+            else:
+                # Ediciones registradas antes de guardar las claves
+                claves = make_keys(reemplazo["SKU"] if "SKU" in reemplazo.columns else [""] * len(reemplazo))
+            rows = dict(zip(claves, reemplazo.to_dict("records")))
+            orden = list(claves)
+
+    vivas = [key for key in dict.fromkeys(orden) if key in rows]
+    return apply_schema(pd.DataFrame([rows[key] for key in vivas], columns=columns)), vivas
+
+def _catalog_hash(df):
+    """
+    Huella del contenido del catálogo, para saber si una lectura de la hoja trae algo nuevo.
+    """
+    valores = df.astype(object).where(df.notna(), "").astype(str)
+    return str(int(pd.util.hash_pandas_object(valores, index=True).sum() % (1 << 63))) + _dumps(df.columns.tolist())
+
+class CatalogStore:
+    """
+    Réplica local del catálogo en SQLite.
+    - 'synced': última versión que coincide con el spreadsheet (base del push por diferencias).
+    - 'journal': cada edición, en orden, como cambios por fila identificados por SKU,
+      hasta que se sube al spreadsheet.
+    Registrar una edición solo agrega su fila al journal (no se reescribe el catálogo).
+    El estado actual se obtiene aplicando las ediciones pendientes, de todas las sesiones,
+    sobre la versión sincronizada; push_pending sube ese estado en segundo plano.
+    'revision' crece cada vez que cambia la versión sincronizada (push o cambios hechos en la hoja).
+    """
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        with self._transaction() as con:
+            con.executescript(_SCHEMA)
+            columnas = {row[1] for row in con.execute("PRAGMA table_info(journal)")}
+            if "changes" not in columnas:
+                # Bases creadas antes de journalizar los cambios por fila
+                con.execute("ALTER TABLE journal ADD COLUMN changes TEXT NOT NULL DEFAULT '[]'")
+            if "key" not in {row[1] for row in con.execute("PRAGMA table_info(synced)")}:
+                # Bases creadas antes de guardar la clave de cada fila
+                con.execute("ALTER TABLE synced ADD COLUMN key TEXT")
+
+    @contextmanager
+    def _transaction(self):
+        with closing(sqlite3.connect(self.path, timeout=30)) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:
+                yield con
+
+    # --------------------------
+    # Versión sincronizada
+    # --------------------------
+
+    def _meta(self, con, key):
+        row = con.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _set_meta(self, con, key, value):
+        con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @staticmethod
+    def _row_data(df):
+        # Texto JSON de cada fila, tal como se guarda en 'synced'
+        values = df.astype(object)
+        values = values.where(pd.notnull(values), None)
+        return [_dumps(row) for row in values.values.tolist()]
+
+    def _write_synced(self, con, df, keys):
+        sku = df["SKU"].astype(object).where(df["SKU"].notna(), None).tolist() if "SKU" in df.columns else [None] * len(df)
+        rows = zip(range(len(df)), sku, self._row_data(df), keys)
+        con.execute("DELETE FROM synced")
+        con.executemany("INSERT INTO synced (position, sku, data, key) VALUES (?, ?, ?, ?)", rows)
+        self._set_meta(con, "synced_columns", _dumps(df.columns.tolist()))
+        self._set_meta(con, "synced_hash", _catalog_hash(df))
+        self._set_meta(con, "revision", str(int(self._meta(con, "revision") or 0) + 1))
+
+    def _read_synced(self, con):
+        """
+        Retorna (versión sincronizada, claves de sus filas), o None si todavía no hay ninguna.
+        """
+        columns = self._meta(con, "synced_columns")
+        if columns is None:
+            return None
+        rows = con.execute("SELECT data, key FROM synced ORDER BY position").fetchall()
+        df = apply_schema(pd.DataFrame([json.loads(data) for data, _ in rows], columns=json.loads(columns)))
+        keys = [key for _, key in rows]
+        if None in keys:
+            # Bases creadas antes de guardar la clave de cada fila
+            keys = make_keys(df["SKU"] if "SKU" in df.columns else [""] * len(df))
+            con.executemany("UPDATE synced SET key = ? WHERE position = ?", [(key, pos) for pos, key in enumerate(keys)])
+        return df, keys
+
+    def _sheet_keys(self, con, df):
+        """
+        Claves de las filas leídas de la hoja: el SKU, como en CatalogIndex. Las filas sin SKU
+        (o con SKU repetido) recuperan el ID guardado de la fila sincronizada con el mismo
+        contenido, así las ediciones pendientes y las sesiones siguen apuntando al mismo
+        producto aunque en la hoja se hayan borrado o reordenado filas. Las que no coinciden
+        con ninguna (filas nuevas o editadas en la hoja) reciben un ID nuevo.
+        """
+        keys = make_keys(df["SKU"] if "SKU" in df.columns else [""] * len(df))
+        generadas = [pos for pos, key in enumerate(keys) if is_generated_key(key)]
+        if not generadas:
+            return keys
+        anteriores = {}
+        for key, data in con.execute("SELECT key, data FROM synced WHERE key LIKE '#%' ORDER BY position"):
+            anteriores.setdefault(data, []).append(key)
+        datos = self._row_data(df.iloc[generadas])
+        for pos, data in zip(generadas, datos):
+            candidatas = anteriores.get(data)
+            if candidatas:
+                keys[pos] = candidatas.pop(0)
+        return keys
+
+    def has_catalog(self):
+        with self._transaction() as con:
+            return self._meta(con, "synced_columns") is not None
+
+    def revision(self):
+        """
+        Revisión de la versión sincronizada (0 si todavía no hay ninguna).
+        """
+        with self._transaction() as con:
+            return int(self._meta(con, "revision") or 0)
+
+    def load_synced(self):
+        """
+        Devuelve (última versión que coincide con el spreadsheet, claves de sus filas),
+        o None si no se conoce.
+        """
+        with self._transaction() as con:
+            return self._read_synced(con)
+
+    def synced_keys(self):
+        """
+        Claves de las filas de la versión sincronizada, en orden.
+        """
+        with self._transaction() as con:
+            return [key for (key,) in con.execute("SELECT key FROM synced ORDER BY position")]
+
+    def load_catalog(self):
+        """
+        Devuelve (catálogo actual, claves de sus filas): la versión sincronizada con las
+        ediciones pendientes aplicadas (o None si todavía no se descargó nunca).
+        """
+        with self._transaction() as con:
+            synced = self._read_synced(con)
+            entries = self._pending(con)
+        if synced is None:
+            return None
+        return apply_changes(*synced, [change for entry in entries for change in entry["changes"]])
+
+    def mirror_from_sheet(self, df):
+        """
+        Toma los datos leídos del spreadsheet como nueva versión sincronizada. Las ediciones
+        pendientes no se pierden: se vuelven a aplicar sobre esta versión al subirlas.
+        Retorna False si la hoja no cambió desde la última versión sincronizada.
+        """
+        with self._transaction() as con:
+            if self._meta(con, "synced_hash") == _catalog_hash(df):
+                return False
+            self._write_synced(con, df, self._sheet_keys(con, df))
+            con.execute("DELETE FROM meta WHERE key = 'synced_stale'")
+        return True
+
+    def invalidate_synced(self):
+        """
+        Se llama cuando el spreadsheet se modificó por fuera del push (p.ej. borrado de filas):
+        las posiciones de la versión sincronizada ya no coinciden con la hoja y la próxima
+        subida será completa.
+        """
+        with self._transaction() as con:
+            self._set_meta(con, "synced_stale", "1")
+
+    # --------------------------
+    # Journal
+    # --------------------------
+
+    def commit(self, op, payload, changes):
+        """
+        Registra una edición en el journal: 'changes' son sus cambios por fila (ver arriba).
+        """
+        with self._transaction() as con:
+            con.execute(
+                "INSERT INTO journal (created_at, op, payload, changes) VALUES (?, ?, ?, ?)",
+                (time.time(), op, _dumps(payload), _dumps(changes))
+            )
+
+    def _pending(self, con):
+        rows = con.execute(
+            "SELECT id, created_at, op, payload, changes FROM journal WHERE pushed = 0 ORDER BY id"
+        ).fetchall()
+        return [
+            {"id": id_, "created_at": created_at, "op": op,
+             "payload": json.loads(payload), "changes": json.loads(changes)}
+            for id_, created_at, op, payload, changes in rows
+        ]
+
+    def pending(self):
+        """
+        Devuelve las ediciones que todavía no se subieron al spreadsheet, en orden.
+        """
+        with self._transaction() as con:
+            return self._pending(con)
+
+    def push_pending(self, spreadsheet_url, progress=None):
+        """
+        Sube al spreadsheet las ediciones pendientes: se aplican, en orden, sobre la última
+        versión sincronizada y se envían solo las diferencias. Retorna la cantidad de ediciones subidas.
+        'progress' es un callback opcional progress(fracción, mensaje).
+        """
+        from sheet_connector import update_spreadsheet
+
+        with self._transaction() as con:
+            synced = self._read_synced(con)
+            entries = self._pending(con)
+            full = self._meta(con, "synced_stale") is not None
+        if not entries or synced is None:
+            return 0
+        base_df, base_keys = synced
+        if progress:
+            progress(0.2, f"Aplicando {len(entries)} edición(es) pendiente(s)")
+        df, keys = apply_changes(base_df, base_keys, [change for entry in entries for change in entry["changes"]])
+        if progress:
+            progress(0.4, "Subiendo cambios al spreadsheet")
+        update_spreadsheet(spreadsheet_url, df, base_df=None if full else base_df, full=full,
+                           base_keys=base_keys, keys=keys)
+        with self._transaction() as con:
+            con.executemany("UPDATE journal SET pushed = 1 WHERE id = ?", [(entry["id"],) for entry in entries])
+            self._write_synced(con, df, keys)
+            con.execute("DELETE FROM meta WHERE key = 'synced_stale'")
+        return len(entries)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(path=DB_PATH):
+    """
+    Devuelve el CatalogStore del proceso para 'path' (compartido entre sesiones).
+    """
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = CatalogStore(path)
+        return _stores[path]
+
+def sync_store(spreadsheet_url, path=DB_PATH, progress=None):
+    """
+    Paso de sincronización en segundo plano: primero trae los cambios hechos en el spreadsheet
+    (solo descarga si cambió la revisión) y después sube las ediciones pendientes aplicadas
+    sobre esa versión.
+    """
+    from sheet_connector import get_data_from_sheet
+
+    store = get_store(path)
+    if progress:
+        progress(0.15, "Verificando cambios en el spreadsheet")
+    store.mirror_from_sheet(get_data_from_sheet(spreadsheet_url))
+    return store.push_pending(spreadsheet_url, progress=progress)
@@ -1,6 +1,7 @@
 # category_manager.py
 import streamlit as st
 import pandas as pd
+import data_ops
 
 class CategoryManager:
     def __init__(self):
@@ -10,22 +11,28 @@ class CategoryManager:
 
     def move_products(self):
         st.subheader("Mover Productos entre Categorías")
+        # Búsqueda fuera del form para que los resultados se actualicen al escribir
+        busqueda = st.text_input("Buscar productos (nombre, marca, categoría o SKU)", key="move_busqueda")
         with st.form(key="move_cat_form"):
-            # Selección de categoría de origen
-            source_cat = st.selectbox(
-                "Categoría de origen",
-                options=self.df["CATEGORIA"].astype(str).str.strip().drop_duplicates()
-            )
-            df_source = self.df[self.df["CATEGORIA"].astype(str).str.strip() == source_cat]
-            if df_source.empty:
+            if busqueda.strip():
+                source_cat = None
+                df_source = None
+            else:
+                # Selección de categoría de origen
+                source_cat = st.selectbox(
+                    "Categoría de origen",
+                    options=data_ops.categories()
+                )
+                df_source = data_ops.category_rows(source_cat)
+            if df_source is not None and df_source.empty:
                 st.info("No hay productos en la categoría de origen seleccionada.")
             else:
-                # Mostrar productos de la categoría de origen
-                options = df_source.apply(lambda row: f"{row.name} - {row['PRODUCTO']}", axis=1).tolist()
-                products_to_move = st.multiselect("Productos a mover", options=options)
+                # Mostrar los productos encontrados o los de la categoría de origen
+                options = data_ops.product_options(busqueda, source_cat, st.session_state.get("move_products_multiselect", []))
+                products_to_move = st.multiselect("Productos a mover", options=options, format_func=data_ops.product_label, key="move_products_multiselect")
                 
                 # Seleccionar la categoría destino
-                cat_list = self.df["CATEGORIA"].astype(str).str.strip().drop_duplicates().tolist()
+                cat_list = data_ops.categories()
                 dest_cat = st.selectbox("Categoría de destino", options=cat_list)
                 
                 submitted = st.form_submit_button("Mover Productos")
@@ -33,14 +40,14 @@ class CategoryManager:
                     if not products_to_move:
                         st.warning("No seleccionaste productos.")
                     else:
-                        indices = [int(item.split(" - ")[0]) for item in products_to_move]
-                        st.session_state.df.loc[indices, "CATEGORIA"] = dest_cat
+                        indices = data_ops.positions_of(products_to_move)
+                        data_ops.move_products(indices, dest_cat)
                         st.success("Productos movidos correctamente.")
                         st.dataframe(st.session_state.df)
 
     def delete_category(self):
         st.subheader("Eliminar Categoría")
-        cat_list = list(self.df["CATEGORIA"].astype(str).str.strip().drop_duplicates())
+        cat_list = data_ops.categories()
         if not cat_list:
             st.info("No hay categorías para eliminar.")
             return
@@ -48,24 +55,18 @@ class CategoryManager:
             cat_to_delete = st.selectbox("Categoría a eliminar", options=cat_list)
             submitted = st.form_submit_button("Eliminar Categoría")
             if submitted:
-                df_cat = self.df[self.df["CATEGORIA"].astype(str).str.strip() == cat_to_delete]
+                df_cat = data_ops.category_rows(cat_to_delete)
                 if not df_cat.empty:
                     st.warning(f"La categoría '{cat_to_delete}' tiene {len(df_cat)} producto(s). Se eliminarán esos productos.")
-                    st.session_state.df = self.df[self.df["CATEGORIA"].astype(str).str.strip() != cat_to_delete].reset_index(drop=True)
+                    data_ops.delete_category(cat_to_delete)
                 if "category_order" in st.session_state:
                     st.session_state.category_order = [cat for cat in st.session_state.category_order if cat != cat_to_delete]
                 st.success(f"Categoría '{cat_to_delete}' eliminada correctamente.")
                 st.dataframe(st.session_state.df)
-                
-                # Actualizar el spreadsheet eliminando las filas correspondientes a la categoría
-                SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1i4kafAJQvVkKbkVIo5LldsN7R-ApeWhHDKZjBvsguoo/edit?gid=0#gid=0"
-                from sheet_connector import SheetConnector
-                connector = SheetConnector(SPREADSHEET_URL)
-                connector.delete_category_rows(cat_to_delete)
 
     def modify_category(self):
         st.subheader("Modificar Nombre de Categoría")
-        cat_list = sorted(self.df["CATEGORIA"].astype(str).str.strip().drop_duplicates().tolist())
+        cat_list = data_ops.categories(sort=True)
         if not cat_list:
             st.info("No hay categorías para modificar.")
             return
@@ -74,10 +75,7 @@ class CategoryManager:
             new_cat = st.text_input("Nuevo nombre para la categoría", value=old_cat)
             submitted = st.form_submit_button("Modificar Categoría")
             if submitted:
-                st.session_state.df.loc[
-                    st.session_state.df["CATEGORIA"].astype(str).str.strip() == old_cat,
-                    "CATEGORIA"
-                ] = new_cat
+                data_ops.rename_category(old_cat, new_cat)
                 st.success(f"Categoría '{old_cat}' modificada a '{new_cat}'.")
                 if "category_order" in st.session_state:
                     st.session_state.category_order = [
@@ -89,22 +87,14 @@ class CategoryManager:
         st.subheader("Configurar Fraccionamiento")
 
         # Mostrar todas las categorías disponibles
-        cat_options = self.df["CATEGORIA"].astype(str).str.strip().drop_duplicates().tolist()
+        cat_options = data_ops.categories()
         selected_cat = st.selectbox("Selecciona la categoría", options=cat_options)
         
-        # Filtrar productos KG de la categoría elegida
-        mask_kg = (
-            (self.df["CATEGORIA"].astype(str).str.strip() == selected_cat) &
-            (self.df["KG / UNIDAD"].astype(str).str.strip().str.upper() == "KG")
-        )
-        df_cat_kg = self.df[mask_kg]
+        # Filtrar productos KG de la categoría elegida (solo se recorren las filas de esa categoría)
+        df_cat_kg = data_ops.category_rows_by_type(selected_cat, "KG")
 
         # Verificamos si hay productos en esa categoría con UNIDAD
-        mask_unidad = (
-            (self.df["CATEGORIA"].astype(str).str.strip() == selected_cat) &
-            (self.df["KG / UNIDAD"].astype(str).str.strip().str.upper() == "UNIDAD")
-        )
-        df_cat_unidad = self.df[mask_unidad]
+        df_cat_unidad = data_ops.category_rows_by_type(selected_cat, "UNIDAD")
 
         # Si no hay productos en KG, no se aplica fraccionamiento
         if df_cat_kg.empty:
@@ -162,10 +152,10 @@ class CategoryManager:
             fracc_str = ", ".join(fracc_values)
             
             # Actualizamos la columna FRACCIONAMIENTO solo en productos KG de la categoría
-            self.df.loc[mask_kg, "FRACCIONAMIENTO"] = fracc_str
+            data_ops.set_values(df_cat_kg.index.tolist(), "FRACCIONAMIENTO", fracc_str)
             
             st.success(f"Fraccionamiento '{fracc_str}' aplicado a los productos medidos en KG de la categoría '{selected_cat}'.")
-            st.dataframe(self.df[mask_kg])
+            st.dataframe(st.session_state.df.loc[df_cat_kg.index])
 
                 
     def manage_categories(self):
@@ -1,12 +1,13 @@
 import streamlit as st
 import pandas as pd
+import data_ops
 
 def reorder_categories():
     st.header("Reordenar Categorías")
     # Obtener las categorías actuales del DataFrame en session_state
     # Se asume que ya tienes st.session_state.df cargado
     df = st.session_state.df
-    cat_list = list(df["CATEGORIA"].astype(str).str.strip().drop_duplicates())
+    cat_list = data_ops.categories()
     
     with st.form(key="reorder_form"):
         new_order = []
@@ -22,14 +23,7 @@ def reorder_categories():
                 st.error("Cada posición debe tener una categoría única. Por favor, revisa la selección.")
             else:
                 st.session_state.category_order = new_order
-                # Convertir la columna "CATEGORIA" del DataFrame a tipo categórico con este orden
-                st.session_state.df["CATEGORIA"] = pd.Categorical(
-                    st.session_state.df["CATEGORIA"].astype(str).str.strip(),
-                    categories=new_order,
-                    ordered=True
-                )
-                st.session_state.df.sort_values(by=["CATEGORIA", "PRODUCTO"], inplace=True)
-                st.session_state.df.reset_index(drop=True, inplace=True)
+                data_ops.reorder_categories(new_order)
                 st.success("Orden de categorías actualizado correctamente.")
                 st.dataframe(st.session_state.df)
     return st.session_state.get("category_order", cat_list)
@@ -1,6 +1,11 @@
+import bisect
+import io
+import zipfile
+import numpy as np
 import pandas as pd
 import re
-from collections import defaultdict
+import price_parser
+from sku_generator import get_sku_registry
 
 # --------------------------
 # CONFIGURACIÓN GENERAL
@@ -8,6 +13,8 @@ from collections import defaultdict
 INPUT_CSV = 'LISTA PRECIOS - PRODUCTOS.csv'   # Archivo de entrada
 OUTPUT_CSV = 'productos_tiendanube.csv'       # Archivo de salida
 ENCODING = 'utf-8'                            # Ajusta si tu archivo usa otro encoding
+MAX_FILAS_POR_ARCHIVO = None                  # p.ej. 10000 para partir el export en varios archivos
+FILAS_POR_TRAMO = 5000                        # Productos que se procesan y escriben por tramo
 
 MOSTRAR_EN_TIENDA = 'SÍ'
 ENVIO_SIN_CARGO = 'SÍ'
@@ -18,308 +25,418 @@ ALTO = 0
 ANCHO = 0
 PROFUNDIDAD = 0
 
-# --------------------------
-# VARIABLES GLOBALES PARA CATE
-# --------------------------
-categoria_code_mapping = {}  # Mapea nombre de categoría a código único
-used_categoria_codes = {}    # Mapea código usado a categoría
-
-def generar_codigo_categoria(categoria):
-    """
-    Genera un código único para la categoría.
-    Se parte de las primeras 3 letras (sin espacios, en mayúscula) y se extiende si ya existe.
-    """
-    cat = categoria.strip().upper().replace(" ", "")
-    # Si ya está asignado para esta categoría, retornarlo.
-    if categoria in categoria_code_mapping:
-        return categoria_code_mapping[categoria]
-    
-    # Empezar con 3 letras (o lo que tenga si es más corto)
-    length = 3 if len(cat) >= 3 else len(cat)
-    code_candidate = cat[:length]
-    
-    # Extender el código si ya existe asignado a otra categoría.
-    while True:
-        if code_candidate not in used_categoria_codes:
-            used_categoria_codes[code_candidate] = categoria
-            categoria_code_mapping[categoria] = code_candidate
-            return code_candidate
-        else:
-            # Si ya está asignado a esta misma categoría, retornarlo.
-            if used_categoria_codes[code_candidate] == categoria:
-                categoria_code_mapping[categoria] = code_candidate
-                return code_candidate
-            # Si se puede extender, aumentar la longitud.
-            if length < len(cat):
-                length += 1
-                code_candidate = cat[:length]
-            else:
-                # Si ya usamos todo el nombre, agregar un sufijo numérico
-                suffix = 1
-                while f"{code_candidate}{suffix}" in used_categoria_codes:
-                    suffix += 1
-                new_code = f"{code_candidate}{suffix}"
-                used_categoria_codes[new_code] = categoria
-                categoria_code_mapping[categoria] = new_code
-                return new_code
+# Columnas requeridas por Tienda Nube (de A a AD)
+COLUMNAS = [
+    "Identificador de URL",
+    "Nombre",
+    "Categorías",
+    "Nombre de propiedad 1",
+    "Valor de propiedad 1",
+    "Nombre de propiedad 2",
+    "Valor de propiedad 2",
+    "Nombre de propiedad 3",
+    "Valor de propiedad 3",
+    "Precio",
+    "Precio promocional",
+    "Peso (kg)",
+    "Alto (cm)",
+    "Ancho (cm)",
+    "Profundidad (cm)",
+    "Stock",
+    "SKU",
+    "Código de barras",
+    "Mostrar en tienda",
+    "Envío sin cargo",
+    "Descripción",
+    "Tags",
+    "Título para SEO",
+    "Descripción para SEO",
+    "Marca",
+    "Producto Físico",
+    "MPN (Número de pieza del fabricante)",
+    "Sexo",
+    "Rango de edad",
+    "Costo"
+]
+
+# Variantes de los productos por KG: (fraccionamiento, factor de precio, peso en kg)
+VARIANTES_KG = [('250g', 0.25, 0.250), ('500g', 0.50, 0.500), ('1kg', 1.0, 1.000)]
 
 # --------------------------
 # FUNCIONES DE UTILIDAD
 # --------------------------
 
-def parse_price(price_str):
-    """
-    Convierte la cadena de precio en float.
-    - Elimina símbolos de moneda como '$'.
-    - Elimina separadores de miles (p.ej. si "7.400" significa 7400).
-    - Sustituye comas por puntos si existieran (ej. 7,4 -> 7.4).
-    """
-    price_str = price_str.replace('$', '').strip()
-    price_str = price_str.replace('.', '')  # Asumiendo que "7.400" significa 7400
-    # price_str = price_str.replace(',', '.')  # Descomenta si usas coma como decimal
-    return float(price_str)
-
-def generar_slug(nombre):
-    """
-    Genera un identificador de URL a partir del nombre del producto.
-    Elimina acentos, signos y reemplaza espacios por guiones.
-    """
-    nombre = nombre.lower().strip()
-    nombre = re.sub(r'[áàä]', 'a', nombre)
-    nombre = re.sub(r'[éèë]', 'e', nombre)
-    nombre = re.sub(r'[íìï]', 'i', nombre)
-    nombre = re.sub(r'[óòö]', 'o', nombre)
-    nombre = re.sub(r'[úùü]', 'u', nombre)
-    nombre = re.sub(r'[^a-z0-9\s-]', '', nombre)
-    nombre = re.sub(r'\s+', '-', nombre)
-    return nombre
-
-def generar_sku(nombre_producto, categoria, variante, used_skus):
-    """
-    Genera un SKU siguiendo la estructura:
-    CATE-TIPO-FRACC
-    Donde:
-      - CATE: código único de la categoría (generado dinámicamente)
-      - TIPO: primeras 4 letras significativas del nombre del producto
-      - FRACC: código de fraccionamiento (250G, 500G, 1KG o UNI)
-    Y asegura su unicidad en used_skus.
-    """
-    # Código de categoría único
-    cate_code = generar_codigo_categoria(categoria)
-    
-    # Procesar nombre del producto: quitar espacios y tomar primeras 4 letras
-    nombre_norm = re.sub(r'\s+', '', nombre_producto).upper()
-    tipo_code = nombre_norm[:4] if len(nombre_norm) >= 4 else nombre_norm
-    
-    # Código de fraccionamiento
+def codigo_fraccion(variante):
+    """
+    Código de fraccionamiento de una variante del export: 250G, 500G, 1KG o UNI.
+    """
     if variante.lower() == '1kg':
-        frac_code = '1KG'
-    elif variante.lower() == 'unidad':
-        frac_code = 'UNI'
-    else:
-        frac_code = re.sub(r'[^0-9]', '', variante) + 'G'
-    
-    # SKU base
-    base_sku = f"{cate_code}-{tipo_code}-{frac_code}"
-    
-    # Asegurar unicidad
-    used_skus[base_sku] += 1
-    if used_skus[base_sku] > 1:
-        return f"{base_sku}{used_skus[base_sku]}"
-    else:
-        return base_sku
-
-def calcular_variantes(precio_base):
-    """
-    Para productos vendidos por KG, genera tres variantes:
-    250g, 500g, 1kg, con su precio, peso y costo correspondientes.
-    """
-    variantes = []
-    for frac, factor, peso in [('250g', 0.25, 0.250), ('500g', 0.50, 0.500), ('1kg', 1.0, 1.000)]:
-        precio = round(precio_base * factor, 2)
-        variantes.append({
-            'fraccionamiento': frac,
-            'precio': precio,
-            'peso': peso,
-            'costo': precio
-        })
-    return variantes
-
-def procesar_stock(stock_val):
-    """
-    - '-' => stock ilimitado (dejar en blanco)
-    - '0' => sin stock
-    - Otro número => stock específico
-    """
-    stock_val = str(stock_val).strip()
-    if stock_val == '-':
-        return '-'  # Tienda Nube interpreta vacío como stock ilimitado
-    else:
-        return stock_val
+        return '1KG'
+    if variante.lower() == 'unidad':
+        return 'UNI'
+    return re.sub(r'[^0-9]', '', variante) + 'G'
 
 # --------------------------
 # PROCESAMIENTO PRINCIPAL
 # --------------------------
 
-def procesar_producto(producto, used_skus):
-    """
-    Genera registros (filas) para un producto según sea KG o UNIDAD,
-    usando la nueva generación de SKU que incorpora el código de categoría
-    y asegurando unicidad con used_skus.
-    """
-    registros = []
-
-    nombre = str(producto['PRODUCTO']).strip()
-    precio_str = str(producto['PRECIO VENTA']).strip()
-    tipo = str(producto['KG / UNIDAD']).strip().upper()  # 'KG' o 'UNIDAD'
-    categoria = str(producto['CATEGORIA']).strip()
-    marca = str(producto.get('MARCA', '')).strip()
-    stock_str = str(producto.get('STOCK', '')).strip()
-
-    # Convertir precio a float
-    precio_base = parse_price(precio_str)
-
-    # Procesar stock
-    stock_final = procesar_stock(stock_str)
-
-    # Slug y descripciones
-    slug = generar_slug(nombre)
-    descripcion = f"Descripción corta de {nombre}"
-    tags = generar_slug(nombre).replace('-', ' ')
-
-    if tipo == 'KG':
-        variantes = calcular_variantes(precio_base)
-        for var in variantes:
-            frac = var['fraccionamiento']
-            precio = var['precio']
-            peso = var['peso']
-            costo = var['costo']
-
-            # Generar SKU con la nueva estructura
-            sku = generar_sku(nombre, categoria, frac, used_skus)
-
-            registro = [
-                slug,                          # Identificador de URL
-                nombre,                        # Nombre
-                categoria,                     # Categorías
-                "Fraccionamiento",             # Nombre de propiedad 1
-                frac,                          # Valor de propiedad 1
-                "", "", "", "",                # Propiedades 2 y 3 vacías
-                precio,                        # Precio
-                "",                            # Precio promocional
-                peso,                          # Peso (kg)
-                ALTO,                          # Alto (cm)
-                ANCHO,                         # Ancho (cm)
-                PROFUNDIDAD,                   # Profundidad (cm)
-                stock_final,                   # Stock
-                sku,                           # SKU único
-                "",                            # Código de barras
-                MOSTRAR_EN_TIENDA,
-                ENVIO_SIN_CARGO,
-                descripcion,
-                tags,
-                f"{nombre} {frac} - {categoria}",
-                f"Compra {nombre} en presentación de {frac}. Envío sin cargo.",
-                marca,
-                PRODUCTO_FISICO,
-                "",
-                SEXO,
-                RANGO_EDAD,
-                costo
-            ]
-            registros.append(registro)
-
-    elif tipo == 'UNIDAD':
-        sku = generar_sku(nombre, categoria, 'Unidad', used_skus)
-        precio = round(precio_base, 2)
-        registro = [
-            slug,
-            nombre,
-            categoria,
-            "Presentación",
-            "Unidad",
-            "", "", "", "",
-            precio,
-            "",
-            1,  # Peso (kg) -> ajusta si corresponde
-            ALTO,
-            ANCHO,
-            PROFUNDIDAD,
-            stock_final,
-            sku,
-            "",
-            MOSTRAR_EN_TIENDA,
-            ENVIO_SIN_CARGO,
-            descripcion,
-            tags,
-            f"{nombre} - {categoria}",
-            f"Compra {nombre}. Envío sin cargo.",
-            marca,
-            PRODUCTO_FISICO,
-            "",
-            SEXO,
-            RANGO_EDAD,
-            precio
-        ]
-        registros.append(registro)
-
-    else:
-        print(f"Tipo no reconocido: {tipo} para producto '{nombre}'")
-
-    return registros
+def _texto(serie):
+    """
+    Columna como str de Python sin espacios alrededor (igual que str(valor).strip() fila por fila).
+    """
+    return serie.astype(object).map(str).str.strip()
+
+# Vocales acentuadas -> sin acento, en una sola pasada (str.translate) en lugar de un reemplazo por vocal
+_SIN_ACENTOS = str.maketrans("áàäéèëíìïóòöúùü", "aaaeeeiiiooouuu")
+
+def generar_slugs(nombres):
+    """
+    Identificadores de URL a partir de los nombres de producto: minúsculas, sin acentos ni
+    signos y con guiones en lugar de espacios.
+    """
+    slugs = nombres.astype(object).str.lower().str.strip().str.translate(_SIN_ACENTOS)
+    for patron, reemplazo in [(r'[^a-z0-9\s-]', ''), (r'\s+', '-')]:
+        slugs = slugs.str.replace(patron, reemplazo, regex=True)
+    return slugs
+
+def _redondear(valores):
+    # round() de Python sobre floats de Python (no np.round) para no cambiar los precios ya exportados
+    return [round(valor, 2) for valor in valores.tolist()]
+
+def repeticiones(df):
+    """
+    Cuántas veces apareció antes cada producto (misma CATEGORIA y PRODUCTO) en el catálogo:
+    0 la primera vez, 1 la segunda... Distingue los SKUs de las variantes de productos repetidos.
+    """
+    claves = pd.DataFrame({'c': _texto(df['CATEGORIA']).str.lower(), 'p': _texto(df['PRODUCTO']).str.lower()})
+    return claves.groupby(['c', 'p'], sort=False).cumcount().to_numpy()
+
+def _en_conjunto(valores, conjunto):
+    """
+    Máscara de los valores que están en 'conjunto'. Recorre solo los valores: Series.isin
+    copiaría el conjunto entero en cada tramo y el export se volvería cuadrático.
+    """
+    return np.fromiter(map(conjunto.__contains__, valores.tolist()), dtype=bool, count=len(valores))
+
+def resolver_skus_df(variantes, registry, emitidos=None):
+    """
+    SKU de cada variante: 'variantes' tiene una fila por variante con PRODUCTO, CATEGORIA,
+    TIPO, SKU (la celda del producto), Valor, 'pos' (posición del producto) y 'repeticion'
+    (ver repeticiones).
+    Se reutiliza el SKU guardado en la columna SKU que corresponde a ese fraccionamiento
+    (se buscan con un merge), salvo que otra variante del export ya lo use (la misma celda
+    copiada en dos productos, o un SKU ya escrito en 'emitidos', el conjunto de SKUs de los
+    tramos anteriores). El resto se genera en un solo lote y en el orden del export con el
+    registro compartido (sku_generator.SkuRegistry), que además las recuerda para que
+    conserven su SKU entre exportaciones.
+    """
+    emitidos = set() if emitidos is None else emitidos
+    # codigo_fraccion una vez por valor distinto (250g, 500g, 1kg, Unidad), no por fila
+    valores, unicos = pd.factorize(variantes['Valor'])
+    codigos = np.array([codigo_fraccion(valor) for valor in unicos], dtype=object)[valores]
+    guardados = variantes[['pos', 'SKU']].drop_duplicates('pos')
+    guardados = guardados.assign(sku=guardados['SKU'].astype(object).str.split(',')).explode('sku')
+    guardados['sku'] = guardados['sku'].str.strip()
+    guardados = guardados[guardados['sku'].str.contains('-', regex=False, na=False)]
+    guardados['codigo'] = guardados['sku'].str.rsplit('-', n=1).str[1].str.rstrip('0123456789')
+    guardados = guardados.drop_duplicates(['pos', 'codigo'])
+    skus = (pd.DataFrame({'pos': variantes['pos'].to_numpy(), 'codigo': codigos})
+            .merge(guardados[['pos', 'codigo', 'sku']], on=['pos', 'codigo'], how='left')['sku'])
+    # Un SKU guardado lo conserva solo la primera variante del export que lo usa
+    repetido = skus.duplicated().to_numpy() | _en_conjunto(skus, emitidos)
+    skus = skus.astype(object).where(skus.notna() & ~repetido, None).to_numpy().copy()
+
+    faltantes = np.flatnonzero(pd.isna(skus))
+    if len(faltantes):
+        v = variantes.iloc[faltantes]
+        skus[faltantes] = registry.skus_variantes(
+            v['PRODUCTO'], v['CATEGORIA'], v['Valor'].where(v['TIPO'] != 'UNIDAD', ''), v['TIPO'], v['repeticion']
+        )
+    return skus
+
+def generar_registros(df, registry, avisar=print, repeticion=None, emitidos=None):
+    """
+    Genera las filas del export para todo el catálogo, en orden: los productos por KG se
+    expanden en 250g/500g/1kg (precio, peso y costo según VARIANTES_KG) con un merge y los
+    de UNIDAD llevan una sola fila "Unidad". Slugs, tags, textos de SEO y precios se calculan
+    sobre columnas completas; el STOCK se copia tal cual ('-' = ilimitado, '0' = sin stock).
+    Los productos con un tipo distinto de KG o UNIDAD se omiten y se informan con 'avisar'.
+    'repeticion' y 'emitidos' son los de resolver_skus_df cuando df es un tramo de un catálogo
+    más grande (por defecto se calculan sobre df).
+    Retorna el DataFrame con las COLUMNAS de Tienda Nube.
+    """
+    productos = pd.DataFrame({
+        'PRODUCTO': _texto(df['PRODUCTO']),
+        'CATEGORIA': _texto(df['CATEGORIA']),
+        'TIPO': _texto(df['KG / UNIDAD']).str.upper(),
+        'MARCA': _texto(df['MARCA']) if 'MARCA' in df.columns else '',
+        'Stock': _texto(df['STOCK']) if 'STOCK' in df.columns else '',
+        'SKU': _texto(df['SKU']).where(df['SKU'].notna(), '') if 'SKU' in df.columns else '',
+        'precio_base': df['PRECIO VENTA'].astype(float).to_numpy(),
+        'repeticion': repeticiones(df) if repeticion is None else repeticion,
+    })
+    productos = productos[productos['PRODUCTO'] != '']
+    reconocido = productos['TIPO'].isin(['KG', 'UNIDAD'])
+    for nombre, tipo in zip(productos.loc[~reconocido, 'PRODUCTO'].tolist(), productos.loc[~reconocido, 'TIPO'].tolist()):
+        avisar(f"Tipo no reconocido: {tipo} para producto '{nombre}', se omite.")
+    productos = productos[reconocido]
+    productos['pos'] = range(len(productos))
+    productos['slug'] = generar_slugs(productos['PRODUCTO'])
+
+    # Una fila por variante: KG x VARIANTES_KG y UNIDAD con la variante única "Unidad"
+    fracciones = pd.DataFrame(
+        [('KG', 'Fraccionamiento', frac, factor, peso, orden) for orden, (frac, factor, peso) in enumerate(VARIANTES_KG)]
+        + [('UNIDAD', 'Presentación', 'Unidad', 1.0, 1, 0)],
+        columns=['TIPO', 'Propiedad', 'Valor', 'factor', 'peso', 'orden']
+    )
+    v = productos.merge(fracciones, on='TIPO').sort_values(['pos', 'orden'], kind='stable').reset_index(drop=True)
+    es_kg = (v['TIPO'] == 'KG').to_numpy()
+
+    precio_base = v['precio_base'].to_numpy()
+    precio = _redondear(precio_base * v['factor'].to_numpy())
+    # En UNIDAD el precio es round(precio_base) y el peso es el entero 1
+    peso = [p if kg else 1 for p, kg in zip(v['peso'], es_kg)]
+    nombre, categoria, frac = v['PRODUCTO'], v['CATEGORIA'], v['Valor']
+    registros = {
+        "Identificador de URL": v['slug'],
+        "Nombre": nombre,
+        "Categorías": categoria,
+        "Nombre de propiedad 1": v['Propiedad'],
+        "Valor de propiedad 1": frac,
+        "Nombre de propiedad 2": "",
+        "Valor de propiedad 2": "",
+        "Nombre de propiedad 3": "",
+        "Valor de propiedad 3": "",
+        "Precio": precio,
+        "Precio promocional": "",
+        "Peso (kg)": peso,
+        "Alto (cm)": ALTO,
+        "Ancho (cm)": ANCHO,
+        "Profundidad (cm)": PROFUNDIDAD,
+        "Stock": v['Stock'],
+        "SKU": resolver_skus_df(v, registry, emitidos),
+        "Código de barras": "",
+        "Mostrar en tienda": MOSTRAR_EN_TIENDA,
+        "Envío sin cargo": ENVIO_SIN_CARGO,
+        "Descripción": "Descripción corta de " + nombre,
+        "Tags": v['slug'].str.replace('-', ' ', regex=False),
+        "Título para SEO": (nombre + " " + frac + " - " + categoria).where(es_kg, nombre + " - " + categoria),
+        "Descripción para SEO": ("Compra " + nombre + " en presentación de " + frac + ". Envío sin cargo.")
+                                .where(es_kg, "Compra " + nombre + ". Envío sin cargo."),
+        "Marca": v['MARCA'],
+        "Producto Físico": PRODUCTO_FISICO,
+        "MPN (Número de pieza del fabricante)": "",
+        "Sexo": SEXO,
+        "Rango de edad": RANGO_EDAD,
+        "Costo": precio,
+    }
+    columnas = {col: pd.Series(valores, index=v.index) if not isinstance(valores, pd.Series) else valores
+                for col, valores in registros.items()}
+    return pd.DataFrame(columnas, columns=COLUMNAS).infer_objects()
+
+# --------------------------
+# ESCRITURA POR TRAMOS
+# --------------------------
+
+def preparar_catalogo(df, avisar=print):
+    """
+    Normaliza los precios (ver price_parser.parse_prices) y quita los productos sin precio
+    válido, informándolos con 'avisar'. Retorna el DataFrame listo para exportar.
+    """
+    df = df.copy()
+    df['PRECIO VENTA'], _ = price_parser.parse_prices(df['PRECIO VENTA'])
+    sin_precio = df['PRECIO VENTA'].isna()
+    if sin_precio.any():
+        for nombre in df.loc[sin_precio, 'PRODUCTO']:
+            avisar(f"Precio inválido para producto '{nombre}', se omite.")
+        df = df[~sin_precio]
+    return df
+
+def iterar_registros(df, registry, filas_por_tramo=FILAS_POR_TRAMO, avisar=print):
+    """
+    Genera el export por tramos de 'filas_por_tramo' productos (ver generar_registros), sin
+    armar todo el CSV en memoria. Concatenar los tramos da el mismo resultado que procesar
+    el catálogo completo de una vez.
+    Tienda Nube no acepta SKUs repetidos: si un tramo repite un SKU ya escrito se lanza
+    ValueError en lugar de generar un archivo que la importación rechazaría.
+    """
+    # El peso de UNIDAD (1) se escribe como 1.0 si en el catálogo hay productos por KG
+    hay_kg = (_texto(df['KG / UNIDAD']).str.upper() == 'KG').any() if len(df) else False
+    repeticion = repeticiones(df) if len(df) else None
+    emitidos = set()
+    for inicio in range(0, len(df), filas_por_tramo):
+        fin = inicio + filas_por_tramo
+        tramo = generar_registros(df.iloc[inicio:fin], registry, avisar, repeticion[inicio:fin], emitidos)
+        skus = tramo["SKU"]
+        repetidos = skus[skus.duplicated().to_numpy() | _en_conjunto(skus, emitidos)]
+        if len(repetidos):
+            raise ValueError(f"SKUs repetidos en el export: {', '.join(pd.unique(repetidos)[:10])}")
+        emitidos.update(skus.tolist())
+        if hay_kg:
+            tramo["Peso (kg)"] = tramo["Peso (kg)"].astype(float)
+        yield tramo
+
+def _inicios_de_producto(tramo):
+    """
+    Máscara de las filas que abren un producto: la primera variante de KG o la fila de UNIDAD.
+    """
+    return (tramo["Nombre de propiedad 1"].eq("Presentación")
+            | tramo["Valor de propiedad 1"].eq(VARIANTES_KG[0][0])).to_numpy()
+
+def _partes(tramos, max_filas=None):
+    """
+    Reparte los tramos en archivos de a lo sumo 'max_filas' filas: genera (número de archivo, filas).
+    Los archivos se cortan solo entre productos, nunca entre las variantes de un mismo producto
+    (Tienda Nube tomaría las que quedan en el archivo siguiente como variantes huérfanas).
+    Un producto con más variantes que 'max_filas' va entero en su propio archivo.
+    """
+    archivo, en_archivo = 0, 0
+    for tramo in tramos:
+        if not max_filas:
+            if len(tramo):
+                yield archivo, tramo
+            continue
+        bordes = np.flatnonzero(_inicios_de_producto(tramo)).tolist() + [len(tramo)]
+        desde = 0
+        while desde < len(tramo):
+            # Último borde de producto que entra en lo que queda del archivo
+            limite = desde + max_filas - en_archivo
+            hasta = bordes[bisect.bisect_right(bordes, limite) - 1] if limite > desde else desde
+            if hasta <= desde:
+                if en_archivo:
+                    archivo, en_archivo = archivo + 1, 0
+                    continue
+                hasta = bordes[bisect.bisect_right(bordes, desde)]
+            yield archivo, tramo.iloc[desde:hasta]
+            en_archivo += hasta - desde
+            desde = hasta
+            if desde < len(tramo):
+                # El producto siguiente no entra en este archivo
+                archivo, en_archivo = archivo + 1, 0
+
+def filas_por_producto(df):
+    """
+    Filas del export de cada producto, en orden: una por variante si es por KG, una si es
+    por UNIDAD y ninguna si no se exporta (sin nombre o con tipo no reconocido).
+    """
+    tipo = _texto(df['KG / UNIDAD']).str.upper()
+    con_nombre = (_texto(df['PRODUCTO']) != '').to_numpy()
+    filas = np.select([tipo == 'KG', tipo == 'UNIDAD'], [len(VARIANTES_KG), 1], 0)
+    return filas * con_nombre
+
+def contar_filas(df):
+    """
+    Filas que va a tener el export: una por variante de cada producto KG y una por producto UNIDAD.
+    """
+    return int(filas_por_producto(df).sum())
+
+def cantidad_partes(df, max_filas=None):
+    """
+    Archivos en que se parte el export (mismo reparto que _partes: sin cortar productos).
+    """
+    if not max_filas:
+        return 1
+    partes, en_archivo = 1, 0
+    for filas in filas_por_producto(df).tolist():
+        if not filas:
+            continue
+        if en_archivo and en_archivo + filas > max_filas:
+            partes, en_archivo = partes + 1, 0
+        en_archivo += filas
+    return partes
+
+def nombre_parte(nombre, numero, total):
+    """
+    'productos_tiendanube.csv' -> 'productos_tiendanube_2.csv' cuando el export tiene varios archivos.
+    """
+    if total <= 1:
+        return nombre
+    base, punto, extension = nombre.rpartition('.')
+    return f"{base}_{numero + 1}.{extension}" if punto else f"{nombre}_{numero + 1}"
+
+def _cerrar(salida):
+    salida.close()
+
+def escribir_csv(tramos, abrir, max_filas=None, progress=None, cerrar=_cerrar):
+    """
+    Escribe los tramos a medida que se generan. 'abrir(numero)' retorna el archivo de texto
+    (en disco o un buffer en memoria) donde va la parte 'numero', que lleva su propio encabezado,
+    y 'cerrar(salida)' se llama al terminar cada parte.
+    Con 'max_filas' el export se parte en varios archivos. 'progress(filas)' se llama después
+    de cada escritura con el total de filas escritas. Retorna la cantidad de partes.
+    """
+    actual, salida, filas = None, None, 0
+    try:
+        for numero, parte in _partes(tramos, max_filas):
+            if numero != actual:
+                if salida is not None:
+                    cerrar(salida)
+                actual, salida = numero, abrir(numero)
+                parte.to_csv(salida, index=False)
+            else:
+                parte.to_csv(salida, index=False, header=False)
+            filas += len(parte)
+            if progress is not None:
+                progress(filas)
+        if actual is None:
+            # Sin productos para exportar: un archivo con solo el encabezado
+            actual, salida = 0, abrir(0)
+            pd.DataFrame([], columns=COLUMNAS).to_csv(salida, index=False)
+    finally:
+        if salida is not None:
+            cerrar(salida)
+    return actual + 1
+
+def exportar_a_disco(df, registry, ruta=OUTPUT_CSV, max_filas=MAX_FILAS_POR_ARCHIVO, avisar=print):
+    """
+    Exporta el catálogo a 'ruta' (o a ruta_1.csv, ruta_2.csv... si se parte). Retorna las rutas escritas.
+    """
+    partes = cantidad_partes(df, max_filas)
+    rutas = [nombre_parte(ruta, numero, partes) for numero in range(partes)]
+    escribir_csv(
+        iterar_registros(df, registry, avisar=avisar),
+        lambda numero: open(rutas[numero], 'w', encoding='utf-8', newline=''),
+        max_filas
+    )
+    return rutas
+
+def exportar_a_memoria(df, registry, nombre=OUTPUT_CSV, max_filas=None, progress=None, avisar=print):
+    """
+    Exporta el catálogo a memoria para descargarlo. Retorna (nombre de archivo, bytes, tipo MIME):
+    el CSV si es un solo archivo, o un ZIP con las partes si se parte por 'max_filas'.
+    Las filas se escriben por tramos directamente en el buffer de salida.
+    """
+    partes = cantidad_partes(df, max_filas)
+    if partes == 1:
+        buffer = io.StringIO()
+        escribir_csv(iterar_registros(df, registry, avisar=avisar), lambda numero: buffer, progress=progress,
+                     cerrar=lambda salida: None)
+        return nombre, buffer.getvalue().encode('utf-8'), 'text/csv'
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        escribir_csv(
+            iterar_registros(df, registry, avisar=avisar),
+            lambda numero: io.TextIOWrapper(zf.open(nombre_parte(nombre, numero, partes), 'w'),
+                                            encoding='utf-8', newline=''),
+            max_filas, progress
+        )
+    return nombre.rpartition('.')[0] + '.zip', buffer.getvalue(), 'application/zip'
 
 def main():
     # Leer el CSV de entrada
     df = pd.read_csv(INPUT_CSV, encoding=ENCODING)
 
-    # Diccionario para controlar SKUs usados
-    used_skus = defaultdict(int)
-
-    csv_registros = []
-
-    for _, row in df.iterrows():
-        producto_valor = str(row.get('PRODUCTO', '')).strip()
-        if producto_valor:
-            registros = procesar_producto(row, used_skus)
-            csv_registros.extend(registros)
-
-    # Columnas requeridas por Tienda Nube (de A a AD)
-    columnas = [
-        "Identificador de URL",
-        "Nombre",
-        "Categorías",
-        "Nombre de propiedad 1",
-        "Valor de propiedad 1",
-        "Nombre de propiedad 2",
-        "Valor de propiedad 2",
-        "Nombre de propiedad 3",
-        "Valor de propiedad 3",
-        "Precio",
-        "Precio promocional",
-        "Peso (kg)",
-        "Alto (cm)",
-        "Ancho (cm)",
-        "Profundidad (cm)",
-        "Stock",
-        "SKU",
-        "Código de barras",
-        "Mostrar en tienda",
-        "Envío sin cargo",
-        "Descripción",
-        "Tags",
-        "Título para SEO",
-        "Descripción para SEO",
-        "Marca",
-        "Producto Físico",
-        "MPN (Número de pieza del fabricante)",
-        "Sexo",
-        "Rango de edad",
-        "Costo"
-    ]
-
-    df_csv = pd.DataFrame(csv_registros, columns=columnas)
-    df_csv.to_csv(OUTPUT_CSV, index=False, encoding='utf-8')
-    print(f"Archivo CSV generado: {OUTPUT_CSV}")
+    # Normalizar todos los precios de una vez; los vacíos o inválidos se informan y se omiten
+    df = preparar_catalogo(df)
+
+    # Registro de SKUs compartido con la app, al día con los SKUs del archivo
+    registry = get_sku_registry()
+    if 'SKU' in df.columns:
+        registry.sync_catalog(df)
+
+    for ruta in exportar_a_disco(df, registry, OUTPUT_CSV, MAX_FILAS_POR_ARCHIVO):
+        print(f"Archivo CSV generado: {ruta}")
 
 if __name__ == "__main__":
     main()
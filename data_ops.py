@@ -1,34 +1,630 @@
 # data_ops.py
 
 import streamlit as st
+import numpy as np
 import pandas as pd
+from catalog_store import get_store, diff_changes, row_values
+from catalog_schema import apply_schema, ensure_categories
+from catalog_index import CatalogIndex
+from edit_history import EditHistory, cell_delta, rows_delta, permute_delta
+from shared_catalog import get_shared_catalog
+from mix_recipes import get_recipes
+from search_index import SearchIndex
+from sku_generator import get_sku_registry
+
+def _sku_of(index):
+    df = st.session_state.df
+    if "SKU" not in df.columns:
+        return None
+    return df.at[index, "SKU"]
+
+def get_version():
+    """
+    Versión del catálogo de la sesión: crece con cada edición hecha a través de data_ops.
+    Si st.session_state.df fue reemplazado por fuera (carga inicial, restauración) también se incrementa.
+    """
+    flush_inserts()
+    df = st.session_state.df
+    if st.session_state.get("catalog_df_id") != id(df):
+        st.session_state.catalog_df_id = id(df)
+        _bump_version()
+        # Los deltas del historial describían al DataFrame anterior
+        get_history().clear()
+    return st.session_state.catalog_version
+
+def _bump_version():
+    st.session_state.catalog_version = st.session_state.get("catalog_version", 0) + 1
+    # Las vistas calculadas con versiones anteriores ya no sirven
+    st.session_state.catalog_views = {}
+
+def _view(name, builder, *args):
+    """
+    Memoiza una vista derivada del catálogo por (vista, argumentos, versión):
+    en un rerun sin ediciones se reutiliza el resultado sin volver a calcularlo.
+    """
+    version = get_version()
+    views = st.session_state.setdefault("catalog_views", {})
+    key = (name,) + args
+    cached = views.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    value = builder(st.session_state.df, *args)
+    views[key] = (version, value)
+    return value
+
+def get_index():
+    """
+    Retorna el índice de categorías de la sesión (ver catalog_index.CatalogIndex).
+    Se reconstruye solo si st.session_state.df fue reemplazado por fuera de data_ops.
+    """
+    flush_inserts()
+    df = st.session_state.df
+    index = st.session_state.get("catalog_index")
+    if index is None or index.df_id != id(df) or index.n_rows != len(df):
+        index = CatalogIndex(df)
+        st.session_state.catalog_index = index
+    return index
+
+def _sync_index(index):
+    # El DataFrame pudo ser reemplazado (concat/drop): el índice pasa a describir al nuevo
+    index.df_id = id(st.session_state.df)
+
+# --------------------------
+# Vistas derivadas (memoizadas por versión)
+# --------------------------
+
+def categories(sort=False):
+    """
+    Lista de categorías del catálogo: por orden de aparición o, con sort=True, alfabética.
+    """
+    index = get_index()
+    return index.sorted_categories() if sort else index.categories()
+
+def category_rows(categoria):
+    """
+    Productos de la categoría indicada (subconjunto de st.session_state.df con sus índices).
+    """
+    return _view("category_rows", lambda df, cat: get_index().rows(df, cat), categoria)
+
+def sale_types():
+    """
+    Columna KG / UNIDAD normalizada (sin espacios, en mayúsculas) de todo el catálogo.
+    """
+    return _view("sale_types", lambda df: df["KG / UNIDAD"].astype(str).str.strip().str.upper())
+
+def category_rows_by_type(categoria, tipo):
+    """
+    Productos de la categoría con el tipo de venta indicado ("KG" o "UNIDAD").
+    """
+    def build(df, cat, tipo):
+        rows = category_rows(cat)
+        return rows[sale_types().loc[rows.index] == tipo]
+    return _view("category_rows_by_type", build, categoria, tipo)
+
+def product_keys(categoria):
+    """
+    Claves (SKU o ID generado) de los productos de la categoría, para selectores.
+    """
+    def build(df, cat):
+        index = get_index()
+        return [index.key_at(pos) for pos in index.positions(cat)]
+    return _view("product_keys", build, categoria)
+
+def price_list():
+    """
+    Lista de precios (df_out, row_types) generada con lista_precios_utils.generar_lista_precios_df.
+    """
+    from lista_precios_utils import generar_lista_precios_df
+    return _view("price_list", generar_lista_precios_df)
+
+# --------------------------
+# Identidad de productos (clave -> posición)
+# --------------------------
+
+def product_key(index):
+    """
+    Clave estable (SKU o ID generado) del producto en la fila 'index'.
+    """
+    return get_index().key_at(st.session_state.df.index.get_loc(index))
+
+def position_of(key):
+    """
+    Índice actual de la fila del producto con esa clave, o None si ya no existe.
+    """
+    return get_index().position_of(key)
+
+def positions_of(keys):
+    """
+    Índices actuales de los productos con esas claves (se omiten las que ya no existen).
+    """
+    index = get_index()
+    return [pos for pos in (index.position_of(key) for key in keys) if pos is not None]
+
+def get_product(key):
+    """
+    Fila del producto con esa clave (Serie), o None si ya no existe.
+    """
+    pos = position_of(key)
+    return None if pos is None else st.session_state.df.iloc[pos]
+
+def product_label(key):
+    """
+    Texto para mostrar un producto en selectores: "PRODUCTO (clave)".
+    """
+    pos = position_of(key)
+    if pos is None:
+        return key
+    return f"{st.session_state.df['PRODUCTO'].iat[pos]} ({key})"
+
+def _synced_sku_registry(df):
+    registry = get_sku_registry()
+    registry.sync_catalog(df)
+    return registry
+
+def sku_registry():
+    """
+    Registro de SKUs compartido (ver sku_generator.SkuRegistry), al día con los SKUs
+    del catálogo de la sesión.
+    """
+    return _view("sku_registry", _synced_sku_registry)
+
+# --------------------------
+# Búsqueda de productos
+# --------------------------
+
+def get_search_index():
+    """
+    Índice de búsqueda de la sesión (ver search_index). Se pone al día con la versión actual
+    del catálogo reindexando solo los productos cuyo texto cambió.
+    """
+    version = get_version()
+    if "search_index" not in st.session_state:
+        st.session_state.search_index = SearchIndex()
+    search = st.session_state.search_index
+    if search.version != version:
+        search.sync(st.session_state.df, get_index().keys, version)
+    return search
+
+def search_products(query, limit=50):
+    """
+    Claves de los productos que coinciden con 'query' (nombre, marca, categoría o SKU), por relevancia.
+    """
+    return get_search_index().search(query, limit)
+
+def product_options(query, categoria=None, selected=()):
+    """
+    Opciones de un selector de productos: los resultados de 'query' si hay texto de búsqueda,
+    o los productos de 'categoria'. Las claves ya seleccionadas se conservan al principio
+    para que un multiselect no las pierda al cambiar la búsqueda.
+    """
+    if query and query.strip():
+        opciones = search_products(query)
+    elif categoria is not None:
+        opciones = product_keys(categoria)
+    else:
+        opciones = []
+    elegidas = [key for key in selected if position_of(key) is not None]
+    ya_elegidas = set(elegidas)
+    return elegidas + [key for key in opciones if key not in ya_elegidas]
+
+# --------------------------
+# Ediciones
+# --------------------------
+
+def get_history():
+    """
+    Historial de deshacer/rehacer de la sesión (ver edit_history.EditHistory).
+    """
+    if "edit_history" not in st.session_state:
+        st.session_state.edit_history = EditHistory()
+    return st.session_state.edit_history
+
+def _commit_state(op: str, payload: dict, changes: list):
+    st.session_state.overlay_dirty = True
+    _bump_version()
+    st.session_state.catalog_df_id = id(st.session_state.df)
+    get_store().commit(op, payload, changes)
+
+def _record(op: str, payload: dict, changes: list, deltas=None):
+    """
+    Registra la edición en el journal de la réplica local con sus cambios por fila
+    (ver catalog_store) e incrementa la versión (invalida las vistas derivadas).
+    'deltas' son los cambios para poder deshacerla; sin deltas la edición no se puede deshacer
+    y el historial se vacía.
+    """
+    if deltas is None:
+        get_history().clear()
+    else:
+        get_history().push(op, deltas)
+    _commit_state(op, payload, changes)
+
+def _set_changes(indices, data):
+    # Cambios por fila del journal: las mismas celdas en cada producto
+    return [["set", product_key(index), data] for index in indices]
+
+def _by_column(changes: dict):
+    # {índice: {columna: valor}} -> {columna: (índices, valores)}
+    por_columna = {}
+    for index, data in changes.items():
+        for col, new_val in data.items():
+            labels, values = por_columna.setdefault(col, ([], []))
+            labels.append(index)
+            values.append(new_val)
+    return por_columna
+
+def _cell_deltas(df, changes: dict):
+    # Un delta de celdas por columna (capturado antes de modificar)
+    return [cell_delta(df, labels, col, values) for col, (labels, values) in _by_column(changes).items()]
+
+def _with_mix_prices(changes: dict):
+    """
+    Agrega a 'changes' los precios recalculados de los mixes cuyas recetas usan algún
+    producto al que se le cambia PRECIO VENTA (ver mix_recipes). Solo se recalculan los
+    mixes afectados, por niveles y de forma vectorizada.
+    """
+    recipes = get_recipes()
+    cambios_precio = {index: data["PRECIO VENTA"] for index, data in changes.items() if "PRECIO VENTA" in data}
+    if not recipes or not cambios_precio:
+        return changes
+    index = get_index()
+    precios = st.session_state.df["PRECIO VENTA"].to_numpy(dtype=float).copy()
+    for pos, precio in cambios_precio.items():
+        precios[pos] = float(precio)
+
+    def price_of(skus):
+        posiciones = [index.position_of(sku) for sku in skus]
+        return np.array([np.nan if pos is None else precios[pos] for pos in posiciones])
+
+    def set_price(sku, precio):
+        pos = index.position_of(sku)
+        if pos is not None:
+            precios[pos] = precio
+
+    mix_precios = recipes.recompute([index.key_at(pos) for pos in cambios_precio], price_of, set_price)
+    changes = {i: dict(data) for i, data in changes.items()}
+    for sku, precio in mix_precios.items():
+        pos = index.position_of(sku)
+        if pos is not None:
+            changes.setdefault(pos, {})["PRECIO VENTA"] = precio
+    return changes
 
 def update_product(index: int, data: dict):
     """
     Actualiza el producto en el DataFrame central usando el índice y un diccionario de columnas a modificar.
     """
-    for col, new_val in data.items():
-        st.session_state.df.at[index, col] = new_val
+    update_products({index: data}, op="update")
+
+def update_products(changes: dict, op: str = "update_many"):
+    """
+    Actualiza varios productos a la vez. 'changes' es un dict {índice: {columna: valor}}
+    que puede incluir solo las celdas que cambiaron. Se registra como una única edición en el journal.
+    Si cambia el precio de un componente de algún mix, el precio de esos mixes se recalcula
+    en la misma edición.
+    """
+    if not changes:
+        return
+    changes = _with_mix_prices(changes)
+    df = st.session_state.df
+    deltas = _cell_deltas(df, changes)
+    # Las claves se toman antes de aplicar los cambios (un cambio de SKU cambia la clave)
+    filas = [["set", product_key(index), data] for index, data in changes.items()]
+    # Una asignación vectorizada por columna en lugar de un .at por celda
+    for col, (labels, values) in _by_column(changes).items():
+        ensure_categories(df, col, values)
+        df.loc[labels, col] = values
+    cat_index = get_index()
+    for index, data in changes.items():
+        if "CATEGORIA" in data:
+            cat_index.move([index], data["CATEGORIA"])
+        if "SKU" in data:
+            cat_index.rekey(index, data["SKU"])
+    _record(op, {
+        "changes": [{"index": int(index), "sku": _sku_of(index), "data": data} for index, data in changes.items()]
+    }, filas, deltas)
 
 def add_product(new_product: dict, categoria: str):
     """
-    Agrega un producto nuevo en el DataFrame central.
-    Si existen productos en la categoría, lo inserta al final de esa categoría;
-    de lo contrario, lo añade al final.
-    """
-    df_current = st.session_state.df
-    indices = df_current[df_current["CATEGORIA"].astype(str).str.strip() == categoria].index.tolist()
-    if indices:
-        insert_index = indices[-1] + 1
-        df_before = df_current.iloc[:insert_index]
-        df_after = df_current.iloc[insert_index:]
-        new_row_df = pd.DataFrame([new_product])
-        st.session_state.df = pd.concat([df_before, new_row_df, df_after], ignore_index=True)
+    Agrega un producto nuevo al final de su categoría (o al final del catálogo si la categoría es nueva).
+    El producto queda en un buffer de altas que se materializa, junto con las demás altas
+    pendientes, la próxima vez que se lee el catálogo a través de data_ops.
+    """
+    product = dict(new_product)
+    product.setdefault("CATEGORIA", categoria)
+    st.session_state.setdefault("pending_inserts", []).append(product)
+
+def flush_inserts():
+    """
+    Materializa las altas pendientes del buffer con una sola llamada a add_products.
+    """
+    pending = st.session_state.get("pending_inserts")
+    if pending:
+        st.session_state.pending_inserts = []
+        add_products(pending)
+
+def get_catalog():
+    """
+    Retorna st.session_state.df con las altas pendientes ya incorporadas.
+    """
+    flush_inserts()
+    return st.session_state.df
+
+def add_products(products: list):
+    """
+    Agrega varios productos a la vez. Se anexan al final y un único ordenamiento estable
+    por el rango de la categoría (orden de aparición; las categorías nuevas van al final)
+    los deja al final de su categoría, sin partir y concatenar el catálogo por cada producto.
+    """
+    if not products:
+        return
+    index = get_index()
+    rank = {cat: i for i, cat in enumerate(index.categories())}
+    nuevos = pd.DataFrame(products)
+    for cat in nuevos["CATEGORIA"].astype(str).str.strip():
+        rank.setdefault(cat, len(rank))
+
+    n_rows = len(st.session_state.df)
+    # concat con columnas categóricas distintas vuelve a object: se restablece el esquema
+    df = apply_schema(pd.concat([st.session_state.df, nuevos], ignore_index=True))
+    clave = df["CATEGORIA"].astype(str).map(rank).to_numpy()
+    orden = np.argsort(clave, kind="stable")
+    st.session_state.df = df.iloc[orden].reset_index(drop=True)
+    claves_nuevas = index.make_keys(nuevos["SKU"] if "SKU" in nuevos.columns else [""] * len(nuevos))
+    claves = index.keys + claves_nuevas
+    claves = [claves[i] for i in orden]
+    index.rebuild(st.session_state.df, keys=claves)
+    # Posiciones finales de las filas nuevas (en el concat estaban a partir de n_rows)
+    insertadas = np.flatnonzero(orden >= n_rows)
+    filas = [
+        ["insert", claves[pos], row_values(st.session_state.df, pos), claves[pos - 1] if pos else None]
+        for pos in insertadas
+    ]
+    if (orden[orden < n_rows] == np.arange(n_rows)).all():
+        deltas = [rows_delta("insert", insertadas, st.session_state.df.iloc[insertadas], [claves[pos] for pos in insertadas])]
     else:
-        st.session_state.df = pd.concat([df_current, pd.DataFrame([new_product])], ignore_index=True)
+        # Había categorías partidas que el ordenamiento reagrupó: se guarda también la permutación
+        cola = np.arange(n_rows, n_rows + len(nuevos))
+        deltas = [rows_delta("insert", cola, df.iloc[cola], claves_nuevas), permute_delta(orden)]
+        filas.append(["order", claves])
+    _record("insert_many", {"products": products}, filas, deltas)
 
 def delete_products(indices: list):
     """
     Elimina los productos del DataFrame central a partir de una lista de índices.
     """
-    st.session_state.df = st.session_state.df.drop(indices).reset_index(drop=True)
+    skus = [_sku_of(index) for index in indices]
+    index = get_index()
+    df = st.session_state.df
+    positions = np.sort(df.index.get_indexer(pd.Index(indices)))
+    claves = [index.key_at(pos) for pos in positions]
+    delta = rows_delta("delete", positions, df.iloc[positions], claves)
+    filas = [["delete", key] for key in claves]
+    st.session_state.df = df.drop(indices).reset_index(drop=True)
+    index.delete(positions)
+    _sync_index(index)
+    _record("delete", {"indices": [int(i) for i in indices], "skus": skus}, filas, [delta])
+
+def move_products(indices: list, dest_cat: str):
+    """
+    Mueve los productos indicados a la categoría 'dest_cat'.
+    """
+    delta = cell_delta(st.session_state.df, indices, "CATEGORIA", [dest_cat] * len(indices))
+    ensure_categories(st.session_state.df, "CATEGORIA", [dest_cat])
+    st.session_state.df.loc[indices, "CATEGORIA"] = dest_cat
+    get_index().move(indices, dest_cat)
+    _record("move", {"indices": [int(i) for i in indices], "skus": [_sku_of(i) for i in indices], "categoria": dest_cat},
+            _set_changes(indices, {"CATEGORIA": dest_cat}), [delta])
+
+def rename_category(old_cat: str, new_cat: str):
+    """
+    Renombra una categoría en todos sus productos.
+    """
+    df = st.session_state.df
+    index = get_index()
+    labels = df.index[index.positions(old_cat)]
+    delta = cell_delta(df, labels, "CATEGORIA", [new_cat] * len(labels))
+    ensure_categories(df, "CATEGORIA", [new_cat])
+    df.loc[labels, "CATEGORIA"] = new_cat
+    index.rename(old_cat, new_cat)
+    _record("rename_category", {"old": old_cat, "new": new_cat}, _set_changes(labels, {"CATEGORIA": new_cat}), [delta])
+
+def delete_category(categoria: str):
+    """
+    Elimina todos los productos de la categoría indicada.
+    """
+    df = st.session_state.df
+    index = get_index()
+    positions = index.positions(categoria)
+    claves = [index.key_at(pos) for pos in positions]
+    delta = rows_delta("delete", positions, df.iloc[positions], claves)
+    filas = [["delete", key] for key in claves]
+    st.session_state.df = df.drop(df.index[positions]).reset_index(drop=True)
+    index.delete(positions)
+    _sync_index(index)
+    _record("delete_category", {"categoria": categoria}, filas, [delta])
+
+def set_values(indices: list, column: str, value):
+    """
+    Asigna el mismo valor en 'column' a todos los productos indicados.
+    """
+    delta = cell_delta(st.session_state.df, indices, column, [value] * len(indices))
+    filas = _set_changes(indices, {column: value})
+    ensure_categories(st.session_state.df, column, [value])
+    st.session_state.df.loc[indices, column] = value
+    if column == "CATEGORIA":
+        get_index().move(indices, value)
+    if column == "SKU":
+        for index in indices:
+            get_index().rekey(index, value)
+    _record("set_values", {"indices": [int(i) for i in indices], "column": column, "value": value}, filas, [delta])
+
+def reorder_categories(new_order: list):
+    """
+    Ordena el catálogo según 'new_order' (lista de categorías) y, dentro de cada categoría, por PRODUCTO.
+    """
+    df = st.session_state.df
+    df["CATEGORIA"] = pd.Categorical(
+        df["CATEGORIA"].astype(str).str.strip(),
+        categories=new_order,
+        ordered=True
+    )
+    df_ordenado = df.sort_values(by=["CATEGORIA", "PRODUCTO"])
+    orden = df.index.get_indexer(df_ordenado.index)
+    delta = permute_delta(orden)
+    claves = get_index().keys
+    claves = [claves[i] for i in orden]
+    st.session_state.df = df_ordenado.reset_index(drop=True)
+    get_index().rebuild(st.session_state.df, keys=claves)
+    _record("reorder_categories", {"order": list(new_order)}, [["order", claves]], [delta])
+
+def replace_catalog(df, op: str, payload: dict = None, keys=None):
+    """
+    Reemplaza el catálogo completo (por ejemplo tras una migración de SKU) y lo registra en el journal.
+    'keys' son las claves de las filas de df, si se conocen (si no, se generan).
+    No se puede deshacer: vacía el historial.
+    """
+    st.session_state.df = df
+    index = get_index()
+    index.rebuild(df, keys=keys)
+    valores = df.astype(object).where(df.notna(), None).values.tolist()
+    _record(op, payload or {}, [["replace", df.columns.tolist(), valores, index.keys]])
+
+# --------------------------
+# Deshacer / rehacer
+# --------------------------
+
+# Widgets del formulario de edición por categoría: prefijo + clave del producto
+EDITOR_WIDGET_PREFIXES = ("name_", "precio_", "marca_", "costo_", "stock_")
+
+def can_undo():
+    return get_history().can_undo()
+
+def can_redo():
+    return get_history().can_redo()
+
+def undo_label():
+    return get_history().undo_label()
+
+def redo_label():
+    return get_history().redo_label()
+
+def _reset_editor_state(keys):
+    """
+    Descarta lo que los editores guardan del catálogo anterior (temp_data del formulario, sus
+    widgets y los cambios pendientes de la grilla): si no, el próximo "Guardar" volvería a
+    escribir esos valores y desharía el deshacer. 'keys' son las claves de los productos afectados.
+    """
+    st.session_state.pop("temp_data", None)
+    st.session_state.grid_dirty = {}
+    claves = set(keys)
+    for widget_key in list(st.session_state):
+        nombre = str(widget_key)
+        if nombre.startswith("grid_editor_") or any(
+            nombre.startswith(prefijo) and nombre[len(prefijo):] in claves for prefijo in EDITOR_WIDGET_PREFIXES
+        ):
+            del st.session_state[widget_key]
+
+def _apply_history(step, name):
+    """
+    Aplica un paso del historial y lo registra en el journal con los cambios por fila
+    que resultan de comparar el catálogo antes y después.
+    """
+    flush_inserts()
+    index = get_index()
+    antes, claves_antes = st.session_state.df.copy(), index.keys
+    df, claves, op = step(st.session_state.df, claves_antes)
+    st.session_state.df = df
+    index.rebuild(df, keys=claves)
+    cambios = diff_changes(antes, claves_antes, df, claves)
+    _commit_state(name, {"op": op}, cambios)
+    _reset_editor_state(claves_antes + list(claves))
+    return op
+
+def undo():
+    """
+    Deshace la última edición registrada. Retorna el nombre de la operación deshecha.
+    """
+    return _apply_history(get_history().undo, "undo")
+
+def redo():
+    """
+    Rehace la última edición deshecha. Retorna el nombre de la operación rehecha.
+    """
+    return _apply_history(get_history().redo, "redo")
+
+def revert_to_sheet():
+    """
+    Vuelve el catálogo al último estado conocido del spreadsheet (la versión sincronizada
+    de la réplica local). Retorna False si no hay un estado sincronizado.
+    """
+    synced = get_store().load_synced()
+    if synced is None:
+        return False
+    st.session_state.pending_inserts = []
+    df, keys = synced
+    claves_antes = get_index().keys
+    replace_catalog(df, "revert_to_sheet", keys=keys)
+    _reset_editor_state(claves_antes + list(keys))
+    return True
+
+# --------------------------
+# Catálogo compartido entre sesiones
+# --------------------------
+
+def sync_shared_with_store():
+    """
+    Si la versión sincronizada de la réplica local cambió desde que se publicó la base
+    (cambios hechos directamente en la hoja o subidas del worker), vuelve a publicar la base
+    desde la réplica. Retorna True si se publicó una base nueva.
+    """
+    store = get_store()
+    revision = store.revision()
+    if not revision:
+        return False
+    return get_shared_catalog().refresh(revision, store.load_catalog)
+
+def checkout_shared():
+    """
+    Toma como catálogo de la sesión una copia superficial de la base compartida (antes se
+    pone al día con la réplica local). Retorna False si todavía no hay base ni réplica.
+    """
+    sync_shared_with_store()
+    df, keys, version = get_shared_catalog().checkout()
+    if df is None:
+        return False
+    st.session_state.df = df
+    # Las claves de la base son las de la réplica: no se generan de nuevo
+    st.session_state.catalog_index = CatalogIndex(df, keys=keys)
+    st.session_state.base_version = version
+    st.session_state.overlay_dirty = False
+    return True
+
+def publish(df=None, keys=None, store_revision=None):
+    """
+    Publica 'df' con las claves 'keys' de sus filas (o el catálogo de la sesión) como la nueva
+    base compartida. Se usa al cargar el catálogo por primera vez en el proceso (con las claves
+    y la revisión de la réplica en la que se guardó) y al subir los cambios a la hoja.
+    """
+    propio = df is None
+    if propio:
+        df, keys = get_catalog(), get_index().keys
+    version = get_shared_catalog().publish(df, keys, store_revision)
+    if propio:
+        st.session_state.base_version = version
+        st.session_state.overlay_dirty = False
+
+def has_local_edits():
+    """
+    True si la sesión tiene ediciones que todavía no se publicaron como base.
+    """
+    return bool(st.session_state.get("overlay_dirty")) or bool(st.session_state.get("pending_inserts"))
+
+def refresh_from_shared():
+    """
+    Si hay una base más nueva (publicada por otra sesión o desde la réplica local) y esta
+    sesión no tiene ediciones propias, la adopta.
+    """
+    if has_local_edits():
+        return
+    sync_shared_with_store()
+    if get_shared_catalog().version != st.session_state.get("base_version"):
+        checkout_shared()
@@ -0,0 +1,200 @@
+# edit_history.py
+import numpy as np
+import pandas as pd
+
+from catalog_index import rekeyed
+from catalog_schema import apply_schema, ensure_categories
+
+# Memoria máxima (aproximada) que puede ocupar el historial; al pasarla se descartan las ediciones más viejas
+UNDO_MEMORY_BUDGET = 32 * 1024 * 1024
+# Costo estimado de un valor de celda guardado (objeto Python + referencia en la lista)
+_BYTES_POR_VALOR = 64
+
+# --------------------------
+# Deltas
+# --------------------------
+# Cada edición se guarda como una lista de deltas que solo contienen lo que cambió:
+#   ("cells", posiciones, columna, valores_anteriores, valores_nuevos)
+#   ("insert", posiciones_finales, filas, claves)   filas insertadas (en orden de posición)
+#   ("delete", posiciones_originales, filas, claves) filas eliminadas (en orden de posición)
+#   ("permute", orden)                               df_nuevo = df.iloc[orden]
+# Los deltas también se aplican a la lista de claves de las filas (ver catalog_index), así
+# deshacer/rehacer conserva la identidad de los productos sin SKU.
+
+def _positions(df, labels):
+    return df.index.get_indexer(pd.Index(labels)).astype(np.int64)
+
+def cell_delta(df, labels, column, new_values):
+    """
+    Delta de celdas: guarda los valores actuales de 'column' en las filas 'labels'
+    (antes de modificarlas) y los valores nuevos.
+    """
+    positions = _positions(df, labels)
+    if column in df.columns:
+        old_values = df[column].iloc[positions].tolist()
+    else:
+        old_values = [""] * len(positions)
+    return ("cells", positions, column, old_values, list(new_values))
+
+def rows_delta(kind, positions, rows, keys):
+    """
+    Delta de filas insertadas ('insert') o eliminadas ('delete') en las posiciones indicadas,
+    con las claves de esas filas.
+    """
+    return (kind, np.asarray(positions, dtype=np.int64), rows.copy(), list(keys))
+
+def permute_delta(order):
+    """
+    Delta de reordenamiento: el DataFrame nuevo es df.iloc[order].
+    """
+    return ("permute", np.asarray(order, dtype=np.int64))
+
+def delta_size(delta):
+    """
+    Bytes aproximados que ocupa un delta.
+    """
+    kind = delta[0]
+    if kind == "cells":
+        return delta[1].nbytes + 2 * _BYTES_POR_VALOR * len(delta[1])
+    if kind in ("insert", "delete"):
+        return delta[1].nbytes + int(delta[2].memory_usage(deep=True).sum())
+    return delta[1].nbytes
+
+def _set_cells(df, positions, column, values):
+    if column not in df.columns:
+        df[column] = ""
+    ensure_categories(df, column, values)
+    df.iloc[positions, df.columns.get_loc(column)] = values
+    return df
+
+def _insert_rows(df, positions, rows):
+    n_rows, n_new = len(df), len(rows)
+    combined = pd.concat([df, rows], ignore_index=True)
+    is_new = np.zeros(n_rows + n_new, dtype=bool)
+    is_new[positions] = True
+    order = np.empty(n_rows + n_new, dtype=np.int64)
+    order[is_new] = np.arange(n_rows, n_rows + n_new)
+    order[~is_new] = np.arange(n_rows)
+    # concat con columnas categóricas distintas vuelve a object: se restablece el esquema
+    return apply_schema(combined.iloc[order].reset_index(drop=True))
+
+def _delete_rows(df, positions):
+    return df.drop(df.index[positions]).reset_index(drop=True)
+
+def apply_delta(df, delta, inverse=False):
+    """
+    Aplica un delta (o su inverso) y retorna el DataFrame resultante.
+    Los deltas de celdas modifican df en el lugar; los de filas retornan un DataFrame nuevo.
+    """
+    kind = delta[0]
+    if kind == "cells":
+        _, positions, column, old_values, new_values = delta
+        return _set_cells(df, positions, column, old_values if inverse else new_values)
+    if kind in ("insert", "delete"):
+        positions, rows = delta[1], delta[2]
+        if (kind == "insert") != inverse:
+            return _insert_rows(df, positions, rows)
+        return _delete_rows(df, positions)
+    order = delta[1]
+    if inverse:
+        order = np.argsort(order)
+    return df.iloc[order].reset_index(drop=True)
+
+def apply_delta_keys(keys, delta, inverse=False):
+    """
+    Aplica un delta (o su inverso) a la lista de claves de las filas y retorna la lista nueva.
+    Un cambio de SKU cambia la clave igual que CatalogIndex.rekey.
+    """
+    kind = delta[0]
+    if kind == "cells":
+        _, positions, column, old_values, new_values = delta
+        if column != "SKU":
+            return keys
+        keys = list(keys)
+        usadas = set(keys)
+        for pos, sku in zip(positions, old_values if inverse else new_values):
+            nueva = rekeyed(keys[pos], sku, usadas)
+            usadas.discard(keys[pos])
+            usadas.add(nueva)
+            keys[pos] = nueva
+        return keys
+    if kind in ("insert", "delete"):
+        positions, row_keys = delta[1], delta[3]
+        if (kind == "insert") != inverse:
+            is_new = np.zeros(len(keys) + len(row_keys), dtype=bool)
+            is_new[positions] = True
+            result = np.empty(len(is_new), dtype=object)
+            result[is_new] = row_keys
+            result[~is_new] = keys
+            return result.tolist()
+        quitar = set(positions.tolist())
+        return [key for pos, key in enumerate(keys) if pos not in quitar]
+    order = delta[1]
+    if inverse:
+        order = np.argsort(order)
+    return [keys[i] for i in order]
+
+class EditHistory:
+    """
+    Historial de ediciones del catálogo para deshacer/rehacer.
+    Cada entrada es (operación, deltas, bytes); se guardan solo los valores que cambiaron,
+    así el costo en memoria es proporcional a lo editado y no al tamaño del catálogo.
+    Si el total supera 'budget', se descartan las entradas más antiguas.
+    """
+    def __init__(self, budget=UNDO_MEMORY_BUDGET):
+        self.budget = budget
+        self._undo = []
+        self._redo = []
+
+    @property
+    def size(self):
+        return sum(entry[2] for entry in self._undo) + sum(entry[2] for entry in self._redo)
+
+    def push(self, op, deltas):
+        """
+        Registra una edición nueva (descarta lo que se podía rehacer).
+        """
+        self._undo.append((op, deltas, sum(delta_size(d) for d in deltas)))
+        self._redo = []
+        while self._undo and self.size > self.budget:
+            self._undo.pop(0)
+
+    def clear(self):
+        self._undo = []
+        self._redo = []
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_label(self):
+        return self._undo[-1][0] if self._undo else None
+
+    def redo_label(self):
+        return self._redo[-1][0] if self._redo else None
+
+    def undo(self, df, keys):
+        """
+        Deshace la última edición sobre df (cuyas filas tienen las claves 'keys').
+        Retorna (df_resultante, claves_resultantes, operación).
+        """
+        entry = self._undo.pop()
+        for delta in reversed(entry[1]):
+            df = apply_delta(df, delta, inverse=True)
+            keys = apply_delta_keys(keys, delta, inverse=True)
+        self._redo.append(entry)
+        return df, keys, entry[0]
+
+    def redo(self, df, keys):
+        """
+        Rehace la última edición deshecha sobre df (cuyas filas tienen las claves 'keys').
+        Retorna (df_resultante, claves_resultantes, operación).
+        """
+        entry = self._redo.pop()
+        for delta in entry[1]:
+            df = apply_delta(df, delta)
+            keys = apply_delta_keys(keys, delta)
+        self._undo.append(entry)
+        return df, keys, entry[0]
@@ -30,7 +30,8 @@ def generar_lista_precios_df(df):
     output_rows = []
     row_types = []  # Indica si la fila es 'category' o 'product'
     
-    grouped = df.groupby("CATEGORIA", sort=False)
+    # observed=True: con CATEGORIA categórica no se generan grupos para categorías sin productos
+    grouped = df.groupby("CATEGORIA", sort=False, observed=True)
     for cat, group in grouped:
         tipos = group["KG / UNIDAD"].astype(str).str.strip().str.upper().unique().tolist()
         is_mixed = ("KG" in tipos) and ("UNIDAD" in tipos)
@@ -94,6 +95,9 @@ def generar_lista_precios_df(df):
                 precio_base = float(row["PRECIO VENTA"])
             except:
                 precio_base = 0.0
+            if pd.isna(precio_base):
+                print(f"ADVERTENCIA: El producto '{prod}' (categoría '{cat}') no tiene un precio válido, se omite.")
+                continue
             marca = str(row["MARCA"]).strip() if pd.notna(row["MARCA"]) else ""
             
             # Iniciamos la fila con: [Producto, COL B, COL C, COL D, Marca]
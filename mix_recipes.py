@@ -0,0 +1,132 @@
+# mix_recipes.py
+import json
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from catalog_store import DB_PATH
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mix_recipes (
+    mix_sku TEXT PRIMARY KEY,
+    factor REAL NOT NULL,
+    components TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+class MixRecipes:
+    """
+    Recetas de mixes guardadas en la réplica local (SQLite): para cada mix (por SKU),
+    sus componentes [(SKU, gramos)] y el factor de preparación.
+    Mantiene en memoria el grafo componente -> mixes que lo usan, para recalcular solo
+    los mixes afectados cuando cambia el precio de un componente.
+    """
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        rows = self._execute("SELECT mix_sku, factor, components FROM mix_recipes")
+        self._recipes = {
+            mix_sku: {"factor": factor, "components": [tuple(c) for c in json.loads(components)]}
+            for mix_sku, factor, components in rows
+        }
+        self._rebuild_graph()
+
+    def _execute(self, sql, params=()):
+        with closing(sqlite3.connect(self.path, timeout=30)) as con:
+            with con:
+                con.executescript(_SCHEMA)
+                return con.execute(sql, params).fetchall()
+
+    def _rebuild_graph(self):
+        self._dependents = defaultdict(set)
+        for mix_sku, recipe in self._recipes.items():
+            for sku, _ in recipe["components"]:
+                self._dependents[sku].add(mix_sku)
+
+    def __bool__(self):
+        return bool(self._recipes)
+
+    def get(self, mix_sku):
+        """
+        Receta del mix ({"factor", "components"}) o None si no tiene.
+        """
+        return self._recipes.get(mix_sku)
+
+    def save(self, mix_sku, components, factor):
+        """
+        Guarda (o reemplaza) la receta de un mix. 'components' es una lista [(SKU, gramos)].
+        """
+        components = [(str(sku), float(grams)) for sku, grams in components]
+        with self._lock:
+            self._execute(
+                "INSERT OR REPLACE INTO mix_recipes (mix_sku, factor, components, updated_at) VALUES (?, ?, ?, ?)",
+                (mix_sku, float(factor), json.dumps(components), time.time())
+            )
+            self._recipes[mix_sku] = {"factor": float(factor), "components": components}
+            self._rebuild_graph()
+
+    def delete(self, mix_sku):
+        with self._lock:
+            self._execute("DELETE FROM mix_recipes WHERE mix_sku = ?", (mix_sku,))
+            self._recipes.pop(mix_sku, None)
+            self._rebuild_graph()
+
+    def compute_prices(self, mixes, price_of):
+        """
+        Precio de cada mix = suma(precio_kg del componente * gramos / 1000) * factor,
+        calculado para todos los mixes indicados en una sola operación vectorizada.
+        'price_of' recibe una lista de SKUs y retorna un array de precios por kg (NaN si no existe,
+        que cuenta como 0). Retorna {SKU del mix: precio}.
+        """
+        filas = [
+            (mix_sku, sku, grams)
+            for mix_sku in mixes
+            for sku, grams in self._recipes[mix_sku]["components"]
+        ]
+        if not filas:
+            return {}
+        mix_ids, skus, grams = zip(*filas)
+        subtotales = pd.Series(np.asarray(price_of(list(skus)), dtype=float) * np.asarray(grams) / 1000)
+        por_mix = subtotales.groupby(list(mix_ids), sort=False).sum()
+        factores = pd.Series({mix_sku: self._recipes[mix_sku]["factor"] for mix_sku in por_mix.index})
+        return (por_mix * factores).round(2).to_dict()
+
+    def recompute(self, changed_skus, price_of, set_price):
+        """
+        Recalcula los mixes que dependen (directa o indirectamente) de 'changed_skus'.
+        Avanza por niveles del grafo: cada nivel se calcula en un paso vectorizado y sus
+        precios nuevos se publican con 'set_price' antes del nivel siguiente (mix de mixes).
+        Retorna {SKU del mix: precio nuevo}.
+        """
+        resultado = {}
+        pendientes = set(changed_skus)
+        for _ in range(len(self._recipes) + 1):
+            mixes = sorted({mix for sku in pendientes for mix in self._dependents.get(sku, ())})
+            if not mixes:
+                break
+            precios = self.compute_prices(mixes, price_of)
+            for mix_sku, precio in precios.items():
+                set_price(mix_sku, precio)
+            resultado.update(precios)
+            pendientes = set(precios)
+        return resultado
+
+_recipes = None
+_recipes_lock = threading.Lock()
+
+def get_recipes(path=None):
+    """
+    Recetas de mixes compartidas por el proceso (se cargan una vez desde SQLite).
+    Sin 'path' se reutiliza la instancia ya cargada (o la base por defecto).
+    """
+    global _recipes
+    with _recipes_lock:
+        if _recipes is None or (path is not None and _recipes.path != path):
+            _recipes = MixRecipes(path or DB_PATH)
+        return _recipes
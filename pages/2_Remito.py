@@ -3,6 +3,7 @@ import pandas as pd
 import datetime
 from io import BytesIO
 from invoice_manager import InvoiceManager  # Tu clase POO
+import data_ops
 
 def remito_integration_page():
     st.title("Generar Remito con Productos Existentes")
@@ -21,23 +22,31 @@ def remito_integration_page():
     if "remito_file_name" not in st.session_state:
         st.session_state["remito_file_name"] = None
 
-    df = st.session_state.df
+    df = data_ops.get_catalog()
 
-    # 1) Selección de categoría y producto (fuera del form)
+    # 1) Selección del producto (fuera del form): por búsqueda o por categoría
     st.subheader("Selecciona el producto")
-    categorias = df["CATEGORIA"].astype(str).str.strip().unique().tolist()
-    cat_selected = st.selectbox("Categoría", options=categorias, key="cat_selectbox")
+    busqueda = st.text_input("Buscar producto (nombre, marca, categoría o SKU)", key="remito_busqueda")
+    if busqueda.strip():
+        productos_cat = data_ops.product_options(busqueda)
+        if not productos_cat:
+            st.warning("No se encontraron productos para la búsqueda.")
+            return
+    else:
+        categorias = data_ops.categories()
+        cat_selected = st.selectbox("Categoría", options=categorias, key="cat_selectbox")
 
-    df_cat = df[df["CATEGORIA"].astype(str).str.strip() == cat_selected]
-    if df_cat.empty:
-        st.warning("No hay productos en esta categoría.")
-        return
+        df_cat = data_ops.category_rows(cat_selected)
+        if df_cat.empty:
+            st.warning("No hay productos en esta categoría.")
+            return
 
-    productos_cat = df_cat["PRODUCTO"].astype(str).unique().tolist()
-    prod_selected = st.selectbox("Producto", options=productos_cat, key="prod_selectbox")
+        productos_cat = data_ops.product_keys(cat_selected)
+    prod_key = st.selectbox("Producto", options=productos_cat, format_func=data_ops.product_label, key="prod_selectbox")
 
     # Obtenemos los datos del producto seleccionado
-    df_prod = df_cat[df_cat["PRODUCTO"].astype(str) == prod_selected].iloc[0]
+    df_prod = data_ops.get_product(prod_key)
+    prod_selected = str(df_prod["PRODUCTO"])
     tipo = df_prod["KG / UNIDAD"]  # "KG" o "UNIDAD"
     precio_base = float(df_prod["PRECIO VENTA"])  # precio por kg o por unidad, según el producto
 
@@ -1,7 +1,8 @@
 # pages/ListaPrecios.py
 import streamlit as st
 import pandas as pd
-from lista_precios_utils import generar_lista_precios_df, crear_excel_con_estilo
+from lista_precios_utils import crear_excel_con_estilo
+import data_ops
 
 def lista_precios_page():
     st.title("Generar Lista de Precios")
@@ -10,12 +11,11 @@ def lista_precios_page():
         st.error("No se encontró el DataFrame con productos. Por favor, carga los productos primero.")
         return
     
-    df = st.session_state.df
     st.markdown("Esta funcionalidad genera una lista de precios en base a los productos disponibles.")
     
     if st.button("Generar Lista de Precios"):
         try:
-            df_out, row_types = generar_lista_precios_df(df)
+            df_out, row_types = data_ops.price_list()
         except Exception as e:
             st.error(f"Error al generar la lista de precios: {e}")
             return
@@ -2,6 +2,7 @@
 import streamlit as st
 import os
 from backup import guardar_backup, listar_backups
+import data_ops
 
 def backup_page():
     st.title("Sistema de Backups")
@@ -11,7 +12,7 @@ def backup_page():
         if "df" not in st.session_state:
             st.error("No hay datos para respaldar. Carga primero los productos.")
         else:
-            filepath = guardar_backup(st.session_state.df)
+            filepath = guardar_backup(data_ops.get_catalog())
             st.success(f"Backup guardado: {filepath}")
 
     st.markdown("---")
@@ -0,0 +1,56 @@
+# pages/Exportar_Tienda_Nube.py
+import streamlit as st
+from crear_csv import OUTPUT_CSV, contar_filas, exportar_a_memoria, preparar_catalogo
+import data_ops
+
+def exportar_tienda_nube_page():
+    st.title("Exportar Productos a Tienda Nube")
+
+    if "df" not in st.session_state:
+        st.error("No se encontró el DataFrame con productos. Por favor, carga los productos primero.")
+        return
+
+    st.markdown("Genera el CSV de importación de Tienda Nube a partir de los productos cargados, "
+                "reutilizando los SKU guardados de cada producto.")
+
+    max_filas = st.number_input(
+        "Máximo de filas por archivo (0 = un solo archivo)",
+        min_value=0, value=0, step=1000, key="tn_max_filas"
+    )
+
+    if st.button("Generar CSV"):
+        omitidos = []
+        df = preparar_catalogo(data_ops.get_catalog(), avisar=omitidos.append)
+        total = contar_filas(df)
+        progreso = st.progress(0.0, text="Generando CSV...")
+
+        def mostrar_avance(filas):
+            fraccion = min(filas / total, 1.0) if total else 1.0
+            progreso.progress(fraccion, text=f"Generando CSV... {filas} de {total} filas")
+
+        try:
+            nombre, datos, mime = exportar_a_memoria(
+                df, data_ops.sku_registry(), OUTPUT_CSV, max_filas or None,
+                progress=mostrar_avance, avisar=omitidos.append
+            )
+        except Exception as e:
+            progreso.empty()
+            st.error(f"Error al generar el CSV: {e}")
+            return
+        progreso.empty()
+
+        # Productos sin precio válido o con un tipo distinto de KG / UNIDAD
+        if omitidos:
+            with st.expander(f"Se omitieron {len(omitidos)} productos"):
+                st.write("\n".join(f"- {mensaje}" for mensaje in omitidos))
+
+        st.success(f"Se generaron {total} filas.")
+        st.download_button(
+            label=f"Descargar {nombre}",
+            data=datos,
+            file_name=nombre,
+            mime=mime
+        )
+
+if __name__ == "__main__":
+    exportar_tienda_nube_page()
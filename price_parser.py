@@ -0,0 +1,49 @@
+# price_parser.py
+import pandas as pd
+
+# "20.200", "1.234.567", "20.200,50": el punto es separador de miles
+_MILES = r"-?\d{1,3}(?:\.\d{3})+(?:,\d+)?"
+# Formatos aceptados: miles con punto en grupos de 3 y decimales con coma ("20.200,50", "7,5", "20200"),
+# o un único punto decimal sin coma ("7.5")
+_VALIDO = r"-?(?:\d{1,3}(?:\.\d{3})+|\d+)(?:,\d+)?|-?\d+\.\d+"
+
+def parse_prices(values):
+    """
+    Convierte una columna de precios a float de forma vectorizada (sin .apply por fila).
+    Acepta números ya numéricos y textos como "$20.200", "20200", "7,5" o "20.200,50":
+      - se eliminan '$' y espacios,
+      - el punto se toma como separador de miles si agrupa de a 3 dígitos o si hay coma,
+      - la coma se toma como separador decimal.
+    Los textos con separadores en un orden inesperado ("1,234.56") o con miles mal agrupados
+    ("12.34,5") se marcan como inválidos en lugar de adivinar cuál es el decimal.
+    Retorna (precios, invalidos):
+      - precios: Serie float con NaN donde la celda está vacía o no se pudo interpretar,
+      - invalidos: máscara booleana de las celdas con texto que no es un precio válido.
+    """
+    serie = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.astype(float), pd.Series(False, index=serie.index)
+
+    texto = serie.astype("string").str.strip()
+    texto = texto.str.replace("$", "", regex=False).str.replace(r"\s", "", regex=True)
+    vacio = texto.isna() | (texto == "")
+    valido = texto.str.fullmatch(_VALIDO).fillna(False).astype(bool)
+
+    sin_miles = texto.str.fullmatch(_MILES).fillna(False) | texto.str.contains(",", regex=False).fillna(False)
+    texto = texto.mask(sin_miles, texto.str.replace(".", "", regex=False))
+    texto = texto.str.replace(",", ".", regex=False)
+
+    precios = pd.to_numeric(texto.mask(vacio | ~valido), errors="coerce").astype(float)
+    invalidos = precios.isna() & ~vacio
+    return precios, invalidos.astype(bool)
+
+def parse_price(value):
+    """
+    Versión escalar de parse_prices para formularios.
+    Lanza ValueError si el valor está vacío o no es un precio válido.
+    """
+    precios, _ = parse_prices([value])
+    precio = precios.iloc[0]
+    if pd.isna(precio):
+        raise ValueError(f"Precio inválido: '{value}'")
+    return float(precio)
@@ -2,75 +2,116 @@
 import streamlit as st
 import pandas as pd
 import re
+import math
+import data_ops
+import repricing
+from mix_recipes import get_recipes
+
+# Modo grilla: productos por página y columnas editables
+GRID_PAGE_SIZE = 50
+GRID_COLUMNS = ["PRODUCTO", "PRECIO VENTA", "COSTO", "MARCA", "STOCK"]
+# Columnas que se comparan como montos (redondeados a centavos) al detectar cambios
+MONEY_COLUMNS = {"PRECIO VENTA", "COSTO"}
+
+def _value_changed(col, old, new):
+    """
+    True si el valor del formulario 'new' difiere del guardado 'old'. Los montos se comparan
+    como números redondeados a centavos (el texto de un float no es una comparación confiable);
+    el resto, como texto.
+    """
+    if col in MONEY_COLUMNS:
+        try:
+            old = float(old)
+        except (TypeError, ValueError):
+            return True
+        # Sin precio (NaN en el catálogo, campo vacío en el formulario): cambia solo si uno de los dos tiene valor
+        new = math.nan if new is None else float(new)
+        if math.isnan(old) or math.isnan(new):
+            return math.isnan(old) != math.isnan(new)
+        return round(old, 2) != round(new, 2)
+    return str(old) != str(new)
+
+def _form_money(value):
+    """
+    Valor inicial de un st.number_input de monto: None (campo vacío) si falta o es NaN.
+    """
+    return None if value is None or pd.isna(value) else float(value)
 
 class ProductEditor:
     def __init__(self, dataframe):
         if "df" not in st.session_state:
-            st.session_state.df = dataframe.copy()
+            st.session_state.df = dataframe.copy(deep=False)
         self.df = st.session_state.df
 
     def edit_products_by_category(self):
         st.write("### Edición de Productos por Categoría")
-        categorias = sorted(self.df["CATEGORIA"].astype(str).str.strip().unique())
+        modo = st.radio("Modo de edición", ["Grilla", "Formulario (incluye mixes)"], horizontal=True, key="editor_mode")
+        if modo == "Grilla":
+            self.edit_products_grid()
+            return
+        categorias = data_ops.categories(sort=True)
         selected_category = st.selectbox("Selecciona la categoría a editar", options=categorias)
 
-        df_cat = self.df[self.df["CATEGORIA"].astype(str).str.strip() == selected_category]
+        df_cat = data_ops.category_rows(selected_category)
 
         # Este diccionario guardará los datos editados (nombre, precio, marca, etc.)
-        # clave: índice del producto, valor: dict con campos editados
+        # clave: clave estable del producto (SKU o ID generado), valor: dict con campos editados
         if "temp_data" not in st.session_state:
             st.session_state.temp_data = {}
 
+        keys = data_ops.product_keys(selected_category)
+
         # Antes de renderizar el formulario, inicializamos los valores con lo que tenga session_state.temp_data
         temp_data = {}
-        for index, row in df_cat.iterrows():
+        for key, (_, row) in zip(keys, df_cat.iterrows()):
             # Si ya existe en session_state.temp_data, lo usamos. Si no, inicializamos con datos del DF.
-            if index not in st.session_state.temp_data:
-                st.session_state.temp_data[index] = {
+            if key not in st.session_state.temp_data:
+                st.session_state.temp_data[key] = {
                     "new_name": row["PRODUCTO"],
-                    "new_price": float(row.get("PRECIO VENTA", 0)),
+                    # Los precios inválidos o vacíos (NaN) se muestran con el campo vacío
+                    "new_price": _form_money(row.get("PRECIO VENTA")),
                     "new_brand": row.get("MARCA", ""),
-                    "new_costo": float(row.get("COSTO", 0)),
+                    "new_costo": _form_money(row.get("COSTO")),
                     "selected_stock": "SÍ" if str(row.get("STOCK", "")).strip() == "-" else "NO"
                 }
-            temp_data[index] = st.session_state.temp_data[index]
+            temp_data[key] = st.session_state.temp_data[key]
 
         # Creamos un diccionario para detectar qué botón de "Editar Mix" fue presionado
         button_mix_pressed = {}
 
         with st.form(key=f"form_{selected_category}"):
-            for index, row in df_cat.iterrows():
-                st.markdown(f"**Producto:** {row['PRODUCTO']} (Index={index})")
+            for key, (_, row) in zip(keys, df_cat.iterrows()):
+                st.markdown(f"**Producto:** {row['PRODUCTO']} (SKU={key})")
                 col1, col2, col3, col4, col5, col6 = st.columns([2,1,1,1,1,1])
 
                 # Recuperamos los valores iniciales (ya cargados en temp_data)
-                initial = temp_data[index]
+                initial = temp_data[key]
 
                 with col1:
                     new_name = st.text_input(
                         "Nombre", 
                         value=initial["new_name"], 
-                        key=f"name_{index}"
+                        key=f"name_{key}"
                     )
                 with col2:
                     new_price = st.number_input(
                         "Precio", 
                         value=initial["new_price"], 
                         step=100.0, 
-                        key=f"precio_{index}"
+                        key=f"precio_{key}"
                     )
                 with col3:
                     new_brand = st.text_input(
                         "Marca", 
                         value=initial["new_brand"], 
-                        key=f"marca_{index}"
+                        key=f"marca_{key}"
                     )
                 with col4:
                     new_costo = st.number_input(
                         "Costo", 
                         value=initial["new_costo"], 
                         step=1.0, 
-                        key=f"costo_{index}"
+                        key=f"costo_{key}"
                     )
                 with col5:
                     stock_options = ["SÍ", "NO"]
@@ -82,7 +123,7 @@ class ProductEditor:
                         "Stock", 
                         stock_options, 
                         index=default_index, 
-                        key=f"stock_{index}"
+                        key=f"stock_{key}"
                     )
                 
                 # Si la categoría es de MIX, creamos un form_submit_button para "Editar Mix"
@@ -92,10 +133,10 @@ class ProductEditor:
                 with col6:
                     if selected_category.upper().strip() in mix_categories:
                         # Creamos un form_submit_button único para este producto
-                        button_mix_pressed[index] = st.form_submit_button(f"Editar Mix {index}")
+                        button_mix_pressed[key] = st.form_submit_button(f"Editar Mix {key}")
 
                 # Guardamos los valores ingresados en temp_data (para persistirlos si se presiona otro botón)
-                temp_data[index] = {
+                temp_data[key] = {
                     "new_name": new_name,
                     "new_price": new_price,
                     "new_brand": new_brand,
@@ -108,65 +149,206 @@ class ProductEditor:
 
         # Ahora, fuera del form, detectamos cuál botón fue presionado
         # Actualizamos st.session_state.temp_data con los nuevos valores (para no perderlos en el rerun)
-        for idx in temp_data:
-            st.session_state.temp_data[idx] = temp_data[idx]
+        for key in temp_data:
+            st.session_state.temp_data[key] = temp_data[key]
 
         # 1) Chequeamos si se presionó alguno de los botones "Editar Mix ..."
-        mix_index_pressed = None
-        for idx, pressed in button_mix_pressed.items():
+        mix_key_pressed = None
+        for key, pressed in button_mix_pressed.items():
             if pressed:
-                mix_index_pressed = idx
+                mix_key_pressed = key
                 break  # Tomamos el primero que encontremos
 
-        if mix_index_pressed is not None:
+        if mix_key_pressed is not None:
             # Se presionó "Editar Mix" para un producto en particular
-            st.session_state["mix_edit_index"] = mix_index_pressed
+            st.session_state["mix_edit_key"] = mix_key_pressed
             # NOTA: No guardamos cambios al DF. Solo iremos a configurar el mix.
         
         # 2) Chequeamos si se presionó "Guardar cambios en esta categoría"
         elif save_button:
-            # Guardamos al DataFrame
-            for index, row in df_cat.iterrows():
-                changes = st.session_state.temp_data[index]
-                st.session_state.df.at[index, "PRODUCTO"] = changes["new_name"]
-                st.session_state.df.at[index, "PRECIO VENTA"] = changes["new_price"]
-                st.session_state.df.at[index, "MARCA"] = changes["new_brand"]
-                st.session_state.df.at[index, "COSTO"] = changes["new_costo"]
-                if changes["selected_stock"] == "SÍ":
-                    st.session_state.df.at[index, "STOCK"] = "-"
-                else:
-                    st.session_state.df.at[index, "STOCK"] = "0"
+            # Guardamos al DataFrame (una sola edición en el journal para toda la categoría)
+            updates = {}
+            for key, (index, row) in zip(keys, df_cat.iterrows()):
+                changes = st.session_state.temp_data[key]
+                nuevos = {
+                    "PRODUCTO": changes["new_name"],
+                    "PRECIO VENTA": changes["new_price"],
+                    "MARCA": changes["new_brand"],
+                    "COSTO": changes["new_costo"],
+                    "STOCK": "-" if changes["selected_stock"] == "SÍ" else "0",
+                }
+                # Solo se escriben las celdas que cambiaron
+                modificados = {col: val for col, val in nuevos.items() if _value_changed(col, row.get(col, ""), val)}
+                if modificados:
+                    updates[index] = modificados
+            data_ops.update_products(updates)
             st.success(f"Cambios guardados para la categoría {selected_category}")
             st.dataframe(st.session_state.df)
 
         # Si se ha solicitado editar un mix para un producto, mostrar la UI especial
-        if "mix_edit_index" in st.session_state:
-            index_to_edit = st.session_state["mix_edit_index"]
-            self.configurar_mix(index_to_edit)
+        if "mix_edit_key" in st.session_state:
+            self.configurar_mix(st.session_state["mix_edit_key"])
+
+    def edit_products_grid(self):
+        """
+        Edición en grilla (st.data_editor) paginada: solo se envía la página visible y se guardan
+        únicamente las celdas modificadas. Los cambios sin guardar se acumulan en
+        st.session_state.grid_dirty ({clave: {columna: valor}}) aunque se cambie de página o categoría.
+        """
+        categorias = data_ops.categories(sort=True)
+        selected_category = st.selectbox("Selecciona la categoría a editar", options=categorias, key="grid_category")
+        keys = data_ops.product_keys(selected_category)
+        if not keys:
+            st.info("No hay productos en la categoría seleccionada.")
+            return
+
+        n_pages = math.ceil(len(keys) / GRID_PAGE_SIZE)
+        page = 1
+        if n_pages > 1:
+            page = st.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, value=1, key=f"grid_page_{selected_category}")
+        desde, hasta = (page - 1) * GRID_PAGE_SIZE, page * GRID_PAGE_SIZE
+        page_keys = keys[desde:hasta]
+
+        # Valores actuales del catálogo para la página visible (índice = clave del producto)
+        original = data_ops.category_rows(selected_category).iloc[desde:hasta][GRID_COLUMNS]
+        original = original.astype({"MARCA": str, "STOCK": str, "PRECIO VENTA": float, "COSTO": float})
+        original.index = page_keys
+
+        # Se muestran con los cambios pendientes ya aplicados
+        dirty = st.session_state.setdefault("grid_dirty", {})
+        vista = original.copy()
+        for key in page_keys:
+            for col, val in dirty.get(key, {}).items():
+                vista.at[key, col] = val
+
+        editado = st.data_editor(
+            vista,
+            key=f"grid_editor_{selected_category}_{page}",
+            num_rows="fixed",
+            use_container_width=True,
+            column_config={
+                "PRECIO VENTA": st.column_config.NumberColumn("Precio", step=100.0, format="%.2f"),
+                "COSTO": st.column_config.NumberColumn("Costo", step=1.0, format="%.2f"),
+                "STOCK": st.column_config.SelectboxColumn("Stock", options=["-", "0"], help="'-' con stock, '0' sin stock"),
+            },
+        )
+
+        # Filas modificadas respecto del catálogo (comparación vectorizada de toda la página)
+        cambios = (editado != original) & ~(editado.isna() & original.isna())
+        filas = cambios.any(axis=1)
+        for key in filas.index[~filas]:
+            dirty.pop(key, None)
+        for key in filas.index[filas]:
+            dirty[key] = {col: editado.at[key, col] for col in GRID_COLUMNS if cambios.at[key, col]}
+
+        st.caption(f"{len(dirty)} producto(s) con cambios sin guardar.")
+        col_save, col_discard = st.columns(2)
+        if col_save.button("Guardar cambios", disabled=not dirty, key="grid_save"):
+            updates = {}
+            for key, data in dirty.items():
+                index = data_ops.position_of(key)
+                if index is not None:
+                    updates[index] = data
+            data_ops.update_products(updates)
+            self._clear_grid_state()
+            st.toast(f"Se guardaron cambios en {len(updates)} producto(s).")
+            st.rerun()
+        if col_discard.button("Descartar cambios", disabled=not dirty, key="grid_discard"):
+            self._clear_grid_state()
+            st.rerun()
+
+    def bulk_reprice(self):
+        """
+        Actualización masiva de precios: filtros + regla, vista previa antes/después
+        y aplicación como una única edición (se sube a la hoja con un solo batch de celdas).
+        """
+        st.write("### Actualización Masiva de Precios")
+        df = data_ops.get_catalog()
+
+        col1, col2 = st.columns(2)
+        with col1:
+            categorias = st.multiselect("Categorías", options=data_ops.categories(sort=True), key="reprice_cats")
+            marcas_disponibles = sorted(m for m in df["MARCA"].astype(str).str.strip().unique() if m)
+            marcas = st.multiselect("Marcas / proveedores", options=marcas_disponibles, key="reprice_brands")
+        with col2:
+            tipo = st.selectbox("Tipo de venta", options=["Todos", "KG", "UNIDAD"], key="reprice_type")
+            patron = st.text_input("Nombre contiene (expresión regular)", key="reprice_pattern")
+
+        col3, col4, col5, col6 = st.columns(4)
+        with col3:
+            columna = st.selectbox("Columna", options=["PRECIO VENTA", "COSTO"], key="reprice_column")
+        with col4:
+            modos = repricing.MODOS if columna == "PRECIO VENTA" else [repricing.MODO_PORCENTAJE, repricing.MODO_MONTO]
+            modo = st.selectbox("Regla", options=modos, key="reprice_mode")
+        with col5:
+            valor = st.number_input("Valor (% o $)", value=10.0, step=1.0, key="reprice_value")
+        with col6:
+            redondeo = st.number_input("Redondear a múltiplos de", min_value=0.0, value=0.0, step=10.0, key="reprice_round")
+
+        try:
+            mask = repricing.select_products(df, categorias, marcas, None if tipo == "Todos" else tipo, patron)
+            preview = repricing.reprice(df, mask, modo, valor, redondeo, columna)
+        except Exception as e:
+            st.error(f"Error al calcular los precios: {e}")
+            return
+
+        st.write(f"{int(mask.sum())} producto(s) seleccionados, {len(preview)} cambian de precio.")
+        st.dataframe(preview, use_container_width=True)
+
+        if st.button("Aplicar precios", disabled=preview.empty, key="reprice_apply"):
+            data_ops.update_products(repricing.preview_to_changes(preview, columna))
+            st.success(f"Se actualizaron {len(preview)} producto(s). Usa 'Actualizar Spreadsheet' para subirlos.")
+
+    def _clear_grid_state(self):
+        st.session_state.grid_dirty = {}
+        for widget_key in [k for k in st.session_state if str(k).startswith("grid_editor_")]:
+            del st.session_state[widget_key]
 
-    def configurar_mix(self, index):
+    def configurar_mix(self, key):
         st.markdown("#### Configurar Mix para el Producto")
-        product_row = st.session_state.df.loc[index]
+        product_row = data_ops.get_product(key)
+        if product_row is None:
+            st.warning("El producto del mix ya no existe en el catálogo.")
+            st.session_state.pop("mix_edit_key")
+            return
         st.write("Producto:", product_row["PRODUCTO"])
         st.write("Precio base (por kg):", product_row["PRECIO VENTA"])
         
-        # Inicializamos (o reutilizamos) la lista de componentes de mix en session_state
-        if "mix_components_edit" not in st.session_state:
-            st.session_state.mix_components_edit = []
+        # Inicializamos la lista de componentes del mix con la receta guardada (si existe)
+        if st.session_state.get("mix_components_key") != key:
+            receta = get_recipes().get(key)
+            componentes = []
+            for sku, grams in (receta["components"] if receta else []):
+                comp_row = data_ops.get_product(sku)
+                componentes.append({
+                    "Categoría": comp_row["CATEGORIA"] if comp_row is not None else "",
+                    "Producto": comp_row["PRODUCTO"] if comp_row is not None else sku,
+                    "SKU": sku,
+                    "Cantidad (g)": grams
+                })
+            st.session_state.mix_components_edit = componentes
+            st.session_state.mix_components_key = key
 
         st.info("Agrega los componentes que integrarán el mix (total de 1 kg).")
+        busqueda = st.text_input("Buscar componente (nombre, marca, categoría o SKU)", key=f"mix_comp_busqueda_{key}")
         col1, col2 = st.columns(2)
         with col1:
-            categorias = sorted(st.session_state.df["CATEGORIA"].astype(str).str.strip().unique())
-            comp_cat = st.selectbox("Categoría del componente", options=categorias, key=f"mix_comp_cat_{index}")
+            if busqueda.strip():
+                comp_cat = None
+            else:
+                categorias = data_ops.categories(sort=True)
+                comp_cat = st.selectbox("Categoría del componente", options=categorias, key=f"mix_comp_cat_{key}")
         with col2:
-            df_comp = st.session_state.df[st.session_state.df["CATEGORIA"].astype(str).str.strip() == comp_cat]
-            prod_options = df_comp["PRODUCTO"].astype(str).unique().tolist()
-            comp_prod = st.selectbox("Producto del componente", options=prod_options, key=f"mix_comp_prod_{index}")
+            prod_options = data_ops.product_options(busqueda, comp_cat)
+            comp_key = st.selectbox("Producto del componente", options=prod_options, format_func=data_ops.product_label, key=f"mix_comp_prod_{key}")
         
-        comp_qty = st.number_input("Cantidad (g) para este componente", min_value=1, max_value=1000, value=250, key=f"mix_comp_qty_{index}")
-        if st.button("Agregar Componente", key=f"add_mix_comp_{index}"):
-            new_comp = {"Categoría": comp_cat, "Producto": comp_prod, "Cantidad (g)": comp_qty}
+        comp_qty = st.number_input("Cantidad (g) para este componente", min_value=1, max_value=1000, value=250, key=f"mix_comp_qty_{key}")
+        if st.button("Agregar Componente", key=f"add_mix_comp_{key}"):
+            comp_row = data_ops.get_product(comp_key)
+            if comp_row is None:
+                st.warning("Selecciona un producto para agregar.")
+                return
+            new_comp = {"Categoría": comp_row["CATEGORIA"], "Producto": comp_row["PRODUCTO"], "SKU": comp_key, "Cantidad (g)": comp_qty}
             st.session_state.mix_components_edit.append(new_comp)
             st.success("Componente agregado.")
         
@@ -178,22 +360,30 @@ class ProductEditor:
             # Calcular el precio del mix en tiempo real
             total_subtotal = 0
             for comp in st.session_state.mix_components_edit:
-                df_price = st.session_state.df[st.session_state.df["PRODUCTO"] == comp["Producto"]]
-                if not df_price.empty:
-                    precio_kg = float(df_price.iloc[0]["PRECIO VENTA"])
+                comp_row = data_ops.get_product(comp["SKU"])
+                if comp_row is not None:
+                    precio_kg = float(comp_row["PRECIO VENTA"])
                 else:
                     precio_kg = 0
                 total_subtotal += precio_kg * (comp["Cantidad (g)"] / 1000)
             
-            factor = st.number_input("Factor de preparación", min_value=1.0, value=1.10, step=0.01, key=f"mix_factor_{index}")
+            receta = get_recipes().get(key)
+            factor = st.number_input("Factor de preparación", min_value=1.0, value=receta["factor"] if receta else 1.10, step=0.01, key=f"mix_factor_{key}")
             precio_mix = total_subtotal * factor
             st.markdown(f"**Precio Calculado del Mix: ARS {precio_mix:,.2f}**")
             
-            if st.button("Guardar Precio de Mix", key=f"save_mix_{index}"):
-                st.session_state.df.at[index, "PRECIO VENTA"] = precio_mix
-                st.success("Precio actualizado en el producto.")
+            if st.button("Guardar Precio de Mix", key=f"save_mix_{key}"):
+                # La receta se guarda por SKU: los productos sin SKU propio no pueden usarse
+                sin_sku = [k for k in [key] + [c["SKU"] for c in st.session_state.mix_components_edit] if k.startswith("#")]
+                if sin_sku:
+                    st.warning("El mix y sus componentes necesitan SKU para guardar la receta: " + ", ".join(data_ops.product_label(k) for k in sin_sku))
+                    return
+                get_recipes().save(key, [(c["SKU"], c["Cantidad (g)"]) for c in st.session_state.mix_components_edit], factor)
+                data_ops.update_product(data_ops.position_of(key), {"PRECIO VENTA": round(precio_mix, 2)})
+                st.success("Receta guardada y precio actualizado en el producto.")
                 # Limpiamos la variable que indica que estamos editando este mix
-                st.session_state.pop("mix_edit_index")
+                st.session_state.pop("mix_edit_key")
+                st.session_state.pop("mix_components_key", None)
                 st.session_state.mix_components_edit = []
 
 if __name__ == "__main__":
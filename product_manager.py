@@ -2,18 +2,14 @@ import streamlit as st
 import pandas as pd
 import re
 from sku_generator import generar_sku
-from collections import defaultdict
+from price_parser import parse_price
+import data_ops
 
 class ProductManager:
     def __init__(self, dataframe):
         if "df" not in st.session_state:
-            st.session_state.df = dataframe.copy()
+            st.session_state.df = dataframe.copy(deep=False)
         self.df = st.session_state.df
-        if "used_skus" not in st.session_state:
-            st.session_state["used_skus"] = defaultdict(int)
-        # Inicializamos cat_codes como dict vacío para que se vayan generando los códigos automáticamente
-        if "cat_codes" not in st.session_state:
-            st.session_state["cat_codes"] = {}
 
     def add_product(self):
         st.write("### Agregar Producto")
@@ -31,7 +27,7 @@ class ProductManager:
             marca  = st.text_input("Marca", key="marca_input")
 
             if cat_option == "Existente":
-                categorias_existentes = self.df["CATEGORIA"].astype(str).str.strip().unique().tolist()
+                categorias_existentes = data_ops.categories()
                 categoria = st.selectbox("Selecciona la Categoría", options=categorias_existentes, key="categoria_existente")
             else:
                 categoria = st.text_input("Nombre de la nueva Categoría", key="nueva_categoria")
@@ -41,8 +37,7 @@ class ProductManager:
             
             # Lógica de variante igual que antes...
             if cat_option == "Existente" and tipo.upper().strip() == "KG":
-                df_cat = self.df[self.df["CATEGORIA"].astype(str).str.strip() == categoria]
-                kg_products = df_cat[df_cat["KG / UNIDAD"].astype(str).str.strip().str.upper() == "KG"]
+                kg_products = data_ops.category_rows_by_type(categoria, "KG")
 
                 if not kg_products.empty:
                     frac_values = kg_products["FRACCIONAMIENTO"].dropna().unique()
@@ -57,17 +52,17 @@ class ProductManager:
             if submitted:
                 # Parseo del precio
                 try:
-                    precio_num = float(precio.replace('$','').replace('.', '').replace(',', '.').strip())
-                except Exception as e:
+                    precio_num = parse_price(precio)
+                except ValueError as e:
                     st.error(f"Error en el precio: {e}")
-                    precio_num = 0.0
+                    return
 
-                # Parseo del costo
+                # Parseo del costo (opcional: vacío equivale a 0)
                 try:
-                    costo_num = float(costo.replace('$','').replace('.', '').replace(',', '.').strip())
-                except Exception as e:
+                    costo_num = parse_price(costo) if costo.strip() else 0.0
+                except ValueError as e:
                     st.error(f"Error en el costo: {e}")
-                    costo_num = 0.0
+                    return
 
                 categoria = categoria.strip()
                 if not categoria:
@@ -75,7 +70,7 @@ class ProductManager:
                     return
 
                 # Manejo de categorías nuevas
-                current_categories = self.df["CATEGORIA"].astype(str).str.strip().unique().tolist()
+                current_categories = data_ops.categories()
                 if cat_option == "Nueva" and categoria in current_categories:
                     st.warning(f"La categoría '{categoria}' ya existía, se usará esa.")
                 elif cat_option == "Nueva" and categoria not in current_categories:
@@ -84,16 +79,13 @@ class ProductManager:
                     else:
                         st.session_state.category_order = current_categories + [categoria]
 
-                # Generación de SKU
-                used_skus = st.session_state["used_skus"]
-                cat_codes = st.session_state["cat_codes"]
+                # Generación de SKU con el registro compartido (no repite SKUs del catálogo)
                 sku = generar_sku(
                     nombre_producto=producto,
                     categoria=categoria,
                     fraccionamiento=variante,
                     tipo=tipo,
-                    used_skus=used_skus,
-                    cat_codes=cat_codes
+                    registry=data_ops.sku_registry()
                 )
 
                 # Nuevo diccionario incluyendo COSTO
@@ -110,19 +102,10 @@ class ProductManager:
                 }
 
                 # Inserción en el DataFrame manteniendo orden por categoría
-                df_current = st.session_state.df
-                indices = df_current[df_current["CATEGORIA"].astype(str).str.strip() == categoria].index.tolist()
-                if indices:
-                    insert_index = indices[-1] + 1
-                    df_before = df_current.iloc[:insert_index]
-                    df_after  = df_current.iloc[insert_index:]
-                    new_row_df = pd.DataFrame([new_product])
-                    st.session_state.df = pd.concat([df_before, new_row_df, df_after], ignore_index=True)
-                else:
-                    st.session_state.df = pd.concat([df_current, pd.DataFrame([new_product])], ignore_index=True)
+                data_ops.add_product(new_product, categoria)
 
                 st.success(f"Producto '{producto}' agregado correctamente en la categoría '{categoria}' con SKU {sku}.")
-                st.dataframe(st.session_state.df)
+                st.dataframe(data_ops.get_catalog())
 
 
     def delete_product(self):
@@ -131,25 +114,28 @@ class ProductManager:
             st.info("No hay productos para eliminar.")
             return
 
-        categorias = self.df["CATEGORIA"].astype(str).str.strip().unique().tolist()
-        categorias.sort()
-        categoria_seleccionada = st.selectbox("Selecciona la categoría", options=categorias, key="delete_category_selectbox")
+        busqueda = st.text_input("Buscar productos (nombre, marca, categoría o SKU)", key="delete_busqueda")
+        categoria_seleccionada = None
+        if not busqueda.strip():
+            categorias = data_ops.categories(sort=True)
+            categoria_seleccionada = st.selectbox("Selecciona la categoría", options=categorias, key="delete_category_selectbox")
 
-        df_cat = self.df[self.df["CATEGORIA"].astype(str).str.strip() == categoria_seleccionada]
-        if df_cat.empty:
-            st.warning("No hay productos en la categoría seleccionada.")
-            return
+            df_cat = data_ops.category_rows(categoria_seleccionada)
+            if df_cat.empty:
+                st.warning("No hay productos en la categoría seleccionada.")
+                return
 
         with st.form(key="delete_product_form"):
-            opciones = df_cat.apply(lambda row: f"{row.name} - {row['PRODUCTO']}", axis=1).tolist()
-            productos_a_eliminar = st.multiselect("Selecciona los productos a eliminar", options=opciones)
+            opciones = data_ops.product_options(busqueda, categoria_seleccionada, st.session_state.get("delete_products_multiselect", []))
+            productos_a_eliminar = st.multiselect("Selecciona los productos a eliminar", options=opciones, format_func=data_ops.product_label, key="delete_products_multiselect")
 
             submitted = st.form_submit_button("Eliminar Productos Seleccionados")
             if submitted:
                 if not productos_a_eliminar:
                     st.warning("No seleccionaste ningún producto.")
                 else:
-                    indices = [int(op.split(" - ")[0]) for op in productos_a_eliminar]
-                    st.session_state.df = st.session_state.df.drop(indices).reset_index(drop=True)
+                    indices = data_ops.positions_of(productos_a_eliminar)
+                    # La baja queda en el historial y la cola de sincronización la sube a la hoja
+                    data_ops.delete_products(indices)
                     st.success("Productos eliminados correctamente.")
                     st.dataframe(st.session_state.df)
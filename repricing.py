@@ -0,0 +1,68 @@
+# repricing.py
+import numpy as np
+import pandas as pd
+
+# Reglas disponibles
+MODO_PORCENTAJE = "Porcentaje"
+MODO_MONTO = "Monto fijo"
+MODO_MARGEN = "Margen sobre costo"
+MODOS = [MODO_PORCENTAJE, MODO_MONTO, MODO_MARGEN]
+
+def select_products(df, categorias=None, marcas=None, tipo=None, patron=""):
+    """
+    Máscara booleana de los productos que cumplen todos los filtros indicados:
+      - categorias / marcas: listas de valores (vacías = sin filtro),
+      - tipo: "KG" o "UNIDAD" (None = ambos),
+      - patron: expresión regular sobre PRODUCTO, sin distinguir mayúsculas.
+    """
+    mask = pd.Series(True, index=df.index)
+    if categorias:
+        mask &= df["CATEGORIA"].astype(str).str.strip().isin(categorias)
+    if marcas:
+        mask &= df["MARCA"].astype(str).str.strip().isin(marcas)
+    if tipo:
+        mask &= df["KG / UNIDAD"].astype(str).str.strip().str.upper() == tipo
+    if patron:
+        mask &= df["PRODUCTO"].astype(str).str.contains(patron, case=False, regex=True, na=False)
+    return mask
+
+def reprice(df, mask, modo, valor, redondeo=0.0, columna="PRECIO VENTA"):
+    """
+    Calcula los precios nuevos de los productos seleccionados en una sola pasada vectorizada.
+      - MODO_PORCENTAJE: columna * (1 + valor / 100)
+      - MODO_MONTO: columna + valor
+      - MODO_MARGEN: COSTO * (1 + valor / 100) (solo productos con COSTO > 0; solo PRECIO VENTA)
+    Si 'redondeo' > 0, el resultado se redondea al múltiplo más cercano (ej. 10, 50, 100).
+    Retorna la vista previa con los productos cuyo valor cambia:
+    PRODUCTO, CATEGORIA, MARCA, antes, después y diferencia (%), con el índice de df.
+    """
+    actual = df.loc[mask, columna].astype(float)
+    if modo == MODO_PORCENTAJE:
+        nuevo = actual * (1 + valor / 100)
+    elif modo == MODO_MONTO:
+        nuevo = actual + valor
+    elif modo == MODO_MARGEN:
+        if columna != "PRECIO VENTA":
+            raise ValueError("El margen sobre costo solo se aplica a PRECIO VENTA.")
+        costo = df.loc[mask, "COSTO"].astype(float)
+        nuevo = (costo * (1 + valor / 100)).where(costo > 0)
+    else:
+        raise ValueError(f"Modo de ajuste desconocido: '{modo}'")
+
+    if redondeo and redondeo > 0:
+        nuevo = (nuevo / redondeo).round() * redondeo
+    nuevo = nuevo.clip(lower=0).round(2)
+
+    cambia = nuevo.notna() & (nuevo.round(2) != actual.round(2))
+    preview = df.loc[cambia[cambia].index, ["PRODUCTO", "CATEGORIA", "MARCA"]].astype(str)
+    preview["antes"] = actual[cambia]
+    preview["después"] = nuevo[cambia]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        preview["diferencia (%)"] = ((preview["después"] / preview["antes"] - 1) * 100).round(1)
+    return preview
+
+def preview_to_changes(preview, columna="PRECIO VENTA"):
+    """
+    Convierte la vista previa en el dict {índice: {columna: valor}} de data_ops.update_products.
+    """
+    return {index: {columna: float(valor)} for index, valor in preview["después"].items()}
@@ -0,0 +1,230 @@
+# search_index.py
+import bisect
+import heapq
+import operator
+import re
+import unicodedata
+from collections import defaultdict
+
+import pandas as pd
+
+# Campos indexados y su peso en el ranking
+CAMPOS = {"PRODUCTO": 4, "SKU": 3, "MARCA": 2, "CATEGORIA": 1}
+
+# Similitud mínima (trigramas compartidos / trigramas de la consulta) para aceptar una palabra aproximada
+MIN_SIMILITUD = 0.5
+
+# Con hasta esta cantidad de candidatos, las palabras siguientes de la consulta se evalúan
+# sobre cada candidato en lugar de recorrer el vocabulario
+MAX_CANDIDATOS = 5000
+
+_PALABRA = re.compile(r"[a-z0-9]+")
+
+def fold(text):
+    """
+    Normaliza un texto para buscar: minúsculas y sin acentos ("Almendras Peladas" -> "almendras peladas").
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+def fold_series(serie):
+    """
+    Versión vectorizada de fold() para una columna completa.
+    """
+    return (serie.astype(str).fillna("").str.normalize("NFKD")
+            .str.encode("ascii", errors="ignore").str.decode("ascii").str.lower())
+
+def words(text):
+    return _PALABRA.findall(text)
+
+def trigrams(word):
+    w = f" {word} "
+    return {w[i:i + 3] for i in range(len(w) - 2)}
+
+class SearchIndex:
+    """
+    Índice de búsqueda en memoria sobre nombre, marca, categoría y SKU de los productos,
+    identificados por su clave (ver CatalogIndex.keys).
+    - Cada palabra (sin acentos) apunta a los productos que la contienen, con el peso del campo.
+    - El vocabulario se mantiene ordenado para buscar por prefijo con bisect.
+    - Cada trigrama apunta a las palabras que lo contienen, para aceptar errores de tipeo.
+    Se actualiza por producto (update / remove), sin reconstruirse.
+    """
+    def __init__(self):
+        self._docs = {}                      # clave -> tupla de campos normalizados
+        self._postings = defaultdict(dict)   # palabra -> {clave: peso}
+        self._vocab = []                     # palabras ordenadas
+        self._vocab_dirty = False            # el vocabulario se reordena en la próxima búsqueda
+        self._trigrams = defaultdict(set)    # trigrama -> palabras
+        self._order = {}                     # clave -> posición (desempate del ranking)
+        self._raw = None                     # texto indexado por clave, para detectar cambios
+        self.version = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _add_word(self, word, key, peso):
+        posting = self._postings[word]
+        if not posting:
+            if not self._vocab_dirty:
+                bisect.insort(self._vocab, word)
+            for tri in trigrams(word):
+                self._trigrams[tri].add(word)
+        posting[key] = max(peso, posting.get(key, 0))
+
+    def _remove_word(self, word, key):
+        posting = self._postings.get(word)
+        if posting is None:
+            return
+        posting.pop(key, None)
+        if not posting:
+            del self._postings[word]
+            if not self._vocab_dirty:
+                i = bisect.bisect_left(self._vocab, word)
+                if i < len(self._vocab) and self._vocab[i] == word:
+                    del self._vocab[i]
+            for tri in trigrams(word):
+                self._trigrams[tri].discard(word)
+
+    def _doc_words(self, doc):
+        for campo, texto in zip(CAMPOS, doc):
+            for word in words(texto):
+                yield word, CAMPOS[campo]
+
+    def update(self, key, doc):
+        """
+        Indexa (o reindexa) un producto. 'doc' es la tupla de campos normalizados en el orden de CAMPOS.
+        """
+        anterior = self._docs.get(key)
+        if anterior == doc:
+            return
+        if anterior is not None:
+            for word, _ in self._doc_words(anterior):
+                self._remove_word(word, key)
+        self._docs[key] = doc
+        for word, peso in self._doc_words(doc):
+            self._add_word(word, key, peso)
+
+    def remove(self, key):
+        doc = self._docs.pop(key, None)
+        if doc is not None:
+            for word, _ in self._doc_words(doc):
+                self._remove_word(word, key)
+        self._order.pop(key, None)
+
+    def sync(self, df, keys, version=None):
+        """
+        Pone el índice al día con el catálogo: compara en forma vectorizada el texto actual con
+        el último indexado y solo normaliza y reindexa los productos que cambiaron; los que ya
+        no están se quitan.
+        """
+        campos = [campo for campo in CAMPOS if campo in df.columns]
+        actual = df[campos].astype(str).fillna("").set_axis(pd.Index(keys), axis=0)
+        actual = actual.reindex(columns=list(CAMPOS), fill_value="")
+        if self._raw is None:
+            cambiados = actual
+        else:
+            if self._raw.index.equals(actual.index):
+                previo = self._raw
+            else:
+                for key in self._raw.index.difference(actual.index):
+                    self.remove(key)
+                previo = self._raw.reindex(actual.index)
+            distinto = pd.Series(False, index=actual.index)
+            for campo in CAMPOS:
+                distinto |= actual[campo].ne(previo[campo]).fillna(True).astype(bool)
+            cambiados = actual[distinto]
+        if len(cambiados) > 1000:
+            # Carga masiva: en lugar de insertar palabra por palabra se ordena el vocabulario una vez
+            self._vocab_dirty = True
+        if len(cambiados):
+            docs = zip(*(fold_series(cambiados[campo]).tolist() for campo in CAMPOS))
+            for key, doc in zip(cambiados.index, docs):
+                self.update(key, doc)
+        self._raw = actual
+        self._order = {key: pos for pos, key in enumerate(keys)}
+        self.version = version
+
+    def _prefix_range(self, token):
+        """
+        Rango [inicio, fin) del vocabulario ordenado con las palabras que empiezan con 'token'.
+        """
+        return bisect.bisect_left(self._vocab, token), bisect.bisect_left(self._vocab, token + "\uffff")
+
+    def _match_word(self, token):
+        """
+        Palabras del vocabulario que coinciden con 'token' y su puntaje:
+        1.0 si es la palabra exacta, 0.8 si es prefijo, y la similitud de trigramas (< 0.8) si es aproximada.
+        """
+        inicio, fin = self._prefix_range(token)
+        resultado = {word: 1.0 if word == token else 0.8 for word in self._vocab[inicio:fin]}
+        # Las palabras aproximadas solo se buscan si ninguna coincide por prefijo (errores de tipeo)
+        if len(token) >= 3 and not resultado:
+            tris = trigrams(token)
+            compartidos = defaultdict(int)
+            for tri in tris:
+                for word in self._trigrams.get(tri, ()):
+                    compartidos[word] += 1
+            for word, n in compartidos.items():
+                # Una palabra de largo L tiene a lo sumo L trigramas (con los bordes)
+                similitud = n / max(len(tris), len(word))
+                if similitud >= MIN_SIMILITUD and word not in resultado:
+                    resultado[word] = min(similitud, 0.79)
+        return resultado
+
+    def _expand(self, token):
+        """
+        {clave: puntaje} de los productos con alguna palabra que coincide con 'token'.
+        """
+        por_clave = {}
+        for word, score in self._match_word(token).items():
+            for key, peso in self._postings[word].items():
+                valor = score * peso
+                if valor > por_clave.get(key, 0):
+                    por_clave[key] = valor
+        return por_clave
+
+    def _score_doc(self, token, tris, key):
+        """
+        Puntaje de 'token' contra las palabras de un solo producto (mismos criterios que _match_word).
+        """
+        mejor = 0
+        for word, peso in self._doc_words(self._docs[key]):
+            if word == token:
+                score = 1.0
+            elif word.startswith(token):
+                score = 0.8
+            elif tris:
+                similitud = len(tris & trigrams(word)) / max(len(tris), len(word))
+                score = min(similitud, 0.79) if similitud >= MIN_SIMILITUD else 0
+            else:
+                score = 0
+            mejor = max(mejor, score * peso)
+        return mejor
+
+    def search(self, query, limit=50):
+        """
+        Claves de los productos que coinciden con todas las palabras de 'query' (por prefijo
+        o aproximadas), ordenadas por relevancia y, a igual puntaje, por posición en el catálogo.
+        Se empieza por la palabra más selectiva y las demás se evalúan solo sobre esos candidatos.
+        """
+        tokens = list(dict.fromkeys(words(fold(query))))
+        if not tokens:
+            return []
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        # Primero la palabra con menos coincidencias por prefijo
+        tokens.sort(key=lambda token: -operator.sub(*self._prefix_range(token)))
+        puntajes = self._expand(tokens[0])
+        for token in tokens[1:]:
+            if not puntajes:
+                return []
+            if len(puntajes) <= MAX_CANDIDATOS:
+                tris = trigrams(token) if len(token) >= 3 else None
+                nuevos = {key: self._score_doc(token, tris, key) for key in puntajes}
+            else:
+                nuevos = self._expand(token)
+            puntajes = {key: puntajes[key] + valor for key, valor in nuevos.items() if valor and key in puntajes}
+        orden = self._order
+        return heapq.nsmallest(limit, puntajes, key=lambda key: (-puntajes[key], orden.get(key, 0)))
@@ -0,0 +1,87 @@
+# shared_catalog.py
+import threading
+
+import pandas as pd
+import streamlit as st
+
+def _copy_on_write():
+    """
+    True si pandas usa Copy-on-Write (siempre en pandas >= 3; antes, solo si la aplicación
+    activó la opción 'mode.copy_on_write').
+    """
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+def _copia(df):
+    """
+    Copia de la base para una sesión (o de una sesión para la base): superficial con
+    Copy-on-Write, completa si no, para que editar una no modifique la otra.
+    """
+    return df.copy(deep=not _copy_on_write())
+
+class SharedCatalog:
+    """
+    Catálogo base compartido (solo lectura) por todas las sesiones de Streamlit del proceso.
+    Cada sesión trabaja sobre una copia superficial de la base: con Copy-on-Write de pandas
+    las columnas que la sesión no edita siguen apuntando a la memoria de la base, y al editar
+    solo se copia el bloque de la columna modificada (el overlay de la sesión). Con pandas
+    anteriores a 3 sin Copy-on-Write activado, las copias son completas (ver _copia).
+    Al subir los cambios, la sesión publica su catálogo como la nueva base; cuando cambia la
+    versión sincronizada de la réplica local (cambios hechos en la hoja, subidas del worker)
+    la base se vuelve a publicar desde la réplica (ver refresh).
+    Junto a la base se guardan las claves de sus filas (ver catalog_index), que las sesiones
+    toman al hacer checkout para identificar a los productos igual que la réplica.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._df = None
+        self._keys = None
+        self.version = 0
+        self.store_revision = None
+
+    def publish(self, df, keys, store_revision=None):
+        """
+        Publica 'df' (con las claves 'keys' de sus filas) como la nueva base y retorna su versión.
+        'store_revision' es la revisión de la réplica local de la que sale 'df' (si se conoce).
+        """
+        with self._lock:
+            self._df = _copia(df)
+            self._keys = list(keys)
+            self.version += 1
+            if store_revision is not None:
+                self.store_revision = store_revision
+            return self.version
+
+    def refresh(self, store_revision, loader):
+        """
+        Si la base se publicó a partir de una revisión de la réplica distinta de 'store_revision',
+        publica loader() -> (df, claves) como nueva base (una sola sesión la carga).
+        Retorna True si se publicó.
+        """
+        with self._lock:
+            if store_revision == self.store_revision:
+                return False
+            loaded = loader()
+            if loaded is None:
+                return False
+            df, keys = loaded
+            self._df = _copia(df)
+            self._keys = list(keys)
+            self.version += 1
+            self.store_revision = store_revision
+            return True
+
+    def checkout(self):
+        """
+        Retorna (copia de la base, claves de sus filas, versión),
+        o (None, None, 0) si todavía no hay base.
+        """
+        with self._lock:
+            if self._df is None:
+                return None, None, 0
+            return _copia(self._df), list(self._keys), self.version
+
+@st.cache_resource(show_spinner=False)
+def get_shared_catalog():
+    return SharedCatalog()
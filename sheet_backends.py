@@ -0,0 +1,251 @@
+# sheet_backends.py
+import json
+import os
+import threading
+import time
+
+import gspread
+from gspread.exceptions import APIError
+from gspread.utils import a1_range_to_grid_range, extract_id_from_url
+from oauth2client.service_account import ServiceAccountCredentials
+
+class GoogleSheetsBackend:
+    """
+    Backend real: autentica contra Google con la cuenta de servicio de st.secrets.
+    """
+    def authorize(self, scope):
+        import streamlit as st
+
+        raw_json = st.secrets["gcp_service_account"]["json"]
+        service_account_info = json.loads(raw_json)
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(service_account_info, scope)
+        return gspread.authorize(creds)
+
+# --------------------------
+# Backend fake (memoria o disco)
+# --------------------------
+
+class _FakeResponse:
+    """
+    Respuesta mínima para construir un APIError como los que devuelve gspread.
+    """
+    def __init__(self, code, message):
+        self.status_code = code
+        self.text = message
+        self._error = {"code": code, "message": message, "status": "RESOURCE_EXHAUSTED"}
+
+    def json(self):
+        return {"error": self._error}
+
+class FakeWorksheet:
+    """
+    Hoja en memoria con la parte de la API de gspread.Worksheet que usa SheetConnector.
+    Las filas se guardan como listas de valores (la primera fila es el encabezado).
+    """
+    def __init__(self, backend, spreadsheet_id, sheet_id):
+        self._backend = backend
+        self.spreadsheet_id = spreadsheet_id
+        self.id = sheet_id
+
+    @property
+    def rows(self):
+        return self._backend._sheets[self.spreadsheet_id]["rows"]
+
+    @property
+    def row_count(self):
+        return max(len(self.rows), 1)
+
+    def _values(self):
+        """
+        Como la API real, no devuelve las filas vacías del final de la hoja.
+        """
+        rows = self.rows
+        last = len(rows)
+        while last > 0 and not any(str(v) != "" for v in rows[last - 1]):
+            last -= 1
+        return rows[:last]
+
+    def _write(self, range_name, values):
+        grid = a1_range_to_grid_range(range_name)
+        top = grid.get("startRowIndex", 0)
+        left = grid.get("startColumnIndex", 0)
+        for offset, row_values in enumerate(values):
+            row_idx = top + offset
+            while len(self.rows) <= row_idx:
+                self.rows.append([])
+            row = self.rows[row_idx]
+            while len(row) < left + len(row_values):
+                row.append("")
+            row[left:left + len(row_values)] = list(row_values)
+
+    def get_all_values(self):
+        self._backend._api_call("get_all_values")
+        return [list(row) for row in self._values()]
+
+    def get_all_records(self):
+        self._backend._api_call("get_all_records")
+        rows = self._values()
+        if not rows:
+            return []
+        header = rows[0]
+        return [
+            {col: (row[i] if i < len(row) else "") for i, col in enumerate(header)}
+            for row in rows[1:]
+        ]
+
+    def get(self, range_name):
+        self._backend._api_call("get")
+        grid = a1_range_to_grid_range(range_name)
+        rows = self._values()
+        top = grid.get("startRowIndex", 0)
+        bottom = grid.get("endRowIndex", len(rows))
+        left = grid.get("startColumnIndex", 0)
+        right = grid.get("endColumnIndex")
+        return [list(row[left:right]) for row in rows[top:bottom]]
+
+    def update(self, range_name, values=None):
+        # Acepta el orden viejo update('A1', values) y el nuevo update(values, 'A1')
+        if not isinstance(range_name, str):
+            range_name, values = values, range_name
+        self._backend._api_call("update")
+        self._write(range_name, values)
+        self._backend._touch(self.spreadsheet_id)
+
+    def batch_update(self, data):
+        self._backend._api_call("values_batch_update")
+        for item in data:
+            self._write(item["range"], item["values"])
+        self._backend._touch(self.spreadsheet_id)
+
+    def batch_clear(self, ranges):
+        self._backend._api_call("values_batch_clear")
+        for range_name in ranges:
+            grid = a1_range_to_grid_range(range_name)
+            top = grid.get("startRowIndex", 0)
+            bottom = min(grid.get("endRowIndex", len(self.rows)), len(self.rows))
+            left = grid.get("startColumnIndex", 0)
+            for row in self.rows[top:bottom]:
+                right = min(grid.get("endColumnIndex", len(row)), len(row))
+                for col in range(left, right):
+                    row[col] = ""
+        self._backend._touch(self.spreadsheet_id)
+
+    def delete_rows(self, start_index, end_index=None):
+        self._backend._api_call("delete_rows")
+        end_index = start_index if end_index is None else end_index
+        del self.rows[start_index - 1:end_index]
+        self._backend._touch(self.spreadsheet_id)
+
+def _cell_value(cell):
+    # CellData de updateCells -> valor guardado en la hoja fake
+    return next(iter(cell.get("userEnteredValue", {}).values()), "")
+
+class FakeSpreadsheet:
+    def __init__(self, backend, spreadsheet_id):
+        self._backend = backend
+        self.id = spreadsheet_id
+
+    @property
+    def sheet1(self):
+        self._backend._api_call("fetch_sheet_metadata")
+        return FakeWorksheet(self._backend, self.id, 0)
+
+    def batch_update(self, body):
+        """
+        Modela los pedidos que usa SheetConnector: deleteDimension e insertDimension sobre filas
+        y updateCells con valores. Como la API real, se aplican en orden y todos o ninguno.
+        """
+        self._backend._api_call("batch_update")
+        rows = [list(row) for row in self._backend._sheets[self.id]["rows"]]
+        for request in body.get("requests", []):
+            if "deleteDimension" in request:
+                grid = request["deleteDimension"]["range"]
+                del rows[grid["startIndex"]:grid["endIndex"]]
+            elif "insertDimension" in request:
+                grid = request["insertDimension"]["range"]
+                if grid["startIndex"] > len(rows):
+                    raise ValueError("insertDimension fuera de la hoja")
+                rows[grid["startIndex"]:grid["startIndex"]] = [[] for _ in range(grid["endIndex"] - grid["startIndex"])]
+            else:
+                update = request["updateCells"]
+                grid = update["range"]
+                for offset, fila in enumerate(update["rows"]):
+                    row_idx = grid["startRowIndex"] + offset
+                    while len(rows) <= row_idx:
+                        rows.append([])
+                    row = rows[row_idx]
+                    left = grid["startColumnIndex"]
+                    while len(row) < left + len(fila["values"]):
+                        row.append("")
+                    row[left:left + len(fila["values"])] = [_cell_value(cell) for cell in fila["values"]]
+        self._backend._sheets[self.id]["rows"] = rows
+        self._backend._touch(self.id)
+        return {"spreadsheetId": self.id, "replies": [{} for _ in body.get("requests", [])]}
+
+class FakeClient:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def open_by_url(self, url):
+        spreadsheet_id = extract_id_from_url(url)
+        self._backend._api_call("open_by_url")
+        self._backend._sheets.setdefault(spreadsheet_id, {"revision": 0, "rows": []})
+        return FakeSpreadsheet(self._backend, spreadsheet_id)
+
+    def get_file_drive_metadata(self, spreadsheet_id):
+        self._backend._api_call("get_file_drive_metadata")
+        sheet = self._backend._sheets.get(spreadsheet_id, {"revision": 0})
+        return {"id": spreadsheet_id, "modifiedTime": str(sheet["revision"])}
+
+class FakeSheetsBackend:
+    """
+    Backend en proceso que imita a Google Sheets sin red.
+    - latency: segundos de espera por llamada a la API (simula la red).
+    - quota_error_every: si es N > 0, cada N-ésima llamada falla con APIError 429.
+    - path: si se indica, las hojas se persisten en ese archivo JSON después de cada escritura.
+    'calls' cuenta las llamadas a la API por tipo.
+    """
+    def __init__(self, latency=0.0, quota_error_every=0, path=None):
+        self.latency = latency
+        self.quota_error_every = quota_error_every
+        self.path = path
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._sheets = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._sheets = json.load(f)
+
+    def authorize(self, scope):
+        return FakeClient(self)
+
+    def _api_call(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            total = sum(self.calls.values())
+        if self.latency:
+            time.sleep(self.latency)
+        if self.quota_error_every and total % self.quota_error_every == 0:
+            raise APIError(_FakeResponse(429, "Quota exceeded (fake)"))
+
+    def _touch(self, spreadsheet_id):
+        self._sheets[spreadsheet_id]["revision"] += 1
+        if self.path:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self._sheets, f, ensure_ascii=False)
+
+    def load_dataframe(self, spreadsheet_url, df):
+        """
+        Carga un DataFrame como contenido de la primera hoja (sin contar llamadas a la API).
+        """
+        values = df.astype(object).where(df.notna(), "").values.tolist()
+        spreadsheet_id = extract_id_from_url(spreadsheet_url)
+        self._sheets[spreadsheet_id] = {"revision": 0, "rows": [df.columns.tolist()] + values}
+        self._touch(spreadsheet_id)
+
+    def rows(self, spreadsheet_url):
+        return self._sheets[extract_id_from_url(spreadsheet_url)]["rows"]
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls = {}
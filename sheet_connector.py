@@ -1,22 +1,234 @@
-import json
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import streamlit as st
 import pandas as pd
+import numpy as np
 import concurrent.futures
+import threading
+import time
+from gspread.utils import extract_id_from_url, rowcol_to_a1
+from sheet_backends import GoogleSheetsBackend
+from price_parser import parse_prices
+from catalog_schema import apply_schema, FLOAT_COLUMNS
 
-def get_data_from_sheet(spreadsheet_url):
+# Backend de la API de hojas usado por todos los SheetConnector del proceso
+# (Google Sheets por defecto; en tests y benchmarks se reemplaza por FakeSheetsBackend)
+_backend = None
+
+# Segundos durante los cuales se reutiliza la última lectura sin consultar al spreadsheet
+CACHE_TTL = 60
+
+# Cache de lecturas por URL: {url: {"revision": str, "checked_at": float, "df": DataFrame}}
+_data_cache = {}
+_cache_lock = threading.Lock()
+
+# Filas por lectura al descargar la hoja por tramos
+CHUNK_ROWS = 5000
+
+# Segundos que se reutiliza un cliente autenticado antes de regenerarlo (los tokens duran 1 hora)
+CLIENT_MAX_AGE = 45 * 60
+
+# Pool de clientes y handles compartido por todas las sesiones del proceso (y por el worker de fondo):
+# _client_pool: {scope: {"client": Client, "created_at": float}}
+# _sheet_pool: {url: {"client": Client, "spreadsheet": Spreadsheet, "sheet": Worksheet}}
+_client_pool = {}
+_sheet_pool = {}
+_pool_lock = threading.Lock()
+
+# Última versión del catálogo sincronizada con cada spreadsheet en este proceso: {url: DataFrame}
+_synced_snapshots = {}
+
+# Un push por diferencias que supere alguno de estos límites se reemplaza por una reescritura completa:
+# pedidos en el batchUpdate y fracción de las celdas de la hoja que habría que escribir
+MAX_DIFF_REQUESTS = 1000
+MAX_DIFF_FRACTION = 0.5
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = GoogleSheetsBackend()
+    return _backend
+
+def set_backend(backend):
+    """
+    Reemplaza el backend del proceso y descarta clientes, handles, cache y snapshots
+    que pertenecían al anterior.
+    """
+    global _backend
+    _backend = backend
+    reset_pool()
+    invalidate_cache()
+    _synced_snapshots.clear()
+
+def get_data_from_sheet(spreadsheet_url, ttl=CACHE_TTL, on_chunk=None):
     connector = SheetConnector(spreadsheet_url)
-    return connector.get_data()
+    return connector.get_cached_data(ttl, on_chunk=on_chunk)
+
+def invalidate_cache(spreadsheet_url=None):
+    """
+    Descarta la lectura cacheada del spreadsheet indicado (o de todos si no se indica).
+    Se llama después de cualquier escritura para que la próxima lectura vaya a la hoja.
+    """
+    with _cache_lock:
+        if spreadsheet_url is None:
+            _data_cache.clear()
+        else:
+            _data_cache.pop(spreadsheet_url, None)
+
+def reset_pool():
+    """
+    Descarta los clientes y handles del pool; la próxima operación vuelve a autenticar.
+    """
+    with _pool_lock:
+        _client_pool.clear()
+        _sheet_pool.clear()
+
+def _sheet_values(df):
+    """
+    Convierte el DataFrame en la matriz de valores que se escribe en la hoja (NaN -> "").
+    """
+    df_clean = df.astype(object)
+    df_clean = df_clean.where(pd.notnull(df_clean), "")
+    return df_clean.values
+
+def _cell(value):
+    """
+    Valor de celda para un pedido updateCells (equivale a escribir el valor en crudo).
+    """
+    if value is None or (isinstance(value, str) and value == ""):
+        return {}
+    if isinstance(value, (bool, np.bool_)):
+        return {"userEnteredValue": {"boolValue": bool(value)}}
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return {"userEnteredValue": {"numberValue": value.item() if hasattr(value, "item") else value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+def _update_cells(sheet_id, row, first_col, values):
+    """
+    Pedido updateCells para 'values' (filas de celdas) a partir de la fila 'row' del DataFrame
+    (la fila 1 de la hoja es el encabezado) y la columna 'first_col' (base 0).
+    """
+    row, first_col = int(row), int(first_col)  # el cuerpo se serializa como JSON
+    return {
+        "updateCells": {
+            "range": {
+                "sheetId": sheet_id,
+                "startRowIndex": row + 1,
+                "endRowIndex": row + 1 + len(values),
+                "startColumnIndex": first_col,
+                "endColumnIndex": first_col + len(values[0]),
+            },
+            "rows": [{"values": [_cell(v) for v in fila]} for fila in values],
+            "fields": "userEnteredValue",
+        }
+    }
+
+def _dimension(kind, sheet_id, start, end):
+    # Filas [start, end] del DataFrame (base 0) -> rango de filas de la hoja
+    rango = {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": start + 1, "endIndex": end + 2}
+    if kind == "insertDimension":
+        return {kind: {"range": rango, "inheritFromBefore": False}}
+    return {kind: {"range": rango}}
+
+def _row_keys(df):
+    """
+    Claves para alinear las filas de dos versiones cuando no se conocen las de la réplica:
+    el SKU si no está vacío ni repetido; si no, el contenido de la fila (con su número de
+    aparición). Una fila sin SKU que cambió se trata como una baja y un alta.
+    """
+    if "SKU" in df.columns:
+        skus = df["SKU"].astype(object).where(df["SKU"].notna(), "").map(str).str.strip()
+        unicos = (skus.ne("") & ~skus.duplicated(keep=False)).to_numpy()
+        keys = skus.tolist()
+    else:
+        unicos = np.zeros(len(df), dtype=bool)
+        keys = [""] * len(df)
+    resto = np.flatnonzero(~unicos)
+    vistas = {}
+    for pos, fila in zip(resto.tolist(), _sheet_values(df.iloc[resto]).tolist()):
+        texto = "#" + "\x1f".join(map(str, fila))
+        vistas[texto] = vistas.get(texto, 0) + 1
+        keys[pos] = f"{texto}\x1e{vistas[texto]}"
+    return keys
+
+def _runs(positions):
+    # Posiciones ordenadas -> tramos contiguos [(inicio, fin), ...] de arriba hacia abajo
+    return list(reversed(coalesce_rows(positions)))
+
+def compute_sheet_diff(old_df, new_df, old_keys=None, new_keys=None, sheet_id=0):
+    """
+    Compara la última versión sincronizada (old_df) con el catálogo actual (new_df) y
+    devuelve los pedidos de un único spreadsheets.batchUpdate (atómico) que llevan la hoja
+    de una a la otra:
+      - deleteDimension para las filas de productos eliminados (de abajo hacia arriba),
+      - insertDimension para las filas nuevas, en su posición final (de arriba hacia abajo),
+      - updateCells con las filas nuevas y las celdas modificadas de las demás (tramos
+        contiguos por fila).
+    Las filas se alinean por clave ('old_keys'/'new_keys', las de la réplica local; si no se
+    pasan, ver _row_keys), así un alta o una baja en el medio no desplaza a las filas siguientes
+    y lo escrito es proporcional a la edición.
+    Retorna None si hay que reescribir la hoja completa: cambiaron los encabezados o el diff
+    supera MAX_DIFF_REQUESTS pedidos o MAX_DIFF_FRACTION de las celdas (p.ej. un reordenamiento).
+    """
+    if list(old_df.columns) != list(new_df.columns):
+        return None
+    old_keys = _row_keys(old_df) if old_keys is None else list(old_keys)
+    new_keys = _row_keys(new_df) if new_keys is None else list(new_keys)
+    if len(set(old_keys)) != len(old_keys) or len(set(new_keys)) != len(new_keys):
+        return None
 
-def parse_price(price_str):
-    price_str = str(price_str).strip()
-    price_str = price_str.replace('$', '')
-    price_str = price_str.replace('.', '')
-    try:
-        return float(price_str)
-    except ValueError:
-        return 0.0
+    old_vals = _sheet_values(old_df)
+    new_vals = _sheet_values(new_df)
+    n_new, n_cols = len(new_vals), len(new_df.columns)
+    en_nueva = set(new_keys)
+    en_vieja = set(old_keys)
+    bajas = [pos for pos, key in enumerate(old_keys) if key not in en_nueva]
+    altas = [pos for pos, key in enumerate(new_keys) if key not in en_vieja]
+
+    requests = [_dimension("deleteDimension", sheet_id, start, end) for start, end in coalesce_rows(bajas)]
+    requests += [_dimension("insertDimension", sheet_id, start, end) for start, end in _runs(altas)]
+
+    # Después de bajas y altas, cada fila que no es un alta tiene la fila vieja que le sigue
+    # en el orden original: se comparan contra la versión nueva celda por celda
+    es_alta = np.zeros(n_new, dtype=bool)
+    es_alta[altas] = True
+    quedan = np.ones(len(old_vals), dtype=bool)
+    quedan[bajas] = False
+    destino = np.flatnonzero(~es_alta)
+    changed = np.zeros((n_new, n_cols), dtype=bool)
+    if len(destino):
+        changed[destino] = old_vals[quedan] != new_vals[destino]
+
+    celdas = len(altas) * n_cols
+    for start, end in _runs(altas):
+        requests.append(_update_cells(sheet_id, start, 0, new_vals[start:end + 1].tolist()))
+    for row in np.flatnonzero(changed.any(axis=1)):
+        cols = np.flatnonzero(changed[row]).tolist()
+        start = prev = cols[0]
+        for col in cols[1:] + [None]:
+            if col is not None and col == prev + 1:
+                prev = col
+                continue
+            requests.append(_update_cells(sheet_id, row, start, new_vals[row:row + 1, start:prev + 1].tolist()))
+            celdas += prev - start + 1
+            start = prev = col
+        if len(requests) > MAX_DIFF_REQUESTS:
+            return None
+
+    if celdas > MAX_DIFF_FRACTION * max(n_new, 1) * n_cols:
+        return None
+    return requests
+
+def coalesce_rows(row_numbers):
+    """
+    Agrupa números de fila en tramos contiguos [(inicio, fin), ...] ordenados de abajo hacia arriba.
+    Ejemplo: [3, 4, 5, 9, 10] -> [(9, 10), (3, 5)]
+    """
+    ranges = []
+    for row in sorted(set(row_numbers)):
+        if ranges and row == ranges[-1][1] + 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return [tuple(r) for r in reversed(ranges)]
 
 class SheetConnector:
     def __init__(self, spreadsheet_url):
@@ -26,71 +238,281 @@ class SheetConnector:
             "https://www.googleapis.com/auth/spreadsheets",
             "https://www.googleapis.com/auth/drive.file"
         ]
-        self.client = self.authenticate()
+        self.client = self.get_pooled_client()
+
+    def get_pooled_client(self):
+        """
+        Devuelve el cliente autenticado del pool para este scope, creándolo si no existe
+        o si superó CLIENT_MAX_AGE (así el token se renueva antes de expirar).
+        """
+        key = tuple(self.scope)
+        now = time.monotonic()
+        with _pool_lock:
+            entry = _client_pool.get(key)
+            if entry is None or now - entry["created_at"] > CLIENT_MAX_AGE:
+                entry = {"client": self.authenticate(), "created_at": now}
+                _client_pool[key] = entry
+            return entry["client"]
+
+    def _get_handles(self):
+        """
+        Devuelve la entrada del pool con el spreadsheet y su primera hoja ya abiertos.
+        Abrir el spreadsheet y resolver sheet1 cuestan una llamada a la API cada uno,
+        así que solo se hace la primera vez (o cuando se renovó el cliente).
+        """
+        self.client = self.get_pooled_client()
+        with _pool_lock:
+            entry = _sheet_pool.get(self.spreadsheet_url)
+        if entry is None or entry["client"] is not self.client:
+            spreadsheet = self.client.open_by_url(self.spreadsheet_url)
+            entry = {"client": self.client, "spreadsheet": spreadsheet, "sheet": spreadsheet.sheet1}
+            with _pool_lock:
+                _sheet_pool[self.spreadsheet_url] = entry
+        return entry
+
+    def get_spreadsheet(self):
+        return self._get_handles()["spreadsheet"]
+
+    def get_sheet(self):
+        return self._get_handles()["sheet"]
 
     def authenticate(self):
-        raw_json = st.secrets["gcp_service_account"]["json"]
-        service_account_info = json.loads(raw_json)
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(service_account_info, self.scope)
-        client = gspread.authorize(creds)
-        return client
-
-    def get_data(self):
-        spreadsheet = self.client.open_by_url(self.spreadsheet_url)
-        sheet = spreadsheet.sheet1
-        records = sheet.get_all_records()
-        df = pd.DataFrame(records)
-        df["PRECIO VENTA"] = df["PRECIO VENTA"].apply(parse_price)
-        df["STOCK"] = df["STOCK"].astype(str).str.strip()
+        return get_backend().authorize(self.scope)
+
+    def get_revision(self):
+        """
+        Devuelve la fecha de última modificación del spreadsheet según Drive.
+        Si no se puede obtener (p.ej. permisos), retorna None y la cache se rige solo por el TTL.
+        """
+        try:
+            metadata = self.get_pooled_client().get_file_drive_metadata(extract_id_from_url(self.spreadsheet_url))
+            return metadata.get("modifiedTime")
+        except Exception:
+            return None
+
+    def get_cached_data(self, ttl=CACHE_TTL, on_chunk=None):
+        """
+        Igual que get_data, pero reutiliza la última lectura mientras no venza el TTL.
+        Vencido el TTL se consulta solo la revisión del spreadsheet; la hoja completa
+        se vuelve a descargar únicamente si la revisión cambió.
+        """
+        now = time.monotonic()
+        with _cache_lock:
+            entry = _data_cache.get(self.spreadsheet_url)
+        if entry is not None and now - entry["checked_at"] < ttl:
+            return entry["df"].copy()
+
+        revision = self.get_revision()
+        if entry is not None and revision is not None and revision == entry["revision"]:
+            entry["checked_at"] = now
+            return entry["df"].copy()
+
+        df = self.get_data(on_chunk=on_chunk)
+        with _cache_lock:
+            _data_cache[self.spreadsheet_url] = {"revision": revision, "checked_at": now, "df": df}
+        return df.copy()
+
+    def _typed_frame(self, df):
+        """
+        Convierte un tramo crudo de la hoja (todo texto) al esquema tipado del catálogo.
+        """
+        precios, invalidos = parse_prices(df["PRECIO VENTA"])
+        if invalidos.any():
+            productos = ", ".join(df.loc[invalidos, "PRODUCTO"].astype(str).head(10))
+            st.warning(f"{int(invalidos.sum())} producto(s) con precio inválido en el spreadsheet "
+                       f"(quedan sin precio, no se exportan y su celda no se modifica): {productos}")
+        df["PRECIO VENTA"] = precios
+        if "COSTO" in df.columns:
+            df["COSTO"], _ = parse_prices(df["COSTO"])
+        # Esquema tipado: categóricas, precios float64 (NaN si faltan o son inválidos) y SKU internados
+        return apply_schema(df)
+
+    def iter_data(self, chunk_rows=CHUNK_ROWS):
+        """
+        Lee la hoja por tramos de chunk_rows filas en lugar de traerla entera con get_all_records.
+        Cada tramo se convierte directamente al esquema tipado y se entrega como
+        (DataFrame del tramo, progreso entre 0 y 1). El primer tramo incluye el encabezado.
+        Como get_all_records, conserva las filas vacías intermedias (la fila i del DataFrame
+        es la fila i + 2 de la hoja, que es lo que asume compute_sheet_diff) y descarta
+        solo las del final. Se lee hasta el primer tramo vacío: row_count viene de un handle
+        del pool que puede ser viejo y solo se usa para estimar el progreso.
+        """
+        sheet = self.get_sheet()
+        total_rows = max(sheet.row_count, 1)
+        header = None
+        blancos = 0  # filas vacías pendientes: se emiten solo si más abajo hay datos
+        start = 1
+        while True:
+            end = start + chunk_rows - 1
+            rows = sheet.get(f"{start}:{end}")
+            if not rows:
+                break
+            leidas = len(rows)
+            if header is None:
+                header, rows = list(rows[0]), rows[1:]
+            n_cols = len(header)
+            # La API recorta las celdas vacías del final de cada fila y las filas vacías del final del rango
+            filas = []
+            for row in rows:
+                if any(str(v) != "" for v in row):
+                    filas.extend([[""] * n_cols] * blancos)
+                    blancos = 0
+                    filas.append(list(row) + [""] * (n_cols - len(row)))
+                else:
+                    blancos += 1
+            blancos += chunk_rows - leidas
+            if filas:
+                yield self._typed_frame(pd.DataFrame(filas, columns=header)), min(end / total_rows, 1.0)
+            start = end + 1
+
+    def get_data(self, on_chunk=None):
+        """
+        Descarga el catálogo completo por tramos (ver iter_data).
+        'on_chunk(df_tramo, progreso)' permite ir mostrando datos mientras termina la carga.
+        """
+        chunks = []
+        for chunk, progress in self.iter_data():
+            chunks.append(chunk)
+            if on_chunk:
+                on_chunk(chunk, progress)
+        if not chunks:
+            return pd.DataFrame()
+        # Al concatenar, las categóricas de distintos tramos pasan a object: se reaplica el esquema
+        df = apply_schema(pd.concat(chunks, ignore_index=True))
+        _synced_snapshots[self.spreadsheet_url] = df
         return df
 
-    def update_data(self, df):
+    def update_data(self, df, base_df=None, full=False, base_keys=None, keys=None):
         """
         Actualiza la hoja de cálculo con los datos del DataFrame.
         Se asume que la primera fila de la hoja contiene los encabezados.
+        Si se conoce la última versión sincronizada (base_df o la registrada en este proceso)
+        solo se envían las diferencias en un único batchUpdate (ver compute_sheet_diff;
+        'base_keys' y 'keys' son las claves de las filas de cada versión, si se conocen);
+        si no, si full=True o si el diff es demasiado grande, se reescribe la hoja completa
+        y se vacían las filas sobrantes de versiones anteriores.
         """
-        spreadsheet = self.client.open_by_url(self.spreadsheet_url)
-        sheet = spreadsheet.sheet1
-        # Limpiar el DataFrame: reemplazar NaN por cadena vacía
-        df_clean = df.copy()
-        df_clean = df_clean.where(pd.notnull(df_clean), "")
-        # Convertir el DataFrame a lista de listas (incluyendo encabezados)
-        data = [df_clean.columns.tolist()] + df_clean.values.tolist()
-        # Actualizar la hoja, a partir de la celda A1
-        sheet.update('A1', data)
+        sheet = self.get_sheet()
+        if base_df is None and not full:
+            base_df, base_keys = _synced_snapshots.get(self.spreadsheet_url), None
+        updates = None
+        if base_df is not None and not full:
+            updates = compute_sheet_diff(base_df, df, base_keys, keys, sheet_id=sheet.id)
 
-    def delete_category_rows(self, category_name):
+        if updates is None:
+            # Convertir el DataFrame a lista de listas (incluyendo encabezados, NaN -> "")
+            values = _sheet_values(df).tolist()
+            self._keep_invalid_prices(df, values)
+            data = [df.columns.tolist()] + values
+            # Actualizar la hoja, a partir de la celda A1
+            sheet.update('A1', data)
+            if sheet.row_count > len(data):
+                last_col = rowcol_to_a1(1, max(len(df.columns), 1)).rstrip("1")
+                sheet.batch_clear([f"A{len(data) + 1}:{last_col}{sheet.row_count}"])
+        elif updates:
+            self.get_spreadsheet().batch_update({"requests": updates})
+
+        _synced_snapshots[self.spreadsheet_url] = df.copy()
+        invalidate_cache(self.spreadsheet_url)
+
+    def _keep_invalid_prices(self, df, values):
         """
-        Elimina del spreadsheet todas las filas cuyo valor en la columna "CATEGORIA"
-        coincida (ignorando mayúsculas y espacios) con category_name.
+        Antes de reescribir la hoja completa: los precios y costos que no se pudieron interpretar
+        quedan como NaN en el catálogo y se escribirían vacíos. Para no perder el texto original,
+        se lo copia de la hoja actual en 'values', buscando la fila por el resto de sus columnas.
+        Solo se conserva si ese texto sigue siendo inválido (si era un precio, el usuario lo borró).
         """
-        spreadsheet = self.client.open_by_url(self.spreadsheet_url)
-        sheet = spreadsheet.sheet1
+        cols = [col for col in FLOAT_COLUMNS if col in df.columns]
+        faltan = df[cols].isna().to_numpy()
+        if not faltan.any():
+            return
+        rows = self.get_sheet().get_all_values()
+        if not rows or rows[0][:len(df.columns)] != list(df.columns):
+            return
+        n_cols = len(df.columns)
+        pos_cols = [df.columns.get_loc(col) for col in cols]
+        otras = [i for i in range(n_cols) if i not in pos_cols]
+
+        def identidad(row):
+            return tuple(str(row[i]).strip() for i in otras)
+
+        actuales = {}
+        for row in rows[1:]:
+            row = list(row[:n_cols]) + [""] * (n_cols - len(row))
+            actuales.setdefault(identidad(row), row)
+        for pos in np.flatnonzero(faltan.any(axis=1)):
+            actual = actuales.get(identidad(values[pos]))
+            if actual is None:
+                continue
+            for j, col in enumerate(pos_cols):
+                if faltan[pos, j] and parse_prices([actual[col]])[1].iat[0]:
+                    values[pos][col] = actual[col]
+
+    def delete_rows_bulk(self, row_numbers):
+        """
+        Elimina varias filas de la hoja (numeración base 1, la fila 1 es el encabezado)
+        con un único batchUpdate. Las filas se agrupan en tramos contiguos y los tramos
+        se borran de abajo hacia arriba para que no se desplacen los índices.
+        Retorna la cantidad de filas eliminadas.
+        """
+        ranges = coalesce_rows(row_numbers)
+        if not ranges:
+            return 0
+        sheet = self.get_sheet()
+        requests = [
+            {
+                "deleteDimension": {
+                    "range": {
+                        "sheetId": sheet.id,
+                        "dimension": "ROWS",
+                        "startIndex": start - 1,
+                        "endIndex": end,
+                    }
+                }
+            }
+            for start, end in ranges
+        ]
+        self.get_spreadsheet().batch_update({"requests": requests})
+        # La hoja ya no coincide con la última versión sincronizada: el próximo push será completo
+        _synced_snapshots.pop(self.spreadsheet_url, None)
+        invalidate_cache(self.spreadsheet_url)
+        return sum(end - start + 1 for start, end in ranges)
+
+    def delete_matching_rows(self, column, values):
+        """
+        Elimina del spreadsheet todas las filas cuyo valor en 'column' coincida
+        (ignorando mayúsculas y espacios) con alguno de 'values'.
+        Retorna la cantidad de filas eliminadas.
+        """
+        sheet = self.get_sheet()
 
         # Obtener todas las filas de la hoja
         all_rows = sheet.get_all_values()
         if not all_rows:
-            return
+            return 0
 
         # Se asume que la primera fila es el encabezado.
         header = all_rows[0]
         try:
-            cat_index = header.index("CATEGORIA")
+            col_index = header.index(column)
         except ValueError:
-            st.error("No se encontró la columna 'CATEGORIA' en el spreadsheet.")
-            return
+            st.error(f"No se encontró la columna '{column}' en el spreadsheet.")
+            return 0
 
-        # Recorrer las filas (a partir de la fila 2) y almacenar las filas que coinciden
-        rows_to_delete = []
-        for i, row in enumerate(all_rows[1:], start=2):  # start=2: fila 1 es el encabezado
-            if len(row) > cat_index and row[cat_index].strip().lower() == category_name.strip().lower():
-                rows_to_delete.append(i)
+        targets = {str(v).strip().lower() for v in values}
+        rows_to_delete = [
+            i for i, row in enumerate(all_rows[1:], start=2)  # start=2: fila 1 es el encabezado
+            if len(row) > col_index and row[col_index].strip().lower() in targets
+        ]
+        return self.delete_rows_bulk(rows_to_delete)
 
-        # Ordenar en orden descendente para borrar sin afectar los índices
-        rows_to_delete.sort(reverse=True)
-        for row_num in rows_to_delete:
-            sheet.delete_rows(row_num)
+    def delete_category_rows(self, category_name):
+        """
+        Elimina del spreadsheet todas las filas cuyo valor en la columna "CATEGORIA"
+        coincida (ignorando mayúsculas y espacios) con category_name.
+        """
+        return self.delete_matching_rows("CATEGORIA", [category_name])
 
-def update_spreadsheet(spreadsheet_url, df):
+def update_spreadsheet(spreadsheet_url, df, base_df=None, full=False, base_keys=None, keys=None):
     connector = SheetConnector(spreadsheet_url)
-    connector.update_data(df)
+    connector.update_data(df, base_df=base_df, full=full, base_keys=base_keys, keys=keys)
@@ -1,32 +1,53 @@
 # sku_generator.py
 import re
+import sqlite3
+import threading
+from collections import defaultdict
+from contextlib import closing
 
-def generar_codigo_categoria(categoria, cat_codes):
+import numpy as np
+import pandas as pd
+
+from catalog_store import DB_PATH
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sku_categorias (categoria TEXT PRIMARY KEY, codigo TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS sku_bases (base TEXT PRIMARY KEY, conteo INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS sku_variantes (clave TEXT PRIMARY KEY, sku TEXT NOT NULL);
+"""
+
+def _normalizar_categoria(categoria):
+    return str(categoria).strip().lower()
+
+def _claves_variantes(nombres, categorias, variantes, repeticiones):
     """
-    Genera un código de categoría evitando colisiones.
-    - 'cat_codes' es un dict { nombre_categoria: codigo_generado } o un dict con { codigo_generado } usados.
-    - Si la categoría ya tiene un código asignado, lo reutiliza.
-    - Si no, comienza con las 3 primeras letras y expande hasta que no haya colisión.
+    Claves del registro de variantes ("categoría|producto|variante", en minúsculas) para
+    columnas alineadas, concatenando las columnas de una vez. La primera aparición del
+    producto (repetición 0) conserva la clave sin número (la de exportaciones anteriores);
+    las siguientes llevan "|n".
     """
-    # Normalizamos la categoría (sin espacios, en mayúsculas)
-    cat_upper = re.sub(r"\s+", "", categoria.strip().upper())
-    
-    # Si ya asignamos un código antes a esta categoría, lo devolvemos
-    for cat_name, code_asignado in cat_codes.items():
-        if cat_name.strip().lower() == categoria.strip().lower():
-            return code_asignado
-
-    # Intentar con longitud creciente: 3, 4, 5...
-    for length in range(3, len(cat_upper) + 1):
-        candidate = cat_upper[:length]
-        # Verificamos si candidate ya está en uso
-        if candidate not in cat_codes.values():
-            cat_codes[categoria] = candidate
-            return candidate
-    
-    # Si no encontramos uno libre, usamos todo cat_upper
-    cat_codes[categoria] = cat_upper
-    return cat_upper
+    def norm(serie):
+        # Series de objetos: .str usa los métodos de str de Python, igual que str(valor).strip().lower()
+        return pd.Series(serie, dtype=object).map(str).str.strip().str.lower().to_numpy()
+
+    claves = norm(categorias) + "|" + norm(nombres) + "|" + norm(variantes)
+    repeticiones = np.asarray(repeticiones)
+    con_numero = repeticiones > 0
+    claves[con_numero] = claves[con_numero] + "|" + repeticiones[con_numero].astype(str).astype(object)
+    return claves
+
+def _codigo_base_categoria(categoria):
+    """
+    Categoría sin espacios y en mayúsculas: de ahí salen los candidatos a código (3, 4, 5... letras).
+    """
+    return re.sub(r"\s+", "", str(categoria).strip().upper())
+
+def codigo_producto(nombre_producto):
+    """
+    Primeras 4 letras del producto, sin espacios y en mayúsculas.
+    """
+    nombre_norm = re.sub(r"\s+", "", str(nombre_producto)).upper()
+    return nombre_norm[:4]
 
 def procesar_fraccionamientos(fraccionamiento_str, tipo):
     """
@@ -59,36 +80,287 @@ def procesar_fraccionamientos(fraccionamiento_str, tipo):
     # Si no hay nada, retornamos [""] o []
     return fracs if fracs else [""]
 
-def generar_sku(nombre_producto, categoria, fraccionamiento, tipo, used_skus, cat_codes):
+class SkuRegistry:
+    """
+    Registro de SKUs compartido por todas las sesiones y persistido en la réplica local (SQLite):
+      - códigos de categoría en los dos sentidos (categoría -> código y código -> categoría),
+      - conteo por SKU base (CATE-TIPO-FRACC), para numerar los repetidos,
+      - conjunto de SKUs ya usados, reconstruido desde la columna SKU del catálogo,
+      - SKUs generados para variantes que no están en el catálogo (export a Tienda Nube).
+    Todas las consultas son búsquedas en dicts/sets, sin recorrer los códigos existentes.
+    """
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self.cat_codes = {}                 # categoría normalizada -> código
+        self.code_owner = {}                # código -> categoría normalizada
+        self.base_counts = defaultdict(int)  # SKU base -> cantidad emitida
+        self.used = set()                   # SKUs en uso
+        self.variant_skus = {}              # (categoría|producto|variante) -> SKU generado
+        for categoria, codigo in self._execute("SELECT categoria, codigo FROM sku_categorias"):
+            self.cat_codes[categoria] = codigo
+            self.code_owner[codigo] = categoria
+        for base, conteo in self._execute("SELECT base, conteo FROM sku_bases"):
+            self.base_counts[base] = conteo
+        for clave, sku in self._execute("SELECT clave, sku FROM sku_variantes"):
+            self.variant_skus[clave] = sku
+            self.used.add(sku)
+
+    def _execute(self, sql, params=(), many=False):
+        with closing(sqlite3.connect(self.path, timeout=30)) as con:
+            with con:
+                con.executescript(_SCHEMA)
+                if many:
+                    con.executemany(sql, params)
+                    return []
+                return con.execute(sql, params).fetchall()
+
+    def _persist(self, categorias=(), bases=()):
+        if categorias:
+            self._execute("INSERT OR REPLACE INTO sku_categorias (categoria, codigo) VALUES (?, ?)",
+                          [(c, self.cat_codes[c]) for c in categorias], many=True)
+        if bases:
+            self._execute("INSERT OR REPLACE INTO sku_bases (base, conteo) VALUES (?, ?)",
+                          [(b, self.base_counts[b]) for b in bases], many=True)
+
+    def sync_catalog(self, df):
+        """
+        Incorpora los SKUs y códigos de categoría que ya están en el catálogo (por ejemplo los
+        cargados en la hoja o editados a mano), para que no se vuelvan a emitir.
+        """
+        if "SKU" not in df.columns or df.empty:
+            return
+        skus = df["SKU"].astype(str).str.strip()
+        validos = df["SKU"].notna() & (skus != "") & (skus.str.upper() != "NAN")
+        con_sku = pd.DataFrame({
+            "sku": skus[validos],
+            "categoria": df.loc[validos, "CATEGORIA"].astype(str).map(_normalizar_categoria),
+        })
+        todos = con_sku["sku"].str.split(",").explode().str.strip()
+        todos = todos[todos != ""]
+        # Código de categoría: primer segmento del primer SKU de cada categoría
+        codigos = con_sku.assign(codigo=con_sku["sku"].str.split("-").str[0].str.strip())
+        codigos = codigos.drop_duplicates("categoria")
+        with self._lock:
+            nuevos = []
+            for categoria, codigo in zip(codigos["categoria"], codigos["codigo"]):
+                if codigo and categoria not in self.cat_codes and codigo not in self.code_owner:
+                    self.cat_codes[categoria] = codigo
+                    self.code_owner[codigo] = categoria
+                    nuevos.append(categoria)
+            self.used.update(todos.tolist())
+            self._persist(categorias=nuevos)
+
+    def _codigo_categoria(self, categoria):
+        clave = _normalizar_categoria(categoria)
+        codigo = self.cat_codes.get(clave)
+        if codigo is not None:
+            return codigo, False
+        cat_upper = _codigo_base_categoria(categoria)
+        # Candidatos de longitud creciente: 3, 4, 5... (o el nombre completo si es más corto)
+        candidatos = (cat_upper[:length] for length in range(min(3, len(cat_upper)), len(cat_upper) + 1))
+        codigo = next((c for c in candidatos if c and c not in self.code_owner), None)
+        if codigo is None:
+            # Todos los prefijos están tomados: se numera el nombre completo
+            n = 2
+            while f"{cat_upper}{n}" in self.code_owner:
+                n += 1
+            codigo = f"{cat_upper}{n}"
+        self.cat_codes[clave] = codigo
+        self.code_owner[codigo] = clave
+        return codigo, True
+
+    def codigo_categoria(self, categoria):
+        """
+        Código de la categoría: el ya asignado o uno nuevo que no colisiona con ningún otro.
+        """
+        with self._lock:
+            codigo, nuevo = self._codigo_categoria(categoria)
+            if nuevo:
+                self._persist(categorias=[_normalizar_categoria(categoria)])
+            return codigo
+
+    def _emitir(self, base_sku):
+        """
+        Próximo SKU libre para 'base_sku': la base la primera vez y luego base2, base3...
+        """
+        while True:
+            self.base_counts[base_sku] += 1
+            conteo = self.base_counts[base_sku]
+            sku_val = base_sku if conteo == 1 else f"{base_sku}{conteo}"
+            if sku_val not in self.used:
+                self.used.add(sku_val)
+                return sku_val
+
+    def generar_lote(self, filas):
+        """
+        Genera los SKUs de varias filas (nombre, categoria, fraccionamiento, tipo) en orden,
+        persistiendo el registro una sola vez al final. Retorna la lista de SKUs (uno por fila).
+        """
+        with self._lock:
+            categorias, bases, resultado = set(), set(), []
+            for nombre_producto, categoria, fraccionamiento, tipo in filas:
+                cate_code, nuevo = self._codigo_categoria(categoria)
+                if nuevo:
+                    categorias.add(_normalizar_categoria(categoria))
+                tipo_code = codigo_producto(nombre_producto)
+                sku_list = []
+                for frac_code in procesar_fraccionamientos(fraccionamiento, tipo):
+                    base_sku = f"{cate_code}-{tipo_code}-{frac_code}".rstrip("-")  # si frac_code = "" => quita guion final
+                    sku_list.append(self._emitir(base_sku))
+                    bases.add(base_sku)
+                resultado.append(", ".join(sku_list))
+            self._persist(categorias=list(categorias), bases=list(bases))
+            return resultado
+
+    def generar_columnas(self, productos, categorias, fraccionamientos, tipos, progress=None):
+        """
+        Versión vectorizada de generar_lote para muchas filas a la vez (mismos SKUs, mismo orden):
+          - un código por categoría única, en orden de aparición,
+          - prefijos de nombre y códigos de fraccionamiento con operaciones de texto por columna,
+          - repetidos numerados con un conteo acumulado por SKU base.
+        Los argumentos son Series alineadas; retorna una Series con el SKU de cada fila.
+        'progress(fraccion, texto)' se llama al terminar cada etapa.
+        Las bases con SKUs ya usados se numeran una por una; si dos bases distintas llegan al
+        mismo SKU se recurre a generar_lote para todo el lote.
+        """
+        def avisar(fraccion, texto):
+            if progress is not None:
+                progress(fraccion, texto)
+
+        if len(productos) == 0:
+            return pd.Series(dtype=object, index=productos.index)
+        # Texto como str de Python (igual que en el camino fila por fila)
+        productos, categorias, fraccionamientos, tipos = (
+            serie.astype(object).map(str) for serie in (productos, categorias, fraccionamientos, tipos)
+        )
+        with self._lock:
+            nuevas = set()
+            codigos = {}
+            for categoria in pd.unique(categorias):
+                codigos[categoria], nuevo = self._codigo_categoria(categoria)
+                if nuevo:
+                    nuevas.add(_normalizar_categoria(categoria))
+            cate_code = categorias.map(codigos).to_numpy()
+            tipo_code = productos.str.replace(r"\s+", "", regex=True).str.upper().str[:4].to_numpy()
+            avisar(0.25, "Códigos de categoría y de producto")
+
+            claves = list(zip(fraccionamientos.tolist(), tipos.tolist()))
+            fracs = {clave: procesar_fraccionamientos(*clave) for clave in dict.fromkeys(claves)}
+            variantes = [fracs[clave] for clave in claves]
+            fila = np.repeat(np.arange(len(variantes)), [len(v) for v in variantes])
+            frac_code = pd.Series([code for v in variantes for code in v], dtype=object)
+            base = (pd.Series(cate_code[fila], dtype=object) + "-" + pd.Series(tipo_code[fila], dtype=object)
+                    + "-" + frac_code).str.rstrip("-")
+            avisar(0.5, "Códigos de fraccionamiento")
+
+            conteos = {b: self.base_counts.get(b, 0) for b in pd.unique(base)}
+            conteo = base.map(conteos) + base.groupby(base, sort=False).cumcount() + 1
+            skus = base.where(conteo == 1, base + conteo.astype(str))
+            for b, n in base.value_counts(sort=False).items():
+                conteos[b] += int(n)
+
+            # Bases con algún SKU ya usado: solo esas se numeran una por una, salteando los usados
+            # Pertenencia fila por fila: Series.isin copiaría todo el conjunto de SKUs usados en cada lote
+            en_uso = np.fromiter(map(self.used.__contains__, skus.tolist()), dtype=bool, count=len(skus))
+            if en_uso.any():
+                afectadas = set(base[en_uso])
+                skus = skus.to_numpy(copy=True)
+                for b in afectadas:
+                    conteos[b] = self.base_counts.get(b, 0)
+                for i in np.flatnonzero(base.isin(afectadas).to_numpy()):
+                    b = base.iat[i]
+                    while True:
+                        conteos[b] += 1
+                        sku_val = b if conteos[b] == 1 else f"{b}{conteos[b]}"
+                        if sku_val not in self.used:
+                            break
+                    skus[i] = sku_val
+                skus = pd.Series(skus, dtype=object)
+            avisar(0.75, "SKUs repetidos numerados")
+
+            if skus.duplicated().any():
+                # Un SKU numerado coincide con el de otra base: se resuelve fila por fila
+                resultado = self.generar_lote(zip(productos, categorias, fraccionamientos, tipos))
+                self._persist(categorias=list(nuevas))
+                avisar(1.0, "SKUs generados")
+                return pd.Series(resultado, index=productos.index, dtype=object)
+
+            self.base_counts.update(conteos)
+            self.used.update(skus.tolist())
+            self._persist(categorias=list(nuevas), bases=list(pd.unique(base)))
+            # 'fila' está ordenada: los SKUs de cada fila son un tramo contiguo
+            fin = np.cumsum(np.bincount(fila, minlength=len(productos)))
+            lista = skus.tolist()
+            resultado = [", ".join(lista[a:b]) for a, b in zip(np.concatenate(([0], fin[:-1])).tolist(), fin.tolist())]
+            avisar(1.0, "SKUs generados")
+            return pd.Series(resultado, index=productos.index, dtype=object)
+
+    def skus_variantes(self, nombres, categorias, variantes, tipos, repeticiones):
+        """
+        SKU de cada variante (columnas alineadas: nombre, categoria, variante, tipo y repeticion)
+        que no tiene uno guardado en el catálogo: el generado en una exportación anterior o uno
+        nuevo, que queda registrado para que la variante conserve su SKU en las próximas
+        exportaciones. 'repeticion' distingue a los productos repetidos en el catálogo
+        (0 la primera vez, 1 la segunda...), así cada fila del export tiene su propio SKU.
+        Las claves se arman y se agrupan (factorize) sobre las columnas completas: el
+        registro se consulta una vez por clave distinta. Retorna un array con un SKU por fila.
+        """
+        nombres, categorias, variantes, tipos = (
+            pd.Series(col, dtype=object).reset_index(drop=True) for col in (nombres, categorias, variantes, tipos)
+        )
+        codigos, claves = pd.factorize(_claves_variantes(nombres, categorias, variantes, repeticiones))
+        # Primera fila de cada clave, para generar los SKUs nuevos en el orden del export
+        _, primera = np.unique(codigos, return_index=True)
+        with self._lock:
+            skus = np.array([self.variant_skus.get(clave) for clave in claves], dtype=object)
+            faltan = np.flatnonzero(pd.isna(skus))
+            if len(faltan):
+                filas = primera[faltan]
+                columnas = [col.iloc[filas].reset_index(drop=True) for col in (nombres, categorias, variantes, tipos)]
+                if len(faltan) < 100:
+                    nuevos = self.generar_lote(zip(*(col.tolist() for col in columnas)))
+                else:
+                    nuevos = self.generar_columnas(*columnas).tolist()
+                skus[faltan] = nuevos
+                nuevas_claves = claves[faltan].tolist()
+                self.variant_skus.update(zip(nuevas_claves, nuevos))
+                self._execute("INSERT OR REPLACE INTO sku_variantes (clave, sku) VALUES (?, ?)",
+                              list(zip(nuevas_claves, nuevos)), many=True)
+            return skus[codigos]
+
+    def generar(self, nombre_producto, categoria, fraccionamiento, tipo):
+        """
+        SKU de un producto: uno por fraccionamiento, separados por comas (ver generar_sku).
+        """
+        return self.generar_lote([(nombre_producto, categoria, fraccionamiento, tipo)])[0]
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_sku_registry(path=None):
+    """
+    Registro de SKUs compartido por el proceso (se carga una vez desde SQLite).
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None or (path is not None and _registry.path != path):
+            _registry = SkuRegistry(path or DB_PATH)
+        return _registry
+
+def generar_codigo_categoria(categoria, registry=None):
+    """
+    Código de categoría sin colisiones (ver SkuRegistry.codigo_categoria).
+    """
+    return (registry or get_sku_registry()).codigo_categoria(categoria)
+
+def generar_sku(nombre_producto, categoria, fraccionamiento, tipo, registry=None):
     """
     Genera un SKU para cada fraccionamiento y los concatena con comas.
     Estructura de cada SKU: CATE-TIPO-FRACC
-      - CATE: Código de la categoría (evita colisiones con generar_codigo_categoria)
+      - CATE: Código de la categoría (sin colisiones, ver SkuRegistry.codigo_categoria)
       - TIPO: Primeras 4 letras del producto, sin espacios
       - FRACC: Código del fraccionamiento (p.ej. '100G', 'UNI')
-    
-    'used_skus' es un dict que lleva el conteo de SKUs base para asegurar unicidad (baseSKU, conteo).
-    'cat_codes' es un dict que lleva {categoria: codigo_categoria_usado}.
+    Si el SKU base ya se usó, se le agrega el número de repetición (base2, base3...).
     """
-    # 1) Generar/obtener código de categoría sin colisiones
-    cate_code = generar_codigo_categoria(categoria, cat_codes)
-    
-    # 2) Normalizar nombre producto (primeras 4 letras)
-    nombre_norm = re.sub(r"\s+", "", nombre_producto).upper()
-    tipo_code = nombre_norm[:4] if len(nombre_norm) >= 4 else nombre_norm
-    
-    # 3) Procesar fraccionamientos según tipo
-    fracs = procesar_fraccionamientos(fraccionamiento, tipo)
-    
-    sku_list = []
-    for frac_code in fracs:
-        # Si frac_code está vacío, podría quedar "FRU-MANZ-" => no ideal, pero depende de tu preferencia
-        base_sku = f"{cate_code}-{tipo_code}-{frac_code}".rstrip("-")  # si frac_code = "" => quita guion final
-        used_skus[base_sku] += 1
-        if used_skus[base_sku] > 1:
-            sku_val = f"{base_sku}{used_skus[base_sku]}"
-        else:
-            sku_val = base_sku
-        sku_list.append(sku_val)
-    
-    return ", ".join(sku_list)
+    return (registry or get_sku_registry()).generar(nombre_producto, categoria, fraccionamiento, tipo)
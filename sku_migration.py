@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
 import re
-from collections import defaultdict
 from sku_generator import generar_sku
+import data_ops
 
 def migrate_sku_page():
     st.title("Migrar SKU a Productos Existentes")
@@ -11,34 +11,29 @@ def migrate_sku_page():
         st.error("No se encontró el DataFrame con productos.")
         return
     
-    # Diccionarios en session_state para llevar control
-    if "used_skus" not in st.session_state:
-        st.session_state["used_skus"] = defaultdict(int)
-    if "cat_codes" not in st.session_state:
-        st.session_state["cat_codes"] = {}
-
-    df = st.session_state.df
+    df = data_ops.get_catalog()
 
     st.markdown("Esta función asignará un código SKU a cada producto que no lo tenga (celda vacía o NaN). Solo se hace **una vez**.")
 
     if st.button("Migrar SKU"):
-        df = asignar_skus_a_productos_existentes(df)
-        st.session_state.df = df
+        progreso = st.progress(0.0, text="Asignando SKUs...")
+        df = asignar_skus_en_lote(
+            df, data_ops.sku_registry(),
+            progress=lambda fraccion, texto: progreso.progress(fraccion, text=texto)
+        )
+        data_ops.replace_catalog(df, "migrate_sku")
+        progreso.empty()
         st.success("¡Migración de SKU completada!")
     
     st.dataframe(st.session_state.df)
 
-def asignar_skus_a_productos_existentes(df):
-    from sku_generator import generar_sku
-    
+def asignar_skus_a_productos_existentes(df, registry):
     if "SKU" not in df.columns:
         df["SKU"] = ""
     
-    used_skus = st.session_state["used_skus"]
-    cat_codes = st.session_state["cat_codes"]
-    
     for idx, row in df.iterrows():
-        sku_actual = str(row.get("SKU", "")).strip()
+        sku_actual = row.get("SKU", "")
+        sku_actual = "" if pd.isna(sku_actual) else str(sku_actual).strip()
         if not sku_actual or sku_actual.upper() == "NAN":
             producto = row["PRODUCTO"]
             categoria = row["CATEGORIA"]
@@ -51,10 +46,38 @@ def asignar_skus_a_productos_existentes(df):
             # FRACCIONAMIENTO puede estar vacío para UNIDAD
             fraccionamiento = str(row.get("FRACCIONAMIENTO", "")).strip()
             
-            nuevo_sku = generar_sku(producto, categoria, fraccionamiento, tipo, used_skus, cat_codes)
+            nuevo_sku = generar_sku(producto, categoria, fraccionamiento, tipo, registry)
             df.at[idx, "SKU"] = nuevo_sku
     
     return df
 
+def _sin_sku(df):
+    skus = df["SKU"].astype(str).str.strip()
+    return df["SKU"].isna() | (skus == "") | (skus.str.upper() == "NAN")
+
+def asignar_skus_en_lote(df, registry, progress=None):
+    """
+    Igual que asignar_skus_a_productos_existentes (mismos SKUs), pero calcula todos los
+    faltantes de una vez con SkuRegistry.generar_columnas y los asigna en una sola operación.
+    """
+    if "SKU" not in df.columns:
+        df["SKU"] = ""
+    faltantes = df[_sin_sku(df)]
+    if faltantes.empty:
+        return df
+
+    # Tipo de venta: si no hay nada, consideramos UNIDAD
+    tipos = faltantes["KG / UNIDAD"] if "KG / UNIDAD" in df.columns else pd.Series("", index=faltantes.index)
+    tipos = tipos.astype(object).where(tipos.notna() & (tipos.astype(str) != ""), "UNIDAD")
+    # FRACCIONAMIENTO puede estar vacío para UNIDAD
+    fraccionamientos = (faltantes["FRACCIONAMIENTO"].astype(object).map(str).str.strip()
+                        if "FRACCIONAMIENTO" in df.columns else pd.Series("", index=faltantes.index))
+
+    nuevos = registry.generar_columnas(
+        faltantes["PRODUCTO"], faltantes["CATEGORIA"], fraccionamientos, tipos, progress=progress
+    )
+    df.loc[nuevos.index, "SKU"] = nuevos.to_numpy()
+    return df
+
 if __name__ == "__main__":
     migrate_sku_page()
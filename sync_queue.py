@@ -0,0 +1,165 @@
+# sync_queue.py
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from gspread.exceptions import APIError
+
+from catalog_store import DB_PATH, sync_store
+
+MAX_ATTEMPTS = 5
+BASE_DELAY = 2  # segundos; se duplica en cada reintento
+RETRY_CODES = {429, 500, 502, 503}
+# Segundos mínimos entre sincronizaciones pedidas automáticamente (al abrir sesiones o al navegar)
+SYNC_INTERVAL = 60
+
+STATUS_QUEUED = "en cola"
+STATUS_RUNNING = "subiendo"
+STATUS_RETRYING = "reintentando"
+STATUS_DONE = "completado"
+STATUS_FAILED = "error"
+# Estados de un trabajo que todavía no terminó
+PENDING_STATUSES = (STATUS_QUEUED, STATUS_RUNNING, STATUS_RETRYING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_JOB_COLUMNS = ["id", "status", "progress", "attempts", "message", "created_at", "updated_at"]
+
+def _execute(path, sql, params=()):
+    with closing(sqlite3.connect(path, timeout=30)) as con:
+        with con:
+            con.executescript(_SCHEMA)
+            cursor = con.execute(sql, params)
+            return cursor.lastrowid, cursor.fetchall()
+
+def _update_job(path, job_id, **fields):
+    fields["updated_at"] = time.time()
+    assignments = ", ".join(f"{col} = ?" for col in fields)
+    _execute(path, f"UPDATE sync_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+def _is_retryable(error):
+    """
+    Errores de cuota (429) o transitorios del servidor de Google.
+    """
+    return isinstance(error, APIError) and error.code in RETRY_CODES
+
+def run_sync_job(job_id, spreadsheet_url, path=DB_PATH):
+    """
+    Ejecuta un trabajo de sincronización en el worker. Lee el estado más reciente de la
+    réplica local al arrancar, así que un único trabajo sube todas las ediciones encoladas.
+    Reintenta con backoff exponencial ante errores de cuota y registra estado y progreso
+    en la tabla sync_jobs para que la UI pueda mostrarlos.
+    """
+    def progress(fraction, message):
+        _update_job(path, job_id, progress=fraction, message=message)
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        _update_job(path, job_id, status=STATUS_RUNNING, progress=0.1, attempts=attempt, message="Iniciando")
+        try:
+            pushed = sync_store(spreadsheet_url, path, progress=progress)
+        except Exception as e:
+            if _is_retryable(e) and attempt < MAX_ATTEMPTS:
+                delay = BASE_DELAY * 2 ** (attempt - 1)
+                _update_job(path, job_id, status=STATUS_RETRYING,
+                            message=f"Límite de la API alcanzado, reintento en {delay}s")
+                time.sleep(delay)
+                continue
+            _update_job(path, job_id, status=STATUS_FAILED, message=str(e))
+            return None
+        _update_job(path, job_id, status=STATUS_DONE, progress=1.0,
+                    message=f"{pushed} edición(es) subida(s)")
+        return pushed
+
+class SyncQueue:
+    """
+    Cola de sincronización con el spreadsheet sobre el executor de fondo.
+    - Cada envío tiene un id y su estado/progreso queda en SQLite (visible desde cualquier sesión).
+    - Si ya hay un trabajo en cola que todavía no arrancó, se reutiliza: cuando arranque
+      subirá el estado más reciente, así que los clics repetidos no generan subidas redundantes.
+      Solo se reutilizan los trabajos cuyo future sigue vivo en este proceso ('_futures').
+    - Al crearse (al arrancar la app) marca como fallidos los trabajos que quedaron sin terminar
+      de una ejecución anterior: ningún worker los va a completar. Las ediciones que tenían que
+      subir siguen en el journal y las sube el próximo trabajo.
+    """
+    def __init__(self, executor, spreadsheet_url, path=DB_PATH):
+        self.executor = executor
+        self.spreadsheet_url = spreadsheet_url
+        self.path = path
+        self._lock = threading.Lock()
+        self._futures = {}  # id de trabajo -> future, de los trabajos enviados por este proceso
+        self._fail_orphans()
+
+    def _fail_orphans(self):
+        marcas = ", ".join("?" for _ in PENDING_STATUSES)
+        _execute(
+            self.path,
+            f"UPDATE sync_jobs SET status = ?, message = ?, updated_at = ? WHERE status IN ({marcas})",
+            (STATUS_FAILED, "Interrumpido: la aplicación se reinició", time.time(), *PENDING_STATUSES)
+        )
+
+    def submit(self):
+        """
+        Encola una sincronización y retorna el id del trabajo (nuevo o el que ya estaba en cola).
+        """
+        with self._lock:
+            _, rows = _execute(
+                self.path,
+                "SELECT id FROM sync_jobs WHERE status = ? ORDER BY id",
+                (STATUS_QUEUED,)
+            )
+            for (job_id,) in rows:
+                future = self._futures.get(job_id)
+                if future is not None and not future.done():
+                    return job_id
+            now = time.time()
+            job_id, _ = _execute(
+                self.path,
+                "INSERT INTO sync_jobs (status, created_at, updated_at) VALUES (?, ?, ?)",
+                (STATUS_QUEUED, now, now)
+            )
+            future = self.executor.submit(run_sync_job, job_id, self.spreadsheet_url, self.path)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        return job_id
+
+    def submit_if_due(self, interval=SYNC_INTERVAL):
+        """
+        Encola una sincronización solo si no se pidió ninguna en los últimos 'interval' segundos.
+        Retorna el id del trabajo encolado, o None si todavía no corresponde.
+        """
+        _, rows = _execute(self.path, "SELECT MAX(created_at) FROM sync_jobs")
+        ultima = rows[0][0] if rows else None
+        if ultima is not None and time.time() - ultima < interval:
+            return None
+        return self.submit()
+
+    def _on_done(self, job_id, future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+        # Si el worker murió (p.ej. BrokenProcessPool) el trabajo no pudo registrar su error
+        error = future.exception()
+        if error is not None:
+            _update_job(self.path, job_id, status=STATUS_FAILED, message=str(error))
+
+    def get_job(self, job_id):
+        _, rows = _execute(self.path, f"SELECT {', '.join(_JOB_COLUMNS)} FROM sync_jobs WHERE id = ?", (job_id,))
+        return dict(zip(_JOB_COLUMNS, rows[0])) if rows else None
+
+    def recent_jobs(self, limit=5):
+        _, rows = _execute(
+            self.path,
+            f"SELECT {', '.join(_JOB_COLUMNS)} FROM sync_jobs ORDER BY id DESC LIMIT ?",
+            (limit,)
+        )
+        return [dict(zip(_JOB_COLUMNS, row)) for row in rows]